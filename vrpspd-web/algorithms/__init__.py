@@ -8,6 +8,7 @@ Algorithms Package for VRPSPD Web Application
 from .file_parser import read_vrpspd_file
 from .savings import solve_savings
 from .vnd import solve_vnd
+from .ils import solve_ils
 from .utils import (
     route_distance,
     calculate_total_cost,
@@ -32,6 +33,7 @@ __all__ = [
     'read_vrpspd_file',
     'solve_savings',
     'solve_vnd',
+    'solve_ils',
     'route_distance',
     'calculate_total_cost',
     'convert_routes_to_vector',
@@ -0,0 +1,73 @@
+"""
+Batch Checkpoints for VRPSPD
+Lưu kết quả từng instance của batch ngay khi xong (JSONL append-only) để chạy tiếp sau sự cố
+"""
+
+import hashlib
+import json
+import os
+
+# Thư mục (cạnh file upload) chứa checkpoint của các batch chạy qua web
+BATCH_CHECKPOINT_DIR = '.batch_checkpoints'
+
+
+def checkpoint_key(content_hash, config):
+    """Khóa của một kết quả: hash nội dung file + cấu hình solver (dict JSON được)."""
+    payload = json.dumps({'content_hash': content_hash, 'config': config}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BatchCheckpoint:
+    """
+    File JSONL, mỗi dòng {'key', 'filename', 'result'} cho một instance đã giải.
+
+    Mỗi record được ghi và fsync ngay, nên khi process chết chỉ mất instance
+    đang chạy; dòng cuối bị ghi dở được bỏ qua khi đọc lại. Khóa trùng thì
+    record sau thắng.
+
+    Usage:
+        checkpoint = BatchCheckpoint('run.jsonl')
+        key = checkpoint_key(file_content_hash(path), config)
+        result = checkpoint.get(key) or solve(...)
+        checkpoint.record(key, result)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._results = {}
+        # A crash can leave the last line without its newline
+        self._needs_newline = False
+        self._load()
+
+    def __len__(self):
+        return len(self._results)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                self._needs_newline = not line.endswith('\n')
+                try:
+                    record = json.loads(line)
+                    self._results[record['key']] = record['result']
+                except (ValueError, KeyError, TypeError):
+                    continue  # Partially written line from a crash
+
+    def get(self, key):
+        """Kết quả đã lưu cho key, hoặc None."""
+        return self._results.get(key)
+
+    def record(self, key, result):
+        """Ghi thêm kết quả của một instance (bền vững ngay khi trả về)."""
+        line = json.dumps({'key': key, 'filename': result.get('filename'), 'result': result})
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if self._needs_newline:
+                f.write('\n')
+                self._needs_newline = False
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._results[key] = result
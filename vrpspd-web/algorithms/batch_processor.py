@@ -3,69 +3,445 @@ Batch Processor Module for VRPSPD
 Xử lý nhiều file cùng lúc và tạo báo cáo tổng hợp
 """
 
-from algorithms import read_vrpspd_file, solve_savings, solve_vnd
+from algorithms import read_vrpspd_file, solve_savings
+from .ils import solve_vnd_or_ils
+from .batch_checkpoint import BatchCheckpoint, checkpoint_key
+from .batch_scheduler import BatchTimeScheduler
+from .file_parser import file_content_hash
+from .result_cache import is_cacheable
+from .cancellation import CancellationToken, EventCancellationToken
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import os
 from datetime import datetime
 
+# Thời gian VND mặc định cho mỗi instance (giây)
+BATCH_VND_TIME_SECONDS = 60
 
-def process_batch_files(files_data, algorithms):
+# Chu kỳ (giây) kiểm tra cancel_token khi chờ các worker
+BATCH_CANCEL_POLL_SECONDS = 0.5
+
+
+# Token cha của mọi instance giải trong một process worker (xem _init_batch_worker)
+_worker_cancel_token = None
+
+
+def default_batch_workers():
+    """Số process mặc định cho batch song song (số CPU)."""
+    return os.cpu_count() or 1
+
+
+def _init_batch_worker(cancel_event):
+    global _worker_cancel_token
+    _worker_cancel_token = EventCancellationToken(cancel_event)
+
+
+def solve_batch_instance(filename, problem_data, algorithms, vnd_options=None, cancel_token=None):
+    """
+    Giải một instance của batch.
+    
+    Args:
+        filename (str): Tên file (ghi vào kết quả)
+        problem_data (tuple): (cost_matrix, demand, pickup, vehicle_capacities, capacity, num_vehicles)
+        algorithms (list): ['savings', 'vnd']
+        vnd_options (dict): kwargs thêm cho solve_vnd (mặc định max_time_seconds=BATCH_VND_TIME_SECONDS);
+            có khóa 'ils' thì chạy solve_ils (see solve_vnd_or_ils)
+        cancel_token (CancellationToken): Dừng Savings/VND sớm
+        
+    Returns:
+        dict: Kết quả của file (như một phần tử của process_batch_files)
+    """
+    cost_matrix, demand, pickup, vehicle_capacities, capacity, num_vehicles = problem_data
+    
+    # Results cho file này
+    file_result = {
+        'filename': filename,
+        'success': True,
+        'problem_info': {
+            'num_customers': len(cost_matrix) - 1,
+            'num_vehicles': num_vehicles,
+            'capacity': capacity
+        },
+        'results': {}
+    }
+    
+    # Run Savings
+    if 'savings' in algorithms or 'vnd' in algorithms:
+        savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles,
+                                       cancel_token=cancel_token)
+        file_result['results']['savings'] = savings_result
+    
+    # Run VND
+    if 'vnd' in algorithms:
+        vnd_kwargs = {'max_time_seconds': BATCH_VND_TIME_SECONDS, **(vnd_options or {})}
+        initial_vector = file_result['results']['savings']['solution_vector']
+        vnd_result = solve_vnd_or_ils(initial_vector, cost_matrix, demand, pickup, capacity,
+                                      cancel_token=cancel_token, **vnd_kwargs)
+        file_result['results']['vnd'] = vnd_result
+    
+    return file_result
+
+
+def _solve_batch_file(file_data, algorithms, vnd_options, timeout_seconds, deadline=None,
+                      problem_data=None, parent_token=None):
+    """
+    Đọc (nếu cần) và giải một file với giới hạn thời gian riêng; lỗi được trả
+    về dạng kết quả thất bại thay vì ném ra (chạy được trong process worker).
+    """
+    filename = file_data['filename']
+    if parent_token is None:
+        # In a pool worker: the batch deadline plus the pool's cancel event
+        parent_token = CancellationToken(deadline, _worker_cancel_token)
+    # The per-instance timeout starts when the instance does, not when it is queued
+    token = CancellationToken.with_time_limit(timeout_seconds, parent_token)
+    try:
+        if problem_data is None:
+            problem_data = read_vrpspd_file(file_data['filepath'])
+        file_result = solve_batch_instance(filename, problem_data, algorithms, vnd_options, token)
+    except Exception as e:
+        return {
+            'filename': filename,
+            'success': False,
+            'error': str(e)
+        }
+    if token.expired() and not token.cancelled:
+        file_result['timed_out'] = True
+    return file_result
+
+
+def _cancelled_result(filename):
+    return {
+        'filename': filename,
+        'success': False,
+        'error': 'Cancelled'
+    }
+
+
+def batch_instance_sizes(files_data, registry=None):
+    """
+    Số khách hàng của từng file (0 nếu không đọc được), dùng làm trọng số
+    khi chia ngân sách thời gian.
+    """
+    sizes = []
+    for file_data in files_data:
+        try:
+            if registry is not None:
+                instance = registry.get(file_data.get('instance_id')) or registry.load(file_data['filepath'])
+                sizes.append(instance.num_customers)
+            else:
+                sizes.append(len(read_vrpspd_file(file_data['filepath'])[0]) - 1)
+        except Exception:
+            sizes.append(0)
+    return sizes
+
+
+class _InstanceLimits:
+    """Giới hạn thời gian (timeout, vnd_options) của từng instance, theo ngân sách nếu có."""
+
+    def __init__(self, timeout_seconds, vnd_options, scheduler=None):
+        self.timeout_seconds = timeout_seconds
+        self.vnd_options = vnd_options or {}
+        self.scheduler = scheduler
+
+    def start(self, index):
+        if self.scheduler is None:
+            return self.timeout_seconds, self.vnd_options
+        seconds = self.scheduler.start(index)
+        if self.timeout_seconds is not None:
+            seconds = min(seconds, self.timeout_seconds)
+        return seconds, {**self.vnd_options, 'max_time_seconds': seconds}
+
+    def finish(self, index):
+        if self.scheduler is not None:
+            self.scheduler.finish(index)
+
+
+def batch_solver_config(algorithms, vnd_options=None, timeout_seconds=None):
+    """
+    Cấu hình solver quyết định kết quả của một instance (khóa checkpoint);
+    'workers' của VND không đổi kết quả nên bị bỏ qua.
+    """
+    vnd_options = {'max_time_seconds': BATCH_VND_TIME_SECONDS, **(vnd_options or {})}
+    vnd_options.pop('workers', None)
+    return {
+        'algorithms': sorted(algorithms),
+        'vnd_options': vnd_options if 'vnd' in algorithms else {},
+        'timeout_seconds': timeout_seconds
+    }
+
+
+def process_batch_files(files_data, algorithms, registry=None, progress_callback=None, cancel_token=None,
+                        workers=1, timeout_seconds=None, vnd_options=None, time_budget_seconds=None,
+                        checkpoint_path=None, resume=True, result_cache=None):
     """
     Xử lý batch files.
     
     Args:
         files_data (list): List of dict with 'filename' and 'filepath'
+            (và 'instance_id' tùy chọn khi dùng registry)
         algorithms (list): List of algorithm names ['savings', 'vnd']
+        registry (InstanceRegistry): Nếu có, instance được lấy từ registry
+            thay vì parse lại file (chỉ khi chạy tuần tự)
+        progress_callback (callable): Gọi progress_callback(file_result) sau mỗi file
+            (theo thứ tự hoàn thành khi chạy song song)
+        cancel_token (CancellationToken): Truyền cho các solver; khi đã bị hủy
+            các file còn lại được đánh dấu 'Cancelled' thay vì giải
+        workers (int): Số process giải song song (1 = tuần tự trong process hiện tại)
+        timeout_seconds (float): Giới hạn thời gian (Savings + VND) cho mỗi instance;
+            hết giờ thì lấy lời giải tốt nhất đã có và đánh dấu 'timed_out'
+        vnd_options (dict): kwargs thêm cho solve_vnd (xem solve_batch_instance)
+        time_budget_seconds (float): Ngân sách wall-clock cho cả batch; thời gian
+            mỗi instance do BatchTimeScheduler cấp theo số khách hàng (thay cho
+            max_time_seconds, vẫn không vượt timeout_seconds)
+        checkpoint_path (str): File JSONL (BatchCheckpoint); kết quả thành công
+            được ghi ngay khi mỗi instance xong
+        resume (bool): Bỏ qua các file đã có kết quả trong checkpoint với cùng
+            nội dung và cấu hình solver (kết quả được đánh dấu 'resumed')
+        result_cache (ResultCache): Lấy kết quả đã cache (đánh dấu 'cached') và
+            lưu các kết quả tái lập được (see is_cacheable)
         
     Returns:
-        list: List of results cho từng file
+        list: List of results cho từng file (theo thứ tự files_data)
     """
-    batch_results = []
+    batch_results = [None] * len(files_data)
+    for index, file_result in iter_batch_files(
+            files_data, algorithms, registry, cancel_token, workers=workers, timeout_seconds=timeout_seconds,
+            vnd_options=vnd_options, time_budget_seconds=time_budget_seconds,
+            checkpoint_path=checkpoint_path, resume=resume, result_cache=result_cache):
+        batch_results[index] = file_result
+        if progress_callback is not None:
+            progress_callback(file_result)
+    return batch_results
+
+
+def iter_batch_files(files_data, algorithms, registry=None, cancel_token=None, workers=1, timeout_seconds=None,
+                     vnd_options=None, time_budget_seconds=None, checkpoint_path=None, resume=True,
+                     result_cache=None):
+    """
+    Như process_batch_files nhưng trả về từng kết quả ngay khi xong, không giữ
+    lại danh sách kết quả (dùng cho streaming).
     
-    for file_data in files_data:
+    Yields:
+        tuple: (index trong files_data, file_result) theo thứ tự hoàn thành;
+            kết quả lấy từ checkpoint / result_cache được trả về trước
+    """
+    keys = {}
+    cache_keys = {}
+    pending = []
+    checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+    config = batch_solver_config(algorithms, vnd_options, timeout_seconds)
+    for index, file_data in enumerate(files_data):
+        if checkpoint is None and result_cache is None:
+            pending.append(index)
+            continue
+        try:
+            content_hash = file_content_hash(file_data['filepath'])
+        except OSError:
+            pending.append(index)  # Unreadable file: solving reports the error
+            continue
+        
+        if checkpoint is not None:
+            keys[index] = checkpoint_key(content_hash, config)
+            stored = checkpoint.get(keys[index]) if resume else None
+            if stored is not None:
+                yield index, {**stored, 'filename': file_data['filename'], 'resumed': True}
+                continue
+        
+        if result_cache is not None:
+            cache_keys[index] = result_cache.key(content_hash, algorithms, vnd_options)
+            entry = result_cache.get(cache_keys[index])
+            if entry is not None:
+                file_result = {'filename': file_data['filename'], 'success': True, **entry}
+                if index in keys:
+                    checkpoint.record(keys[index], file_result)
+                yield index, {**file_result, 'cached': True}
+                continue
+        pending.append(index)
+    
+    for position, file_result in _iter_batch([files_data[index] for index in pending], algorithms, registry,
+                                             cancel_token, workers, timeout_seconds, vnd_options,
+                                             time_budget_seconds):
+        index = pending[position]
+        # A result cut short by cancellation is not the configured solve
+        if (index in keys and file_result['success']
+                and not (cancel_token is not None and cancel_token.cancelled)):
+            checkpoint.record(keys[index], file_result)
+        if (index in cache_keys and file_result['success'] and not file_result.get('timed_out')
+                and is_cacheable(file_result['results'], cancel_token)):
+            result_cache.put(cache_keys[index], {'results': file_result['results'],
+                                                 'problem_info': file_result['problem_info']})
+        yield index, file_result
+
+
+def _iter_batch(files_data, algorithms, registry, cancel_token, workers, timeout_seconds, vnd_options,
+                time_budget_seconds):
+    """Giải các file của batch (không checkpoint), trả về (index, file_result) sau mỗi file."""
+    if not files_data:
+        return
+    workers = max(1, min(workers or 1, len(files_data)))
+    scheduler = None
+    if time_budget_seconds is not None:
+        scheduler = BatchTimeScheduler(time_budget_seconds, batch_instance_sizes(files_data, registry), workers)
+    limits = _InstanceLimits(timeout_seconds, vnd_options, scheduler)
+    if workers > 1:
+        yield from _iter_batch_parallel(files_data, algorithms, cancel_token, workers, limits)
+        return
+    
+    for index, file_data in enumerate(files_data):
         filename = file_data['filename']
-        filepath = file_data['filepath']
         
+        if cancel_token is not None and cancel_token.cancelled:
+            yield index, _cancelled_result(filename)
+            continue
+        
+        problem_data = None
         try:
-            # Parse file
-            cost_matrix, demand, pickup, vehicle_capacities, capacity, num_vehicles = read_vrpspd_file(filepath)
-            
-            # Results cho file này
-            file_result = {
+            # Reuse the registry's parsed instance
+            if registry is not None:
+                instance = registry.get(file_data.get('instance_id')) or registry.load(file_data['filepath'])
+                problem_data = instance.data
+        except Exception as e:
+            yield index, {
                 'filename': filename,
-                'success': True,
-                'problem_info': {
-                    'num_customers': len(cost_matrix) - 1,
-                    'num_vehicles': num_vehicles,
-                    'capacity': capacity
-                },
-                'results': {}
+                'success': False,
+                'error': str(e)
             }
+            continue
+        
+        instance_timeout, instance_vnd_options = limits.start(index)
+        file_result = _solve_batch_file(file_data, algorithms, instance_vnd_options, instance_timeout,
+                                        problem_data=problem_data, parent_token=cancel_token)
+        limits.finish(index)
+        yield index, file_result
+
+
+def _iter_batch_parallel(files_data, algorithms, cancel_token, workers, limits):
+    """
+    _iter_batch với pool process: mỗi worker tự đọc file (cache nhị phân của
+    file_parser) và giải một instance; lỗi của một instance chỉ ảnh hưởng tới
+    kết quả của instance đó. Worker chết đột ngột (os._exit, OOM, segfault)
+    làm hỏng cả pool: các instance đang chạy trên pool đó được đánh dấu lỗi,
+    pool được tạo lại và các file còn lại vẫn được giải.
+    
+    Chỉ tối đa workers instance được gửi cùng lúc, nên giới hạn thời gian
+    của mỗi instance được tính đúng lúc nó bắt đầu chạy. Khi cancel_token bị
+    hủy, các worker nhận hủy qua một multiprocessing.Event và trả về lời
+    giải tốt nhất đã có; khi generator bị đóng sớm, các instance đang chạy
+    bị dừng và không chờ.
+    """
+    deadline = cancel_token.effective_deadline() if cancel_token is not None else None
+    cancel_event = multiprocessing.Event()
+    next_index = 0
+    
+    executor = _create_executor(workers, cancel_event)
+    try:
+        # future -> (index, executor that ran it)
+        futures = {}
+        while next_index < len(files_data) or futures:
+            cancelled = cancel_token is not None and cancel_token.cancelled
+            while not cancelled and next_index < len(files_data) and len(futures) < workers:
+                instance_timeout, instance_vnd_options = limits.start(next_index)
+                # Nested pools would oversubscribe the CPUs
+                instance_vnd_options = {key: value for key, value in instance_vnd_options.items()
+                                        if key != 'workers'}
+                args = (_solve_batch_file, files_data[next_index], algorithms, instance_vnd_options,
+                        instance_timeout, deadline)
+                try:
+                    future = executor.submit(*args)
+                except BrokenProcessPool:
+                    # A worker died before its failed futures were collected
+                    executor = _replace_executor(executor, workers, cancel_event)
+                    future = executor.submit(*args)
+                futures[future] = (next_index, executor)
+                next_index += 1
+            if cancelled:
+                # Running instances stop and return their best solution so far
+                cancel_event.set()
+                for index in range(next_index, len(files_data)):
+                    yield index, _cancelled_result(files_data[index]['filename'])
+                next_index = len(files_data)
+                if not futures:
+                    break
             
-            # Run Savings
-            if 'savings' in algorithms:
-                savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
-                file_result['results']['savings'] = savings_result
-            
-            # Run VND
-            if 'vnd' in algorithms:
-                if 'savings' not in file_result['results']:
-                    savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
-                    file_result['results']['savings'] = savings_result
-                
-                initial_vector = file_result['results']['savings']['solution_vector']
-                vnd_result = solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_seconds=60)
-                file_result['results']['vnd'] = vnd_result
+            done, _ = wait(futures, timeout=BATCH_CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, future_executor = futures.pop(future)
+                limits.finish(index)
+                try:
+                    file_result = future.result()
+                except BrokenProcessPool as e:
+                    # Every instance in flight on the dead pool is lost with it
+                    file_result = {
+                        'filename': files_data[index]['filename'],
+                        'success': False,
+                        'error': f'Worker process crashed: {e}'
+                    }
+                    if future_executor is executor:
+                        executor = _replace_executor(executor, workers, cancel_event)
+                except Exception as e:
+                    file_result = {
+                        'filename': files_data[index]['filename'],
+                        'success': False,
+                        'error': f'Worker failed: {e}'
+                    }
+                yield index, file_result
+    finally:
+        # Closed early (or done): stop whatever still runs instead of waiting for it
+        cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _create_executor(workers, cancel_event):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(cancel_event,))
+
+
+def _replace_executor(executor, workers, cancel_event):
+    """Bỏ pool bị hỏng (một worker chết đột ngột) và tạo pool mới."""
+    executor.shutdown(wait=False)
+    return _create_executor(workers, cancel_event)
+
+
+class BatchSummary:
+    """
+    Summary của batch được cộng dồn từng kết quả (không cần giữ lại các kết
+    quả); to_dict() có cùng dạng với create_batch_summary.
+    """
+    
+    def __init__(self):
+        self.total_files = 0
+        self.successful = 0
+        self.improvement_sum = 0.0
+        self.improvement_count = 0
+        self.total_cost_savings = 0
+        self.total_cost_vnd = 0
+    
+    def add(self, result):
+        """Cộng một kết quả của process_batch_files / iter_batch_files."""
+        self.total_files += 1
+        if not result['success']:
+            return
+        self.successful += 1
+        if 'vnd' in result.get('results', {}):
+            vnd = result['results']['vnd']
+            savings = result['results'].get('savings', {})
             
-            batch_results.append(file_result)
+            if 'improvement' in vnd:
+                self.improvement_sum += vnd['improvement']
+                self.improvement_count += 1
             
-        except Exception as e:
-            batch_results.append({
-                'filename': filename,
-                'success': False,
-                'error': str(e)
-            })
+            self.total_cost_savings += savings.get('total_cost', 0)
+            self.total_cost_vnd += vnd.get('total_cost', 0)
     
-    return batch_results
+    def to_dict(self):
+        return {
+            'total_files': self.total_files,
+            'successful': self.successful,
+            'failed': self.total_files - self.successful,
+            'avg_improvement': self.improvement_sum / self.improvement_count if self.improvement_count else 0.0,
+            'total_cost_savings': self.total_cost_savings,
+            'total_cost_vnd': self.total_cost_vnd
+        }
 
 
 def create_batch_summary(batch_results):
@@ -78,34 +454,7 @@ def create_batch_summary(batch_results):
     Returns:
         dict: Summary statistics
     """
-    summary = {
-        'total_files': len(batch_results),
-        'successful': sum(1 for r in batch_results if r['success']),
-        'failed': sum(1 for r in batch_results if not r['success']),
-        'avg_improvement': 0.0,
-        'total_cost_savings': 0,
-        'total_cost_vnd': 0
-    }
-    
-    improvements = []
-    total_savings_cost = 0
-    total_vnd_cost = 0
-    
+    summary = BatchSummary()
     for result in batch_results:
-        if result['success'] and 'vnd' in result.get('results', {}):
-            vnd = result['results']['vnd']
-            savings = result['results'].get('savings', {})
-            
-            if 'improvement' in vnd:
-                improvements.append(vnd['improvement'])
-            
-            total_savings_cost += savings.get('total_cost', 0)
-            total_vnd_cost += vnd.get('total_cost', 0)
-    
-    if improvements:
-        summary['avg_improvement'] = sum(improvements) / len(improvements)
-    
-    summary['total_cost_savings'] = total_savings_cost
-    summary['total_cost_vnd'] = total_vnd_cost
-    
-    return summary
+        summary.add(result)
+    return summary.to_dict()
@@ -0,0 +1,64 @@
+"""
+Time Budget Scheduler for VRPSPD Batch Runs
+Chia một ngân sách thời gian tổng (wall-clock) cho các instance của batch
+"""
+
+import time
+
+# Thời gian tối thiểu cho mỗi instance (giây), kể cả khi ngân sách đã hết
+BATCH_MIN_INSTANCE_SECONDS = 1.0
+
+
+class BatchTimeScheduler:
+    """
+    Cấp thời gian cho từng instance khi nó bắt đầu, tỉ lệ với trọng số
+    (kích thước) của nó trong phần ngân sách còn lại.
+
+    Ngân sách còn lại được tính lại mỗi lần cấp: workers x (deadline - now)
+    trừ đi phần thời gian các instance đang chạy còn giữ. Instance hội tụ sớm
+    trả lại phần không dùng ngay khi finish(), nên các instance sau nhận thêm.
+
+    Usage:
+        scheduler = BatchTimeScheduler(3600, [20, 50, 100], workers=2)
+        seconds = scheduler.start(0)      # ... giải instance 0 trong seconds giây
+        scheduler.finish(0)
+    """
+
+    def __init__(self, total_seconds, weights, workers=1, min_seconds=BATCH_MIN_INSTANCE_SECONDS):
+        self.deadline = time.time() + total_seconds
+        self.weights = [max(weight, 0) for weight in weights]
+        self.workers = max(1, workers)
+        self.min_seconds = min_seconds
+        self._unstarted_weight = sum(self.weights)
+        self._unstarted_count = len(self.weights)
+        # index -> (start time, allocated seconds)
+        self._running = {}
+
+    def remaining(self):
+        """Thời gian wall-clock còn lại tới deadline (giây)."""
+        return max(0.0, self.deadline - time.time())
+
+    def start(self, index):
+        """Bắt đầu instance index, trả về số giây được cấp cho nó."""
+        now = time.time()
+        weight = self.weights[index]
+        unstarted_weight = self._unstarted_weight
+        unstarted_count = self._unstarted_count
+        self._unstarted_weight -= weight
+        self._unstarted_count -= 1
+
+        remaining = max(0.0, self.deadline - now)
+        reserved = sum(max(0.0, started + seconds - now) for started, seconds in self._running.values())
+        available = max(0.0, self.workers * remaining - reserved)
+        if unstarted_weight > 0:
+            share = available * weight / unstarted_weight
+        else:
+            share = available / unstarted_count
+        # No single instance can use more than the wall-clock time left
+        seconds = max(self.min_seconds, min(share, remaining))
+        self._running[index] = (now, seconds)
+        return seconds
+
+    def finish(self, index):
+        """Instance index đã xong; phần thời gian chưa dùng được trả lại ngân sách."""
+        self._running.pop(index, None)
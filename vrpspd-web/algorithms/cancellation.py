@@ -0,0 +1,86 @@
+"""
+Cancellation Tokens for VRPSPD Solvers
+Token hủy / giới hạn thời gian dùng chung cho solve_savings, vnd_intra_search, solve_vnd
+"""
+
+import time
+
+
+class CancellationToken:
+    """
+    Token dừng hợp tác (cooperative) cho các solver.
+
+    Solver kiểm tra expired() trong vòng lặp và khi token hết hạn thì dừng,
+    trả về lời giải tốt nhất đã có (vẫn hợp lệ). Token hết hạn khi bị cancel(),
+    khi quá deadline (time.time()), hoặc khi token cha hết hạn; nhờ vậy một
+    job có thể tạo token riêng cho mỗi solver (thêm giới hạn thời gian) mà vẫn
+    hủy được tất cả cùng lúc.
+
+    Usage:
+        token = CancellationToken()
+        solve_vnd(..., cancel_token=token)     # thread khác: token.cancel()
+    """
+
+    __slots__ = ('deadline', 'parent', '_cancelled')
+
+    def __init__(self, deadline=None, parent=None):
+        self.deadline = deadline
+        self.parent = parent
+        self._cancelled = False
+
+    @classmethod
+    def with_time_limit(cls, seconds, parent=None):
+        """Token hết hạn sau seconds giây (None = không giới hạn)."""
+        return cls(None if seconds is None else time.time() + seconds, parent)
+
+    def cancel(self):
+        """Yêu cầu dừng (an toàn khi gọi từ thread khác)."""
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        """True nếu token (hoặc token cha) đã bị cancel() - không tính hết giờ."""
+        return self._cancelled or (self.parent is not None and self.parent.cancelled)
+
+    def expired(self):
+        """True nếu solver nên dừng (bị hủy hoặc quá deadline)."""
+        if self._cancelled:
+            return True
+        if self.deadline is not None and time.time() > self.deadline:
+            return True
+        return self.parent is not None and self.parent.expired()
+
+    def effective_deadline(self):
+        """Deadline sớm nhất trong chuỗi token (None nếu không có)."""
+        deadlines = []
+        token = self
+        while token is not None:
+            if token.deadline is not None:
+                deadlines.append(token.deadline)
+            token = token.parent
+        return min(deadlines) if deadlines else None
+
+
+class EventCancellationToken(CancellationToken):
+    """
+    Token bị hủy khi event (multiprocessing.Event, chia sẻ với process chính)
+    được set; dùng làm token cha trong process worker để process chính hủy
+    được solver đang chạy ở đó.
+    """
+
+    __slots__ = ('event',)
+
+    def __init__(self, event, deadline=None, parent=None):
+        super().__init__(deadline, parent)
+        self.event = event
+
+    def cancel(self):
+        self._cancelled = True
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled or self.event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def expired(self):
+        return self.cancelled or super().expired()
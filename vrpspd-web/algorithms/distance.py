@@ -0,0 +1,147 @@
+"""
+Coordinate-Based Distances for VRPSPD
+Ma trận chi phí Euclidean tính từ tọa độ (đầy đủ hoặc lười theo hàng)
+"""
+
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+# Từ số node này trở lên ma trận được tính lười theo hàng thay vì tạo đầy đủ.
+# Dưới ngưỡng, list of lists đầy đủ (~32 byte/phần tử, 512 MB ở 4000 node) vẫn
+# vừa bộ nhớ và là dạng VND truy cập nhanh nhất.
+LAZY_MATRIX_MIN_NODES = 4000
+
+# Bộ nhớ tối đa cho các hàng LazyEuclideanMatrix giữ lại (8 byte/phần tử):
+# giữ được mọi hàng tới ~8000 node, lớn hơn thì loại bỏ theo LRU
+LAZY_ROW_CACHE_BYTES = 512 * 1024 * 1024
+
+# Số hàng tính cùng lúc khi vector hóa (giới hạn bộ nhớ tạm)
+DISTANCE_BLOCK_ROWS = 256
+
+
+def euclidean_distances(coordinates, rows=None, rounding=None):
+    """
+    Khoảng cách Euclidean (vector hóa) từ các node trong rows tới mọi node.
+
+    Args:
+        coordinates (ndarray): Tọa độ n x 2
+        rows (array-like): Chỉ số các node nguồn (None = mọi node)
+        rounding (int): Số chữ số thập phân được làm tròn (None = giữ nguyên)
+
+    Returns:
+        ndarray: len(rows) x n
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    rows = np.arange(len(coordinates)) if rows is None else np.asarray(rows)
+    distances = np.empty((len(rows), len(coordinates)))
+    # Blocks of rows bound the n x n x 2 temporary; every entry is computed the same way
+    for start in range(0, len(rows), DISTANCE_BLOCK_ROWS):
+        block = slice(start, start + DISTANCE_BLOCK_ROWS)
+        diff = coordinates[rows[block], None, :] - coordinates[None, :, :]
+        np.sqrt(np.einsum('ijk,ijk->ij', diff, diff), out=distances[block])
+    if rounding is not None:
+        np.round(distances, rounding, out=distances)
+    return distances
+
+
+def cost_row_blocks(cost_matrix, block_rows=None):
+    """
+    Duyệt ma trận chi phí theo khối hàng, không tạo ma trận n x n đầy đủ
+    (LazyEuclideanMatrix được tính trực tiếp từ tọa độ).
+
+    Yields:
+        tuple: (start, block) với block là ndarray float64 mới (ghi được),
+            các hàng start .. start + len(block) - 1
+    """
+    block_rows = block_rows or DISTANCE_BLOCK_ROWS
+    n = len(cost_matrix)
+    for start in range(0, n, block_rows):
+        stop = min(n, start + block_rows)
+        if isinstance(cost_matrix, LazyEuclideanMatrix):
+            block = euclidean_distances(cost_matrix.coordinates, range(start, stop), cost_matrix.rounding)
+        else:
+            block = np.array([cost_matrix[i] for i in range(start, stop)], dtype=np.float64)
+        yield start, block
+
+
+class CoordinateCostMatrix(list):
+    """
+    Ma trận chi phí (list of lists) tính từ tọa độ, giữ kèm tọa độ gốc
+    (coordinates) để visualization không phải dựng lại bằng MDS.
+    """
+
+    def __init__(self, rows, coordinates, rounding=None):
+        super().__init__(rows)
+        self.coordinates = coordinates
+        self.rounding = rounding
+
+
+class LazyEuclideanMatrix:
+    """
+    Ma trận chi phí Euclidean không tạo đầy đủ: mỗi hàng được tính vector hóa
+    khi được truy cập lần đầu và được giữ lại dạng array('d') (8 byte/phần tử,
+    truy cập phần tử nhanh như list). Mặc định cache giữ mọi hàng nếu vừa
+    LAZY_ROW_CACHE_BYTES (VND duyệt lặp lại toàn bộ các hàng, LRU nhỏ hơn
+    instance sẽ tính lại liên tục), nếu không thì giữ theo LRU trong giới hạn đó.
+
+    Dùng được như list of lists (cost_matrix[i][j], len, duyệt hàng);
+    np.asarray(matrix) tạo ma trận đầy đủ (chỉ dùng khi thật cần, Savings và
+    danh sách láng giềng duyệt theo khối bằng cost_row_blocks).
+    row_misses đếm số hàng đã phải tính.
+    """
+
+    def __init__(self, coordinates, rounding=None, cache_size=None):
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+        self.rounding = rounding
+        n = len(self.coordinates)
+        if cache_size is None:
+            cache_size = min(n, max(1, LAZY_ROW_CACHE_BYTES // (8 * max(n, 1))))
+        self.cache_size = cache_size
+        self.row_misses = 0
+        self._rows = OrderedDict()
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def __getitem__(self, i):
+        rows = self._rows
+        row = rows.get(i)
+        if row is not None:
+            rows.move_to_end(i)
+            return row
+        if i < 0:
+            i += len(self.coordinates)
+        if not 0 <= i < len(self.coordinates):
+            raise IndexError('cost matrix row index out of range')
+        row = array('d', euclidean_distances(self.coordinates, [i], self.rounding)[0].tobytes())
+        self.row_misses += 1
+        rows[i] = row
+        if len(rows) > self.cache_size:
+            rows.popitem(last=False)
+        return row
+
+    def __iter__(self):
+        for i in range(len(self.coordinates)):
+            yield self[i]
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = euclidean_distances(self.coordinates, rounding=self.rounding)
+        return matrix if dtype is None else matrix.astype(dtype)
+
+    def __reduce__(self):
+        # Workers recompute rows from the coordinates instead of receiving them
+        return type(self), (self.coordinates, self.rounding, self.cache_size)
+
+
+def coordinate_cost_matrix(coordinates, rounding=None):
+    """
+    Ma trận chi phí Euclidean cho instance dạng tọa độ: CoordinateCostMatrix
+    đầy đủ cho instance nhỏ, LazyEuclideanMatrix từ LAZY_MATRIX_MIN_NODES node.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    if len(coordinates) >= LAZY_MATRIX_MIN_NODES:
+        return LazyEuclideanMatrix(coordinates, rounding)
+    rows = euclidean_distances(coordinates, rounding=rounding).tolist()
+    return CoordinateCostMatrix(rows, coordinates, rounding)
@@ -3,72 +3,288 @@ File Parser Module for VRPSPD
 Đọc và parse các file txt chứa dữ liệu VRPSPD
 """
 
+import hashlib
+import itertools
+import os
 
-def read_vrpspd_file(file_path):
+import numpy as np
+
+from .distance import coordinate_cost_matrix
+from .utils import save_atomic
+
+# Thư mục chứa cache nhị phân, tạo cạnh file txt
+INSTANCE_CACHE_DIR = '.instance_cache'
+
+# Tăng khi định dạng cache thay đổi (cache cũ tự bị bỏ qua)
+INSTANCE_CACHE_VERSION = 2
+
+# Dung lượng tối đa của mỗi thư mục cache; instance ít được dùng nhất
+# (kể cả cache của phiên bản cũ) bị xóa trước
+INSTANCE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def file_content_hash(file_path):
+    """SHA-256 (hex) của nội dung file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def instance_cache_paths(file_path, content_hash):
+    """Đường dẫn (ma trận .npy, vector .npz) của cache nhị phân cho file."""
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), INSTANCE_CACHE_DIR)
+    stem = f"{content_hash[:32]}-v{INSTANCE_CACHE_VERSION}"
+    return os.path.join(cache_dir, stem + '.npy'), os.path.join(cache_dir, stem + '.npz')
+
+
+# Các mảng nhỏ lưu trong file .npz của cache (ma trận chi phí lưu riêng .npy)
+_VECTOR_KEYS = ('delivery', 'pickup', 'vehicle_capacities', 'coordinates', 'distance_rounding')
+
+
+def _write_instance_cache(matrix_path, vectors_path, instance):
+    """Ghi cache nhị phân; lỗi ghi (thư mục chỉ đọc, đầy đĩa) được bỏ qua."""
+    try:
+        os.makedirs(os.path.dirname(matrix_path), exist_ok=True)
+        if instance['cost_matrix'] is not None:
+            save_atomic(matrix_path, np.save, instance['cost_matrix'])
+        save_atomic(vectors_path, lambda f, data: np.savez(f, **data),
+                    {key: instance[key] for key in _VECTOR_KEYS if instance[key] is not None})
+        _prune_instance_cache(os.path.dirname(matrix_path))
+    except OSError:
+        pass
+
+
+def _prune_instance_cache(cache_dir, max_bytes=None):
+    """Xóa cache của các instance ít được dùng nhất (theo mtime) khi thư mục vượt max_bytes."""
+    max_bytes = INSTANCE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    # stem -> [last used, total size, paths]; the .npy and .npz of an instance go together
+    entries = {}
+    for item in os.scandir(cache_dir):
+        stem, ext = os.path.splitext(item.name)
+        if ext not in ('.npy', '.npz'):
+            continue
+        try:
+            stat = item.stat()
+        except OSError:
+            continue  # Removed by another process
+        entry = entries.setdefault(stem, [0.0, 0, []])
+        entry[0] = max(entry[0], stat.st_mtime)
+        entry[1] += stat.st_size
+        entry[2].append(item.path)
+    total = sum(size for _, size, _ in entries.values())
+    for _, size, paths in sorted(entries.values()):
+        if total <= max_bytes:
+            break
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        total -= size
+
+
+def _read_instance_cache(matrix_path, vectors_path):
+    """Đọc cache nhị phân, trả về None nếu chưa có hoặc bị hỏng."""
+    if not os.path.exists(vectors_path):
+        return None
+    try:
+        # Last use decides what _prune_instance_cache removes first
+        os.utime(vectors_path)
+        with np.load(vectors_path) as vectors:
+            instance = {key: vectors[key] if key in vectors else None for key in _VECTOR_KEYS}
+        if instance['distance_rounding'] is not None:
+            instance['distance_rounding'] = int(instance['distance_rounding'])
+        instance['cost_matrix'] = None
+        if instance['coordinates'] is None:
+            instance['cost_matrix'] = np.load(matrix_path, mmap_mode='r')
+        return instance
+    except (OSError, ValueError, KeyError):
+        return None  # Corrupt or partial cache: parse again and overwrite it
+
+
+def load_instance_arrays(file_path, use_cache=True, content_hash=None):
+    """
+    Đọc instance dưới dạng mảng NumPy, dùng cache nhị phân theo nội dung file.
+    
+    Lần đầu file được parse và các mảng được ghi vào INSTANCE_CACHE_DIR cạnh
+    file (khóa là SHA-256 nội dung); các lần sau ma trận được mở bằng
+    np.load(mmap_mode='r') mà không parse lại. File bị sửa có hash mới nên
+    không bao giờ đọc phải cache cũ. content_hash có thể truyền vào nếu đã tính.
+    Thư mục cache được giới hạn ở INSTANCE_CACHE_MAX_BYTES (LRU theo mtime).
+    
+    Returns:
+        dict: {
+            'cost_matrix': ndarray (n x n, float64) hoặc None với instance dạng tọa độ,
+            'coordinates': ndarray (n x 2) hoặc None,
+            'distance_rounding': int hoặc None,
+            'delivery': ndarray (int, gồm depot),
+            'pickup': ndarray (int, gồm depot),
+            'vehicle_capacities': ndarray (float),
+            'content_hash': str
+        }
+    """
+    if content_hash is None:
+        content_hash = file_content_hash(file_path)
+    matrix_path, vectors_path = instance_cache_paths(file_path, content_hash)
+    
+    instance = _read_instance_cache(matrix_path, vectors_path) if use_cache else None
+    if instance is None:
+        instance = parse_vrpspd_text(file_path)
+        if use_cache:
+            _write_instance_cache(matrix_path, vectors_path, instance)
+    instance['content_hash'] = content_hash
+    return instance
+
+
+def read_vrpspd_file(file_path, use_cache=True):
     """
     Đọc file VRPSPD và trả về các thông số cần thiết.
     
+    Với instance dạng tọa độ, cost_matrix là ma trận Euclidean tính vector hóa
+    (xem coordinate_cost_matrix), mang theo thuộc tính coordinates.
+    
     Args:
         file_path (str): Đường dẫn đến file txt
+        use_cache (bool): Dùng/ghi cache nhị phân (xem load_instance_arrays)
         
     Returns:
         tuple: (cost_matrix, delivery, pickup, vehicle_capacities, capacityOfVehicle, numberOfVehicles)
     """
-    with open(file_path, "r") as f:
-        lines = [line.strip() for line in f.readlines() if line.strip() and "~" not in line]
+    return problem_data_from_arrays(load_instance_arrays(file_path, use_cache))
 
-    cost_matrix = []
-    delivery = []
-    pickup = []
-    vehicle_capacities = []
 
-    i = 0
+def problem_data_from_arrays(instance):
+    """
+    Chuyển kết quả của load_instance_arrays thành bộ dữ liệu mà các thuật toán dùng.
+    
+    Returns:
+        tuple: (cost_matrix, delivery, pickup, vehicle_capacities, capacityOfVehicle, numberOfVehicles)
+    """
+    if instance['coordinates'] is not None:
+        cost_matrix = coordinate_cost_matrix(instance['coordinates'], instance['distance_rounding'])
+    else:
+        cost_matrix = instance['cost_matrix'].tolist()
+    delivery = instance['delivery'].tolist()
+    pickup = instance['pickup'].tolist()
+    vehicle_capacities = instance['vehicle_capacities'].tolist()
+    
+    # === FINAL VARIABLES ===
+    numberOfVehicles = len(vehicle_capacities)
 
-    # 1. Read cost matrix
-    if i < len(lines) and "Cost matrix" in lines[i]:
-        i += 1
+    # If all vehicles have same capacity -> use that as capacityOfVehicle
+    if len(set(vehicle_capacities)) == 1:
+        capacityOfVehicle = vehicle_capacities[0]
+    else:
+        # Different capacity vehicles - use max
+        capacityOfVehicle = max(vehicle_capacities)
 
-    # Đọc từng dòng số -> ma trận
-    while i < len(lines) and "Delivery quantities" not in lines[i]:
-        row = list(map(float, lines[i].split()))
-        cost_matrix.append(row)
-        i += 1
+    return cost_matrix, delivery, pickup, vehicle_capacities, capacityOfVehicle, numberOfVehicles
 
-    # 2. Read delivery
-    if i < len(lines) and "Delivery quantities" in lines[i]:
-        i += 1
 
-    if i < len(lines):
-        delivery = list(map(int, map(float, lines[i].split())))
-        i += 1
+def _iter_data_lines(f):
+    """Các dòng khác rỗng (đã strip) của file, bỏ qua dòng phân cách '~'."""
+    for line in f:
+        line = line.strip()
+        if line and "~" not in line:
+            yield line
+
+
+def _parse_values(line, dtype=np.float64):
+    """Một dòng số -> mảng 1 chiều."""
+    return np.array(line.split(), dtype=np.float64).astype(dtype, copy=False)
+
 
+def parse_vrpspd_text(file_path):
+    """
+    Parse file txt VRPSPD thành mảng NumPy.
+    
+    Khối đầu tiên là "Cost matrix;" (n dòng, mỗi dòng n số) hoặc
+    "Coordinates;" (n dòng "x y" hoặc "id x y", node 0 là depot). Với dạng tọa
+    độ có thể thêm section "Distance rounding;" (số chữ số thập phân) sau
+    "Vehicle capacity;". Khối đầu được đọc dạng stream bằng bộ parse C của
+    np.loadtxt (không tạo list trung gian cho từng dòng).
+    
+    Returns:
+        dict: Các khóa như load_instance_arrays (trừ 'content_hash'),
+            delivery/pickup gồm depot
+    
+    Raises:
+        ValueError: Ma trận chi phí không vuông, tọa độ sai số cột hoặc
+            giá trị không phải số
+    """
+    cost_matrix = None
+    coordinates = None
+    
+    with open(file_path, "r") as f:
+        lines = _iter_data_lines(f)
+        
+        # 1. Read cost matrix or coordinates (header is optional for the matrix)
+        first = next(lines, None)
+        is_coordinates = first is not None and "Coordinates" in first
+        if first is not None and "Cost matrix" not in first and not is_coordinates:
+            lines = itertools.chain([first], lines)
+        block_rows = itertools.takewhile(lambda line: "Delivery quantities" not in line, lines)
+        block = np.loadtxt(block_rows, dtype=np.float64, ndmin=2)
+        
+        if is_coordinates:
+            if block.shape[1] not in (2, 3):
+                raise ValueError(f"Coordinates must have 2 (x y) or 3 (id x y) columns, "
+                                 f"got {block.shape[1]}")
+            coordinates = np.ascontiguousarray(block[:, -2:])
+        else:
+            if block.shape[0] != block.shape[1]:
+                raise ValueError(f"Cost matrix must be square, got {block.shape[0]} rows "
+                                 f"of {block.shape[1]} values")
+            cost_matrix = block
+        
+        # The "Delivery quantities" header was consumed by takewhile
+        rest = list(lines)
+    
+    delivery = np.zeros(0, dtype=np.int64)
+    pickup = np.zeros(0, dtype=np.int64)
+    vehicle_capacities = np.zeros(0, dtype=np.float64)
+    distance_rounding = None
+    
+    i = 0
+    
+    # 2. Read delivery
+    if i < len(rest):
+        delivery = _parse_values(rest[i], np.int64)
+        i += 1
+    
     # 3. Read pickup
-    if i < len(lines) and "Pick-up quantities" in lines[i]:
+    if i < len(rest) and "Pick-up quantities" in rest[i]:
         i += 1
-
-    if i < len(lines):
-        pickup = list(map(int, map(float, lines[i].split())))
+    
+    if i < len(rest):
+        pickup = _parse_values(rest[i], np.int64)
         i += 1
-
+    
     # 4. Read vehicle capacity (LIST of capacities)
-    if i < len(lines) and "Vehicle capacity" in lines[i]:
+    if i < len(rest) and "Vehicle capacity" in rest[i]:
         i += 1
-        if i < len(lines):
-            vehicle_capacities = list(map(float, lines[i].split()))
+        if i < len(rest):
+            vehicle_capacities = _parse_values(rest[i])
             i += 1
-
+    
+    # 5. Optional rounding of coordinate distances
+    if i < len(rest) and "Distance rounding" in rest[i]:
+        i += 1
+        if i < len(rest):
+            distance_rounding = int(rest[i])
+            i += 1
+    
     # === ADD DEPOT ===
-    delivery = [0] + delivery
-    pickup = [0] + pickup
-
-    # === FINAL VARIABLES ===
-    numberOfVehicles = len(vehicle_capacities)
-
-    # If all vehicles have same capacity -> use that as capacityOfVehicle
-    if len(set(vehicle_capacities)) == 1:
-        capacityOfVehicle = vehicle_capacities[0]
-    else:
-        # Different capacity vehicles - use max
-        capacityOfVehicle = max(vehicle_capacities)
-
-    return cost_matrix, delivery, pickup, vehicle_capacities, capacityOfVehicle, numberOfVehicles
+    delivery = np.concatenate(([0], delivery)).astype(np.int64)
+    pickup = np.concatenate(([0], pickup)).astype(np.int64)
+    
+    return {
+        'cost_matrix': cost_matrix,
+        'coordinates': coordinates,
+        'distance_rounding': distance_rounding,
+        'delivery': delivery,
+        'pickup': pickup,
+        'vehicle_capacities': vehicle_capacities
+    }
@@ -0,0 +1,243 @@
+"""
+Iterated Local Search (ILS) for VRPSPD
+Lặp nhiễu (perturbation) + VND cho tới hết thời gian, thay vì dừng ở cực tiểu địa phương đầu tiên
+"""
+
+import math
+import random
+import time
+
+from .utils import (
+    convert_vector_to_routes,
+    convert_routes_to_vector,
+    calculate_total_cost,
+    build_neighbor_lists,
+    check_single_route_feasibility,
+    feasibility_check_and_repair
+)
+from .vnd import solve_vnd, IntraRouteCache, ParallelInterSearch, IMPROVEMENT_EPS
+from .cancellation import CancellationToken
+
+# Tiêu chí chấp nhận lời giải sau mỗi vòng perturbation + VND:
+#   'better'    - chỉ nhận lời giải tốt hơn lời giải hiện tại
+#   'threshold' - nhận lời giải không tệ hơn best quá acceptance_threshold (tương đối)
+#   'annealing' - simulated annealing, nhiệt độ ban đầu acceptance_threshold x chi phí,
+#                 giảm tuyến tính về 0 theo thời gian
+ILS_ACCEPTANCE = ('better', 'threshold', 'annealing')
+ILS_DEFAULT_THRESHOLD = 0.01
+
+# Perturbation: 'segment' (đổi hai đoạn giữa hai tuyến), 'ruin' (ruin-and-recreate)
+# hoặc 'mixed' (chọn ngẫu nhiên mỗi vòng)
+ILS_PERTURBATIONS = ('segment', 'ruin', 'mixed')
+
+# Tỉ lệ khách hàng bị gỡ ra trong ruin-and-recreate (tối thiểu 2)
+ILS_RUIN_FRACTION = 0.1
+
+# Độ dài tối đa của đoạn được đổi trong segment exchange
+ILS_SEGMENT_MAX_LEN = 3
+
+# Số lần thử tìm một segment exchange khả thi
+ILS_PERTURB_ATTEMPTS = 20
+
+
+def _segment_exchange(routes, rng, demand, pickup, capacity, max_len=ILS_SEGMENT_MAX_LEN):
+    """Đổi hai đoạn ngẫu nhiên giữa hai tuyến (tuyến được đảo chiều nếu cần để khả thi)."""
+    candidates = [idx for idx, route in enumerate(routes) if route]
+    if len(candidates) < 2:
+        return False
+    for _ in range(ILS_PERTURB_ATTEMPTS):
+        a, b = rng.sample(candidates, 2)
+        route_A, route_B = routes[a], routes[b]
+        len_A = rng.randint(1, min(max_len, len(route_A)))
+        len_B = rng.randint(1, min(max_len, len(route_B)))
+        i = rng.randrange(len(route_A) - len_A + 1)
+        j = rng.randrange(len(route_B) - len_B + 1)
+        new_A = route_A[:i] + route_B[j:j + len_B] + route_A[i + len_A:]
+        new_B = route_B[:j] + route_A[i:i + len_A] + route_B[j + len_B:]
+        feasible, repaired = feasibility_check_and_repair([new_A, new_B], capacity, demand, pickup)
+        if feasible:
+            routes[a], routes[b] = repaired
+            return True
+    return False
+
+
+def _ruin_recreate(routes, rng, cost_matrix, demand, pickup, capacity, ruin_size, neighbor_lists):
+    """
+    Gỡ ruin_size khách hàng (ngẫu nhiên hoặc một cụm gần nhau) rồi chèn lại
+    từng khách vào vị trí khả thi rẻ nhất (mở tuyến mới nếu không có).
+    """
+    customers = [c for route in routes for c in route]
+    if len(customers) < 2:
+        return False
+    ruin_size = min(ruin_size, len(customers))
+    if rng.random() < 0.5:
+        removed = rng.sample(customers, ruin_size)
+    else:
+        # Related removal: a seed customer and its nearest neighbours
+        seed = rng.choice(customers)
+        removed = [seed] + neighbor_lists[seed][:ruin_size - 1]
+    removed_set = set(removed)
+    routes[:] = [[c for c in route if c not in removed_set] for route in routes]
+    routes[:] = [route for route in routes if route]
+
+    rng.shuffle(removed)
+    for customer in removed:
+        insertions = []
+        for r, route in enumerate(routes):
+            path = [0] + route + [0]
+            for pos in range(len(route) + 1):
+                prev_node, next_node = path[pos], path[pos + 1]
+                delta = (cost_matrix[prev_node][customer] + cost_matrix[customer][next_node]
+                         - cost_matrix[prev_node][next_node])
+                insertions.append((delta, r, pos))
+        insertions.sort()
+        for delta, r, pos in insertions:
+            new_route = routes[r][:pos] + [customer] + routes[r][pos:]
+            if check_single_route_feasibility(new_route, capacity, demand, pickup):
+                routes[r] = new_route
+                break
+        else:
+            routes.append([customer])
+    return True
+
+
+def _accept(acceptance, candidate_cost, current_cost, best_cost, threshold, temperature, rng):
+    if candidate_cost < current_cost - IMPROVEMENT_EPS:
+        return True
+    if acceptance == 'threshold':
+        return candidate_cost <= best_cost * (1 + threshold)
+    if acceptance == 'annealing' and temperature > 0:
+        return rng.random() < math.exp(-(candidate_cost - current_cost) / temperature)
+    return False
+
+
+def solve_ils(initial_vector, cost_matrix, demand, pickup, capacity, max_time_seconds=60,
+              acceptance='better', acceptance_threshold=ILS_DEFAULT_THRESHOLD, perturbation='mixed',
+              ruin_size=None, max_iterations=None, seed=None, progress_callback=None, cancel_token=None,
+              **vnd_options):
+    """
+    Iterated Local Search: VND tới cực tiểu địa phương, rồi lặp perturbation +
+    VND cho tới khi hết max_time_seconds (hoặc max_iterations vòng).
+
+    Args:
+        initial_vector (list): Lời giải ban đầu (từ Savings)
+        cost_matrix, demand, pickup, capacity: Như solve_vnd
+        max_time_seconds (float): Thời gian chạy (ILS dùng hết thời gian này)
+        acceptance (str): Tiêu chí chấp nhận (xem ILS_ACCEPTANCE)
+        acceptance_threshold (float): Ngưỡng tương đối cho 'threshold' / nhiệt độ
+            ban đầu cho 'annealing'
+        perturbation (str): 'segment', 'ruin' hoặc 'mixed' (xem ILS_PERTURBATIONS)
+        ruin_size (int): Số khách hàng bị gỡ trong ruin-and-recreate
+            (mặc định ILS_RUIN_FRACTION số khách hàng)
+        max_iterations (int): Số vòng perturbation tối đa (None = tới hết giờ)
+        seed (int): Seed cho perturbation / acceptance (None = ngẫu nhiên)
+        progress_callback (callable): Như solve_vnd, gọi khi best được cải thiện;
+            'iterations' là số vòng ILS
+        cancel_token (CancellationToken): Dừng sớm, trả về best
+        **vnd_options: Tham số cho mỗi lần gọi solve_vnd (strategy, granular_k, ...);
+            workers > 1 tạo một ParallelInterSearch dùng chung cho mọi lần gọi
+
+    Returns:
+        dict: Như solve_vnd (converged luôn False), thêm 'ils_iterations'
+            và 'ils_accepted' (số vòng được chấp nhận)
+
+    Raises:
+        ValueError: acceptance / perturbation không hợp lệ, ruin_size < 1,
+            max_iterations < 0 hoặc acceptance_threshold < 0
+    """
+    if acceptance not in ILS_ACCEPTANCE:
+        raise ValueError(f"Unknown acceptance criterion '{acceptance}', expected one of {ILS_ACCEPTANCE}")
+    if perturbation not in ILS_PERTURBATIONS:
+        raise ValueError(f"Unknown perturbation '{perturbation}', expected one of {ILS_PERTURBATIONS}")
+    if ruin_size is not None and ruin_size < 1:
+        raise ValueError(f"ruin_size must be at least 1, got {ruin_size}")
+    if max_iterations is not None and max_iterations < 0:
+        raise ValueError(f"max_iterations must be non-negative, got {max_iterations}")
+    if acceptance_threshold < 0:
+        raise ValueError(f"acceptance_threshold must be non-negative, got {acceptance_threshold}")
+
+    start_time = time.time()
+    cancel_token = CancellationToken(start_time + max_time_seconds, cancel_token)
+    rng = random.Random(seed)
+    num_customers = len(cost_matrix) - 1
+    if ruin_size is None:
+        ruin_size = max(2, round(num_customers * ILS_RUIN_FRACTION))
+    related = build_neighbor_lists(cost_matrix, ruin_size)
+
+    # Shared across descents: most routes are unchanged by a perturbation
+    vnd_options.setdefault('intra_cache', IntraRouteCache())
+    if vnd_options.get('granular_k') and vnd_options.get('neighbor_lists') is None:
+        vnd_options['neighbor_lists'] = build_neighbor_lists(cost_matrix, vnd_options['granular_k'])
+    # One pool (and shared matrix) for the whole run instead of one per descent
+    workers = vnd_options.pop('workers', None)
+    parallel = None
+    if workers is not None and workers > 1:
+        neighbor_lists = vnd_options.get('neighbor_lists') if vnd_options.get('granular_k') else None
+        parallel = ParallelInterSearch(workers, cost_matrix, demand, pickup, capacity, neighbor_lists)
+        vnd_options['parallel_search'] = parallel
+
+    def descend(vector):
+        return solve_vnd(vector, cost_matrix, demand, pickup, capacity,
+                         max_time_seconds=max(0.0, cancel_token.deadline - time.time()),
+                         cancel_token=cancel_token, **vnd_options)
+
+    def report(iterations):
+        if progress_callback is not None:
+            progress_callback({'cost': best['total_cost'], 'k': None, 'iterations': iterations,
+                               'elapsed': round(time.time() - start_time, 3)})
+
+    try:
+        current = best = descend(initial_vector)
+        report(0)
+
+        iterations = 0
+        accepted = 0
+        while not cancel_token.expired() and (max_iterations is None or iterations < max_iterations):
+            routes = [list(route) for route in convert_vector_to_routes(current['solution_vector'])]
+            kind = perturbation if perturbation != 'mixed' else rng.choice(('segment', 'ruin'))
+            if kind == 'segment':
+                changed = _segment_exchange(routes, rng, demand, pickup, capacity)
+            else:
+                changed = _ruin_recreate(routes, rng, cost_matrix, demand, pickup, capacity, ruin_size, related)
+            if not changed:
+                # No feasible segment exchange: fall back to ruin-and-recreate
+                _ruin_recreate(routes, rng, cost_matrix, demand, pickup, capacity, ruin_size, related)
+
+            candidate = descend(convert_routes_to_vector(routes))
+            iterations += 1
+
+            elapsed_fraction = min(1.0, (time.time() - start_time) / max_time_seconds) if max_time_seconds > 0 else 1.0
+            temperature = acceptance_threshold * best['total_cost'] * (1 - elapsed_fraction)
+            if _accept(acceptance, candidate['total_cost'], current['total_cost'], best['total_cost'],
+                       acceptance_threshold, temperature, rng):
+                current = candidate
+                accepted += 1
+            if candidate['total_cost'] < best['total_cost'] - IMPROVEMENT_EPS:
+                best = candidate
+                report(iterations)
+    finally:
+        if parallel is not None:
+            parallel.close()
+
+    initial_cost = calculate_total_cost(initial_vector, cost_matrix)
+    improvement = ((initial_cost - best['total_cost']) / initial_cost * 100) if initial_cost > 0 else 0
+    return {
+        **best,
+        'computation_time': round(time.time() - start_time, 4),
+        'initial_cost': round(initial_cost, 2),
+        'improvement': round(improvement, 2),
+        # Time-bounded and randomised: never treated as reproducible
+        'converged': False,
+        'ils_iterations': iterations,
+        'ils_accepted': accepted
+    }
+
+
+def solve_vnd_or_ils(initial_vector, cost_matrix, demand, pickup, capacity, ils=None, **vnd_options):
+    """
+    solve_vnd, hoặc solve_ils khi ils là dict tùy chọn ILS (acceptance,
+    perturbation, ...; có thể rỗng). Dùng cho các nơi nhận vnd_options từ request.
+    """
+    if ils is None:
+        return solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, **vnd_options)
+    return solve_ils(initial_vector, cost_matrix, demand, pickup, capacity, **ils, **vnd_options)
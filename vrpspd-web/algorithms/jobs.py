@@ -0,0 +1,176 @@
+"""
+Job Queue for VRPSPD Web Application
+Chạy các yêu cầu giải (single / batch) nền trong một pool giới hạn, theo dõi bằng job id
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .cancellation import CancellationToken
+
+# Số job chạy đồng thời tối đa; job còn lại xếp hàng
+JOB_MAX_WORKERS = 2
+
+# Số job đã kết thúc được giữ lại để client lấy kết quả
+JOB_HISTORY_SIZE = 100
+
+# Trạng thái job
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class Job:
+    """
+    Một yêu cầu giải chạy nền.
+
+    Hàm của job nhận chính Job làm tham số đầu tiên để báo tiến độ
+    (update_progress) và truyền job.cancel_token cho các solver; giá trị trả
+    về là result của job. Job bị hủy khi đang chạy vẫn giữ result (lời giải
+    tốt nhất tại thời điểm dừng).
+    """
+
+    __slots__ = ('job_id', 'kind', 'status', 'result', 'error', 'traceback', 'progress',
+                 'created_at', 'started_at', 'finished_at', 'version', 'cancel_token', '_changed')
+
+    def __init__(self, kind):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.progress = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Incremented on every progress/status change (see wait_for_change)
+        self.version = 0
+        self.cancel_token = CancellationToken()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in JOB_FINISHED_STATES
+
+    def update_progress(self, **fields):
+        """Cập nhật (gộp) thông tin tiến độ của job."""
+        with self._changed:
+            self.progress = {**self.progress, **fields}
+            self.version += 1
+            self._changed.notify_all()
+    
+    def set_status(self, status):
+        """Đổi trạng thái job và báo cho các client đang chờ."""
+        with self._changed:
+            if status in JOB_FINISHED_STATES:
+                self.finished_at = time.time()
+            self.status = status
+            self.version += 1
+            self._changed.notify_all()
+    
+    def wait_for_change(self, version, timeout=None):
+        """
+        Chờ đến khi job thay đổi so với version (hoặc hết timeout).
+        
+        Returns:
+            int: version hiện tại (bằng version cũ nếu hết timeout mà không đổi)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def to_dict(self, include_result=True):
+        """Trạng thái job dạng JSON (kèm result khi đã xong hoặc bị hủy giữa chừng)."""
+        now = self.finished_at or time.time()
+        data = {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'created_at': self.created_at,
+            'elapsed': round(now - (self.started_at or now), 4)
+        }
+        if self.error is not None:
+            data['error'] = self.error
+            data['traceback'] = self.traceback
+        if include_result and self.status in (JOB_DONE, JOB_CANCELLED) and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class JobQueue:
+    """
+    Hàng đợi job với pool thread giới hạn (max_workers job chạy cùng lúc).
+    Job đã kết thúc được giữ tối đa history_size job gần nhất.
+    """
+
+    def __init__(self, max_workers=JOB_MAX_WORKERS, history_size=JOB_HISTORY_SIZE):
+        self.max_workers = max_workers
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='vrpspd-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Đưa fn(job, *args, **kwargs) vào hàng đợi, trả về Job ngay lập tức."""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """Job theo id, hoặc None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Hủy job: job đang xếp hàng kết thúc ngay, job đang chạy được yêu cầu
+        dừng qua cancel_token (solver trả về lời giải tốt nhất đã có).
+        
+        Returns:
+            Job or None: Job (None nếu không tồn tại)
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_token.cancel()
+        with job._changed:
+            if job.status == JOB_QUEUED:
+                job.set_status(JOB_CANCELLED)
+        return job
+    
+    def _run(self, job, fn, args, kwargs):
+        with job._changed:
+            if job.finished:
+                return  # Cancelled while queued
+            job.started_at = time.time()
+            job.set_status(JOB_RUNNING)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            status = JOB_CANCELLED if job.cancel_token.cancelled else JOB_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.traceback = traceback.format_exc()
+            status = JOB_FAILED
+        # Status last: a poller that sees a finished job also sees its result
+        job.set_status(status)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        """Dừng pool (job đang chạy được chạy xong nếu wait=True)."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
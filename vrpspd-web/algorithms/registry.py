@@ -0,0 +1,163 @@
+"""
+Instance Registry for VRPSPD
+Lưu các instance đã parse trong bộ nhớ process, khóa theo hash nội dung file
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .file_parser import file_content_hash, load_instance_arrays, problem_data_from_arrays
+from .distance import LazyEuclideanMatrix
+from .utils import build_neighbor_lists
+from .visualization import generate_coordinates_from_cost_matrix
+
+# Số instance tối đa được giữ
+REGISTRY_MAX_INSTANCES = 32
+
+# Bộ nhớ tối đa (ước lượng, byte) cho dữ liệu đã parse của các instance
+REGISTRY_MAX_BYTES = 512 * 1024 * 1024
+
+# Độ dài instance_id (tiền tố hex của SHA-256 nội dung file)
+INSTANCE_ID_LENGTH = 16
+
+
+def estimate_matrix_nbytes(cost_matrix):
+    """Ước lượng bộ nhớ của cost_matrix (list of lists float hoặc ma trận lười)."""
+    n = len(cost_matrix)
+    if isinstance(cost_matrix, LazyEuclideanMatrix):
+        return cost_matrix.coordinates.nbytes + cost_matrix.cache_size * n * 8
+    # 8-byte pointer + 24-byte float object per entry, plus the row lists
+    return n * n * 32 + n * 56
+
+
+def estimate_nested_list_nbytes(rows):
+    """Ước lượng bộ nhớ của list of lists số (danh sách láng giềng, tọa độ)."""
+    # Row list overhead, plus an 8-byte pointer and a (non-cached) 28-byte number per entry
+    return sum(56 + 36 * len(row) for row in rows)
+
+
+class ProblemInstance:
+    """
+    Một instance đã parse cùng các dữ liệu suy ra được tính lười và giữ lại
+    (danh sách láng giềng theo k, tọa độ cho visualization). nbytes gồm cả
+    các dữ liệu suy ra này và được cập nhật (kèm registry) khi chúng được tạo.
+    """
+
+    __slots__ = ('instance_id', 'content_hash', 'file_path', 'data', 'nbytes',
+                 '_neighbor_lists', '_coordinates', '_registry')
+
+    def __init__(self, content_hash, file_path, data):
+        self.instance_id = content_hash[:INSTANCE_ID_LENGTH]
+        self.content_hash = content_hash
+        self.file_path = file_path
+        # (cost_matrix, demand, pickup, vehicle_capacities, capacity, num_vehicles)
+        self.data = data
+        self.nbytes = estimate_matrix_nbytes(data[0])
+        self._neighbor_lists = {}
+        self._coordinates = None
+        self._registry = None
+
+    @property
+    def cost_matrix(self):
+        return self.data[0]
+
+    @property
+    def num_customers(self):
+        return len(self.data[0]) - 1
+
+    def neighbor_lists(self, k):
+        """build_neighbor_lists(cost_matrix, k), tính một lần cho mỗi k."""
+        neighbors = self._neighbor_lists.get(k)
+        if neighbors is None:
+            neighbors = build_neighbor_lists(self.cost_matrix, k)
+            if self._neighbor_lists.setdefault(k, neighbors) is neighbors:
+                self._grow(estimate_nested_list_nbytes(neighbors))
+        return neighbors
+
+    def coordinates(self):
+        """Tọa độ 2D cho visualization: tọa độ thật nếu có, nếu không thì MDS (tính một lần)."""
+        if self._coordinates is None:
+            coordinates = getattr(self.cost_matrix, 'coordinates', None)
+            if coordinates is not None:
+                self._coordinates = np.asarray(coordinates).tolist()
+            else:
+                self._coordinates = generate_coordinates_from_cost_matrix(self.cost_matrix)
+            self._grow(estimate_nested_list_nbytes(self._coordinates))
+        return self._coordinates
+
+    def _grow(self, nbytes):
+        if self._registry is not None:
+            self._registry._resize(self, nbytes)
+        else:
+            self.nbytes += nbytes
+
+
+class InstanceRegistry:
+    """
+    Registry các ProblemInstance khóa theo hash nội dung file, loại bỏ theo
+    LRU khi vượt số instance hoặc bộ nhớ ước lượng cho phép (instance mới
+    nhất luôn được giữ). An toàn khi dùng từ nhiều thread.
+    """
+
+    def __init__(self, max_instances=REGISTRY_MAX_INSTANCES, max_bytes=REGISTRY_MAX_BYTES):
+        self.max_instances = max_instances
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._instances = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._instances)
+
+    def __contains__(self, instance_id):
+        return instance_id in self._instances
+
+    def get(self, instance_id):
+        """ProblemInstance theo instance_id, hoặc None nếu chưa có / đã bị loại."""
+        with self._lock:
+            instance = self._instances.get(instance_id)
+            if instance is not None:
+                self._instances.move_to_end(instance_id)
+            return instance
+
+    def load(self, file_path):
+        """
+        Trả về ProblemInstance của file; chỉ parse (hoặc đọc cache nhị phân)
+        khi nội dung file chưa có trong registry.
+        """
+        content_hash = file_content_hash(file_path)
+        instance = self.get(content_hash[:INSTANCE_ID_LENGTH])
+        if instance is not None:
+            return instance
+
+        # Parse outside the lock so other requests are not blocked
+        arrays = load_instance_arrays(file_path, content_hash=content_hash)
+        instance = ProblemInstance(content_hash, file_path, problem_data_from_arrays(arrays))
+
+        with self._lock:
+            existing = self._instances.get(instance.instance_id)
+            if existing is not None:
+                return existing
+            self._instances[instance.instance_id] = instance
+            instance._registry = self
+            self.nbytes += instance.nbytes
+            self._evict()
+        return instance
+
+    def _resize(self, instance, nbytes):
+        """Instance vừa giữ thêm nbytes (dữ liệu suy ra); loại bỏ instance khác nếu cần."""
+        with self._lock:
+            instance.nbytes += nbytes
+            if self._instances.get(instance.instance_id) is instance:
+                self.nbytes += nbytes
+                self._instances.move_to_end(instance.instance_id)
+                self._evict()
+
+    def _evict(self):
+        # Caller holds the lock; the most recently used instance is always kept
+        while len(self._instances) > 1 and (len(self._instances) > self.max_instances
+                                            or self.nbytes > self.max_bytes):
+            _, evicted = self._instances.popitem(last=False)
+            self.nbytes -= evicted.nbytes
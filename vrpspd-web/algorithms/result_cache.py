@@ -0,0 +1,185 @@
+"""
+Result Cache for VRPSPD
+Cache kết quả giải trên đĩa, khóa theo nội dung instance + thuật toán + tham số + phiên bản code,
+và lời giải tốt nhất đã biết (incumbent) của mỗi instance để warm-start VND
+"""
+
+import functools
+import glob
+import hashlib
+import json
+import os
+
+from .utils import save_atomic
+
+# Thư mục cache (cạnh file upload)
+RESULT_CACHE_DIR = '.result_cache'
+
+# Dung lượng tối đa của cache trên đĩa; file ít được dùng nhất bị xóa trước
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Thư mục con chứa incumbent (không tính vào dung lượng và không bị loại bỏ)
+INCUMBENT_DIR = 'incumbents'
+
+# Tham số VND không làm đổi lời giải đã hội tụ (hoặc không phải tham số)
+_IGNORED_VND_OPTIONS = ('max_time_seconds', 'cancel_token', 'progress_callback', 'neighbor_lists',
+                        'intra_cache', 'parallel_search')
+
+
+@functools.lru_cache(maxsize=1)
+def solver_code_version():
+    """Hash mã nguồn package algorithms: sửa solver là cache cũ tự mất hiệu lực."""
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(package_dir, '*.py'))):
+        with open(path, 'rb') as f:
+            digest.update(os.path.basename(path).encode('utf-8'))
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def solver_params(algorithms, vnd_options=None):
+    """
+    Phần cấu hình quyết định kết quả: danh sách thuật toán và tham số VND.
+
+    max_time_seconds bị bỏ qua vì chỉ kết quả đã hội tụ mới được cache.
+    workers chỉ bị bỏ qua khi VND song song cho cùng lời giải với tuần tự
+    (strategy='best' không có eval_budget); với 'first' / 'sampled' hoặc
+    eval_budget, mỗi chunk dừng riêng nên đường tìm kiếm khác.
+    """
+    params = {'algorithms': sorted(set(algorithms))}
+    if 'vnd' in algorithms:
+        options = {key: value for key, value in (vnd_options or {}).items() if key not in _IGNORED_VND_OPTIONS}
+        deterministic = options.get('strategy', 'best') == 'best' and options.get('eval_budget') is None
+        if (options.get('workers') or 1) <= 1 or deterministic:
+            options.pop('workers', None)
+        params['vnd_options'] = options
+    return params
+
+
+def is_cacheable(results, cancel_token=None):
+    """
+    Kết quả có tái lập được không: không bị hủy / hết giờ giữa chừng và VND
+    (nếu có) đã hội tụ.
+    """
+    if cancel_token is not None and cancel_token.expired():
+        return False
+    vnd = results.get('vnd')
+    return vnd is None or bool(vnd.get('converged'))
+
+
+class ResultCache:
+    """
+    Cache kết quả trên đĩa: mỗi entry là một file JSON
+    {'results': {...}, 'problem_info': {...}} đặt tên theo khóa.
+
+    Ghi qua file tạm + os.replace nên nhiều thread/process dùng chung được;
+    get() cập nhật mtime để loại bỏ theo LRU khi vượt max_bytes. Incumbent
+    của mỗi instance nằm trong thư mục con INCUMBENT_DIR (<hash>.json) và
+    không bao giờ bị loại bỏ.
+
+    Usage:
+        cache = ResultCache('static/uploads/.result_cache')
+        key = cache.key(instance.content_hash, ['savings', 'vnd'], vnd_options)
+        entry = cache.get(key)
+        if entry is None and is_cacheable(results):
+            cache.put(key, {'results': results, 'problem_info': problem_info})
+    """
+
+    def __init__(self, directory, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, content_hash, algorithms, vnd_options=None):
+        """Khóa của (nội dung instance, thuật toán, tham số, phiên bản code)."""
+        payload = json.dumps({
+            'content_hash': content_hash,
+            'params': solver_params(algorithms, vnd_options),
+            'code_version': solver_code_version()
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """Entry đã lưu, hoặc None nếu chưa có / bị hỏng."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        """Lưu entry; lỗi ghi (thư mục chỉ đọc, đầy đĩa) được bỏ qua."""
+        data = json.dumps(entry).encode('utf-8')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            save_atomic(self._path(key), lambda f, payload: f.write(payload), data)
+            self._evict()
+        except OSError:
+            pass
+
+    def _incumbent_path(self, content_hash):
+        return os.path.join(self.directory, INCUMBENT_DIR, f"{content_hash[:32]}.json")
+
+    def incumbent(self, content_hash):
+        """
+        Lời giải tốt nhất đã biết của instance {'solution_vector', 'total_cost'},
+        hoặc None (chưa có / file hỏng). Không phụ thuộc tham số / phiên bản code.
+        """
+        try:
+            with open(self._incumbent_path(content_hash), 'r', encoding='utf-8') as f:
+                incumbent = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(incumbent, dict):
+            return None
+        vector, total_cost = incumbent.get('solution_vector'), incumbent.get('total_cost')
+        if (not isinstance(vector, list) or not all(type(node) is int for node in vector)
+                or type(total_cost) not in (int, float)):
+            return None
+        return {'solution_vector': vector, 'total_cost': total_cost}
+
+    def offer_incumbent(self, content_hash, solution_vector, total_cost):
+        """
+        Lưu lời giải nếu tốt hơn incumbent hiện có (best-effort: hai request
+        cùng lúc có thể ghi đè nhau).
+
+        Returns:
+            bool: True nếu lời giải trở thành incumbent
+        """
+        current = self.incumbent(content_hash)
+        if current is not None and current['total_cost'] <= total_cost:
+            return False
+        data = json.dumps({'solution_vector': list(solution_vector), 'total_cost': total_cost}).encode('utf-8')
+        path = self._incumbent_path(content_hash)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_atomic(path, lambda f, payload: f.write(payload), data)
+        except OSError:
+            return False
+        return True
+
+    def _evict(self):
+        files = []
+        # Incumbents live in a subdirectory and are never evicted
+        for item in os.scandir(self.directory):
+            if item.name.endswith('.json') and item.is_file():
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue  # Removed by another process
+                files.append((stat.st_mtime, stat.st_size, item.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
@@ -4,23 +4,94 @@ Thuật toán Savings-based cho Vehicle Routing Problem with Simultaneous Pickup
 """
 
 import time
+import numpy as np
+from .distance import cost_row_blocks
 from .utils import (
-    route_distance, 
-    feasibility_check_route, 
-    convert_routes_to_vector,
-    calculate_total_cost
+    feasibility_check_route,
+    customer_segment,
+    reverse_segment,
+    concat_segments
 )
+from .solution import Solution
 
+# Số cặp savings được xử lý giữa hai lần kiểm tra cancel_token
+SAVINGS_CANCEL_CHECK_INTERVAL = 4096
 
-def find_route_index(routes, cust):
-    """Tìm chỉ số của tuyến chứa khách hàng cust."""
-    for idx, r in enumerate(routes):
-        if cust in r:
-            return idx
-    return None
+# Số cặp (i, j) được chuyển sang Python mỗi lần (compute_savings_pairs_numpy)
+SAVINGS_PAIR_CHUNK = 65536
 
 
-def solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles):
+def find_route_id(parent, cust):
+    """
+    Tìm route id (gốc union-find) của khách hàng cust, có nén đường đi.
+    
+    Args:
+        parent (list): Mảng cha của union-find, parent[c] == c nếu c là gốc
+        cust (int): Khách hàng
+        
+    Returns:
+        int: Route id
+    """
+    while parent[cust] != cust:
+        parent[cust] = parent[parent[cust]]
+        cust = parent[cust]
+    return cust
+
+
+def compute_savings_pairs(cost_matrix):
+    """
+    Tính savings s_ij = c0i + c0j - cij cho mọi cặp i < j bằng vòng lặp Python.
+    
+    Returns:
+        list: Các cặp (i, j) theo savings giảm dần (hòa thì giữ thứ tự (i, j) tăng dần)
+    """
+    customers = range(1, len(cost_matrix))
+    savings = []
+    for i in customers:
+        for j in customers:
+            if j <= i:
+                continue
+            s = cost_matrix[0][i] + cost_matrix[0][j] - cost_matrix[i][j]
+            savings.append(((i, j), s))
+    
+    savings.sort(key=lambda x: x[1], reverse=True)
+    return [pair for pair, _ in savings]
+
+
+def compute_savings_pairs_numpy(cost_matrix):
+    """
+    Như compute_savings_pairs nhưng vector hóa bằng NumPy: savings được tính
+    theo khối hàng (cost_row_blocks, không tạo ma trận n x n đầy đủ) vào một
+    mảng theo thứ tự tam giác trên, rồi sắp xếp bằng argsort ổn định (cùng thứ
+    tự với list.sort(reverse=True) của phiên bản Python).
+    
+    Returns:
+        iterator: Các cặp (i, j) theo savings giảm dần (sinh dần theo từng đoạn)
+    """
+    num_customers = len(cost_matrix) - 1
+    # Pairs (i, j > i) of customer i start at offsets[i - 1] in triu order
+    offsets = np.zeros(max(num_customers, 0) + 1, dtype=np.int64)
+    np.cumsum(np.arange(num_customers - 1, -1, -1), out=offsets[1:])
+    savings = np.empty(offsets[-1])
+    depot = None
+    for start, block in cost_row_blocks(cost_matrix):
+        if depot is None:
+            depot = block[0]
+        for i in range(max(start, 1), start + len(block)):
+            row = block[i - start]
+            savings[offsets[i - 1]:offsets[i]] = depot[i] + depot[i + 1:] - row[i + 1:]
+    order = np.argsort(-savings, kind='stable')
+    del savings
+    
+    # Map triu positions back to (i, j) a chunk at a time
+    for chunk_start in range(0, len(order), SAVINGS_PAIR_CHUNK):
+        positions = order[chunk_start:chunk_start + SAVINGS_PAIR_CHUNK]
+        i_idx = np.searchsorted(offsets, positions, side='right')
+        j_idx = positions - offsets[i_idx - 1] + i_idx + 1
+        yield from zip(i_idx.tolist(), j_idx.tolist())
+
+
+def solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles, use_numpy=True, cancel_token=None):
     """
     Giải bài toán VRPSPD bằng thuật toán Clarke-Wright Savings.
     
@@ -30,6 +101,9 @@ def solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles):
         pickup (list): Lượng hàng nhận (bao gồm depot = 0)
         capacity (int): Tải trọng xe
         num_vehicles (int): Số lượng xe
+        use_numpy (bool): Tính và sắp xếp savings bằng NumPy (nhanh hơn nhiều với n lớn)
+        cancel_token (CancellationToken): Dừng ghép tuyến sớm; mọi lần ghép đã
+            làm đều hợp lệ nên lời giải trả về vẫn khả thi (nhiều tuyến hơn)
         
     Returns:
         dict: {
@@ -43,86 +117,105 @@ def solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles):
     """
     start_time = time.time()
     
-    # Initialize routes: one per customer
+    # Initialize routes: one per customer. A route is identified by the
+    # union-find root of its customers; per-route data is indexed by that id.
     customers = list(range(1, len(cost_matrix)))
-    routes = [[i] for i in customers]
+    parent = list(range(len(cost_matrix)))
+    routes = [[i] for i in range(len(cost_matrix))]
+    # Endpoint table: (first customer, last customer) of each route
+    ends = [(i, i) for i in range(len(cost_matrix))]
+    # Load summary (D, P, M_fwd, M_rev) of each route
+    loads = [customer_segment(i, demand, pickup) for i in range(len(cost_matrix))]
+    # Creation order, so the final route order matches list delete/append merging
+    order = list(range(len(cost_matrix)))
+    next_order = len(cost_matrix)
     
-    # Compute savings
-    savings = []
-    for i in customers:
-        for j in customers:
-            if j <= i:
-                continue
-            s = cost_matrix[0][i] + cost_matrix[0][j] - cost_matrix[i][j]
-            savings.append(((i, j), s))
+    num_routes = len(customers)
     
-    savings.sort(key=lambda x: x[1], reverse=True)
+    # Compute savings
+    if use_numpy:
+        savings_pairs = compute_savings_pairs_numpy(cost_matrix)
+    else:
+        savings_pairs = compute_savings_pairs(cost_matrix)
     
     # Process savings
-    for (i, j), s in savings:
-        ri = find_route_index(routes, i)
-        rj = find_route_index(routes, j)
+    for idx, (i, j) in enumerate(savings_pairs):
+        if num_routes <= 1:
+            break
+        if cancel_token is not None and not idx % SAVINGS_CANCEL_CHECK_INTERVAL and cancel_token.expired():
+            break
         
-        if ri is None or rj is None or ri == rj:
+        ri = find_route_id(parent, i)
+        rj = find_route_id(parent, j)
+        
+        if ri == rj:
             continue
         
-        route_i = routes[ri]
-        route_j = routes[rj]
+        first_i, last_i = ends[ri]
+        first_j, last_j = ends[rj]
         
         # Check endpoints only
-        if not (i == route_i[0] or i == route_i[-1]):
+        if not (i == first_i or i == last_i):
             continue
-        if not (j == route_j[0] or j == route_j[-1]):
+        if not (j == first_j or j == last_j):
             continue
         
-        new_route = None
+        load_i = loads[ri]
+        load_j = loads[rj]
+        new_load = None
         
-        # Try four possible concatenations
-        if i == route_i[-1] and j == route_j[0]:
-            cand = route_i + route_j
-            feasible, _, _ = feasibility_check_route(cand, capacity, demand, pickup)
-            if feasible:
-                new_route = cand
+        # Try four possible concatenations; load feasibility is checked on the
+        # route summaries so the merged route is only built once it is accepted
+        if i == last_i and j == first_j:
+            cand = concat_segments(load_i, load_j)
+            if cand[2] <= capacity:
+                new_load = cand
+                merge = ((ri, False), (rj, False))
         
-        if new_route is None and i == route_i[0] and j == route_j[-1]:
-            cand = route_j + route_i
-            feasible, _, _ = feasibility_check_route(cand, capacity, demand, pickup)
-            if feasible:
-                new_route = cand
+        if new_load is None and i == first_i and j == last_j:
+            cand = concat_segments(load_j, load_i)
+            if cand[2] <= capacity:
+                new_load = cand
+                merge = ((rj, False), (ri, False))
         
-        if new_route is None and i == route_i[0] and j == route_j[0]:
-            cand = list(reversed(route_i)) + route_j
-            feasible, _, _ = feasibility_check_route(cand, capacity, demand, pickup)
-            if feasible:
-                new_route = cand
+        if new_load is None and i == first_i and j == first_j:
+            cand = concat_segments(reverse_segment(load_i), load_j)
+            if cand[2] <= capacity:
+                new_load = cand
+                merge = ((ri, True), (rj, False))
         
-        if new_route is None and i == route_i[-1] and j == route_j[-1]:
-            cand = route_i + list(reversed(route_j))
-            feasible, _, _ = feasibility_check_route(cand, capacity, demand, pickup)
-            if feasible:
-                new_route = cand
+        if new_load is None and i == last_i and j == last_j:
+            cand = concat_segments(load_i, reverse_segment(load_j))
+            if cand[2] <= capacity:
+                new_load = cand
+                merge = ((ri, False), (rj, True))
         
-        if new_route is not None:
-            # Merge routes (remove higher index first)
-            if ri > rj:
-                del routes[ri]
-                del routes[rj]
-            else:
-                del routes[rj]
-                del routes[ri]
-            routes.append(new_route)
+        if new_load is not None:
+            # Merge route rj into route ri
+            new_route = []
+            for route_id, is_reversed in merge:
+                new_route.extend(reversed(routes[route_id]) if is_reversed else routes[route_id])
+            routes[ri] = new_route
+            routes[rj] = None
+            ends[ri] = (new_route[0], new_route[-1])
+            loads[ri] = new_load
+            order[ri] = next_order
+            next_order += 1
+            parent[rj] = ri
+            num_routes -= 1
+    
+    route_ids = sorted((c for c in customers if parent[c] == c), key=lambda r: order[r])
+    routes = [routes[r] for r in route_ids]
     
     # Calculate results
     end_time = time.time()
     computation_time = end_time - start_time
     
-    solution_vector = convert_routes_to_vector(routes)
-    total_cost = calculate_total_cost(solution_vector, cost_matrix)
+    solution = Solution(routes, cost_matrix, demand, pickup)
     
     # Prepare route details
     route_details = []
-    for idx, route in enumerate(routes, 1):
-        dist = route_distance(route, cost_matrix)
+    for idx, (route, dist) in enumerate(zip(solution.routes, solution.route_costs), 1):
         feas, max_load, final_load = feasibility_check_route(route, capacity, demand, pickup)
         total_del = sum(demand[i] for i in route)
         total_pick = sum(pickup[i] for i in route)
@@ -140,8 +233,8 @@ def solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles):
     
     return {
         'routes': routes,
-        'solution_vector': solution_vector,
-        'total_cost': round(total_cost, 2),
+        'solution_vector': solution.to_vector(),
+        'total_cost': round(solution.total_cost, 2),
         'num_routes': len(routes),
         'computation_time': round(computation_time, 4),
         'route_details': route_details,
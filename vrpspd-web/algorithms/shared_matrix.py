@@ -0,0 +1,112 @@
+"""
+Shared-Memory Cost Matrix for VRPSPD
+Ma trận chi phí read-only đặt trong shared memory để nhiều process dùng chung
+"""
+
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class CostMatrixRows(list):
+    """
+    Danh sách các hàng (memoryview read-only, float64) của ma trận chi phí.
+
+    Dùng được ở mọi chỗ nhận cost_matrix dạng list of lists
+    (cost_matrix[i][j], len, duyệt hàng) mà không sao chép dữ liệu;
+    np.asarray(rows) trả về chính mảng NumPy trong shared memory và handle
+    cho phép process khác attach vào cùng ma trận.
+    """
+
+    def __init__(self, rows, array, handle):
+        super().__init__(rows)
+        self.array = array
+        self.handle = handle
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.array.dtype:
+            return self.array
+        return self.array.astype(dtype)
+
+    def __reduce__(self):
+        # Pickling copies the data; workers should attach by handle instead
+        return list, ([list(row) for row in self],)
+
+
+class SharedCostMatrix:
+    """
+    Ma trận chi phí n x n (float64) trong multiprocessing.shared_memory.
+
+    Process tạo ma trận (create) là chủ sở hữu và giải phóng vùng nhớ khi
+    close(); các process khác attach(handle) để dùng chung, không sao chép.
+    Dữ liệu chỉ đọc: array có writeable=False, các hàng là memoryview read-only.
+
+    Usage:
+        with SharedCostMatrix.create(cost_matrix) as shared:
+            pool.submit(work, shared.handle)       # worker: SharedCostMatrix.attach(handle)
+            solve_savings(shared.rows, ...)
+    """
+
+    __slots__ = ('shm', 'size', 'owner', 'array', 'rows', '_views')
+
+    def __init__(self, shm, size, owner):
+        self.shm = shm
+        self.size = size
+        self.owner = owner
+
+        # The segment may be larger than requested (page rounding)
+        raw = shm.buf[:size * size * 8]
+        data = raw.cast('d')
+        view = data.toreadonly()
+        self._views = [view, data, raw]
+        # A read-only buffer gives a non-writeable array
+        self.array = np.frombuffer(view, dtype=np.float64).reshape(size, size)
+        self.rows = CostMatrixRows((view[i * size:(i + 1) * size] for i in range(size)), self.array,
+                                   (shm.name, size))
+
+    @classmethod
+    def create(cls, cost_matrix):
+        """Sao chép cost_matrix (list of lists hoặc ndarray) vào shared memory mới."""
+        source = np.asarray(cost_matrix, dtype=np.float64)
+        if source.ndim != 2 or source.shape[0] != source.shape[1]:
+            raise ValueError(f"Cost matrix must be square, got shape {source.shape}")
+        size = source.shape[0]
+        shm = shared_memory.SharedMemory(create=True, size=max(size * size * 8, 1))
+        target = np.frombuffer(shm.buf, dtype=np.float64, count=size * size).reshape(size, size)
+        target[:] = source
+        del target
+        return cls(shm, size, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """Gắn vào ma trận đã được tạo ở process khác từ handle (name, size)."""
+        name, size = handle
+        return cls(shared_memory.SharedMemory(name=name), size, owner=False)
+
+    @property
+    def handle(self):
+        """(name, size): đủ để attach từ process khác, gửi qua pickle rẻ."""
+        return self.shm.name, self.size
+
+    def close(self):
+        """
+        Hủy các view và đóng shared memory; chủ sở hữu giải phóng luôn vùng nhớ.
+        Các tham chiếu tới rows/array giữ bên ngoài không còn dùng được.
+        """
+        if self.rows is None:
+            return
+        rows = self.rows
+        self.rows = None
+        self.array = rows.array = None
+        for row in rows:
+            row.release()
+        for view in self._views:
+            view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
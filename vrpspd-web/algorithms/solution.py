@@ -0,0 +1,147 @@
+"""
+Solution Representation for VRPSPD
+Lời giải dạng danh sách tuyến, cập nhật tăng dần (không chuyển qua lại vector)
+"""
+
+from .utils import (
+    route_distance,
+    convert_routes_to_vector,
+    convert_vector_to_routes,
+    customer_segment,
+    concat_segments,
+    RouteLoadProfile,
+    EMPTY_SEGMENT
+)
+
+
+class Solution:
+    """
+    Lời giải VRPSPD có thể thay đổi tại chỗ.
+
+    Giữ các tuyến cùng chi phí và tóm tắt tải trọng (D, P, M_fwd, M_rev) của
+    từng tuyến, cùng chỉ mục khách hàng -> (tuyến, vị trí) dạng mảng. Khi một
+    move được áp dụng chỉ các tuyến bị ảnh hưởng được cập nhật; vector
+    representation chỉ được tạo khi cần xuất kết quả (to_vector).
+
+    Tuyến rỗng được giữ nguyên chỗ (slot) cho đến khi gọi compact(), nhờ vậy
+    chỉ số tuyến ổn định trong lúc ghép/chuyển khách hàng.
+
+    Mỗi lần một tuyến thay đổi nó nhận một route_id mới (không bao giờ dùng
+    lại), nên route_ids cho biết nội dung tuyến nào còn nguyên từ lần xét trước.
+    """
+
+    __slots__ = ('cost_matrix', 'demand', 'pickup', 'routes', 'route_costs', 'route_loads',
+                 'route_ids', 'route_of', 'position_of', 'total_cost', '_next_route_id',
+                 '_profiles', '_vector')
+
+    def __init__(self, routes, cost_matrix, demand, pickup):
+        self.cost_matrix = cost_matrix
+        self.demand = demand
+        self.pickup = pickup
+        self.routes = []
+        self.route_costs = []
+        self.route_loads = []
+        self.route_ids = []
+        self.route_of = [None] * len(cost_matrix)
+        self.position_of = [None] * len(cost_matrix)
+        self.total_cost = 0
+        self._next_route_id = 0
+        self._profiles = []
+        self._vector = None
+
+        for route in routes:
+            self.add_route(list(route))
+
+    @classmethod
+    def from_vector(cls, solution_vector, cost_matrix, demand, pickup):
+        """Tạo Solution từ vector representation [0, 1, 2, 0, 3, 0]."""
+        return cls(convert_vector_to_routes(solution_vector), cost_matrix, demand, pickup)
+
+    @property
+    def num_routes(self):
+        """Số tuyến khác rỗng."""
+        return sum(1 for route in self.routes if route)
+
+    def locate(self, customer):
+        """Trả về (route_idx, position) của khách hàng."""
+        return self.route_of[customer], self.position_of[customer]
+
+    def set_route(self, route_idx, new_route):
+        """
+        Thay tuyến route_idx bằng new_route, cập nhật chi phí, tải trọng và
+        chỉ mục của các khách hàng trong new_route.
+        """
+        new_cost = route_distance(new_route, self.cost_matrix)
+        self.total_cost += new_cost - self.route_costs[route_idx]
+        self.routes[route_idx] = new_route
+        self.route_costs[route_idx] = new_cost
+        self.route_loads[route_idx] = concat_segments(
+            *(customer_segment(c, self.demand, self.pickup) for c in new_route))
+        self.route_ids[route_idx] = self._next_route_id
+        self._next_route_id += 1
+        self._profiles[route_idx] = None
+        self._vector = None
+
+        route_of = self.route_of
+        position_of = self.position_of
+        for pos, customer in enumerate(new_route):
+            route_of[customer] = route_idx
+            position_of[customer] = pos
+
+    def add_route(self, new_route):
+        """Thêm một tuyến mới, trả về chỉ số của nó."""
+        self.routes.append([])
+        self.route_costs.append(0)
+        self.route_loads.append(EMPTY_SEGMENT)
+        self.route_ids.append(None)
+        self._profiles.append(None)
+        self.set_route(len(self.routes) - 1, new_route)
+        return len(self.routes) - 1
+
+    def apply_move(self, route_idx_A, route_idx_B, new_route_A, new_route_B):
+        """
+        Áp dụng một move inter-route đã được đánh giá. Tuyến rỗng bị xóa ngay
+        (chỉ số của các tuyến phía sau thay đổi).
+
+        Returns:
+            list: Chỉ số (sau khi xóa tuyến rỗng) của các tuyến bị thay đổi còn lại
+        """
+        # Empty the source first so that customers moved to B keep B's index
+        self.set_route(route_idx_A, new_route_A)
+        self.set_route(route_idx_B, new_route_B)
+        if not new_route_A or not new_route_B:
+            self.compact()
+        return [self.route_of[route[0]] for route in (new_route_A, new_route_B) if route]
+
+    def compact(self):
+        """Xóa các tuyến rỗng và cập nhật chỉ mục của các tuyến bị dời chỗ."""
+        keep = [idx for idx, route in enumerate(self.routes) if route]
+        if len(keep) == len(self.routes):
+            return
+        self.routes = [self.routes[idx] for idx in keep]
+        self.route_costs = [self.route_costs[idx] for idx in keep]
+        self.route_loads = [self.route_loads[idx] for idx in keep]
+        self.route_ids = [self.route_ids[idx] for idx in keep]
+        self._profiles = [self._profiles[idx] for idx in keep]
+        for new_idx, old_idx in enumerate(keep):
+            if new_idx != old_idx:
+                for customer in self.routes[new_idx]:
+                    self.route_of[customer] = new_idx
+
+    def profile(self, route_idx):
+        """RouteLoadProfile của tuyến (tạo lười, hủy khi tuyến thay đổi)."""
+        profile = self._profiles[route_idx]
+        if profile is None:
+            profile = RouteLoadProfile(self.routes[route_idx], self.demand, self.pickup)
+            self._profiles[route_idx] = profile
+        return profile
+
+    def to_routes(self):
+        """Danh sách tuyến khác rỗng (bản sao)."""
+        return [list(route) for route in self.routes if route]
+
+    def to_vector(self):
+        """Vector representation, chỉ tạo lại khi lời giải đã thay đổi."""
+        if self._vector is None:
+            self._vector = convert_routes_to_vector([route for route in self.routes if route])
+        return self._vector
@@ -3,6 +3,13 @@ Utility Functions for VRPSPD
 Các hàm phụ trợ cho thuật toán
 """
 
+import os
+import tempfile
+
+import numpy as np
+
+from .distance import cost_row_blocks
+
 
 def route_distance(route, cost_matrix):
     """
@@ -93,22 +100,22 @@ def feasibility_check_and_repair(routes, Q, demand, pickup):
     """
     Kiểm tra tính hợp lệ của tất cả các tuyến.
     Nếu một tuyến không hợp lệ, thử đảo ngược nó.
+    Cả hai chiều được kiểm tra trong một lần duyệt (xem concat_segments).
     
     Returns:
         tuple: (bool, list of lists) - (is_feasible, repaired_routes)
     """
     repaired_routes = []
     for route in routes:
-        if check_single_route_feasibility(route, Q, demand, pickup):
-            repaired_routes.append(route)
-            continue
-        
-        reversed_route = list(reversed(route))
-        if check_single_route_feasibility(reversed_route, Q, demand, pickup):
-            repaired_routes.append(reversed_route)
-            continue
+        segments = [customer_segment(c, demand, pickup) for c in route]
+        orientation = segments_orientation(Q, *segments)
         
-        return (False, None)
+        if orientation == 1:
+            repaired_routes.append(route)
+        elif orientation == -1:
+            repaired_routes.append(list(reversed(route)))
+        else:
+            return (False, None)
     
     return (True, repaired_routes)
 
@@ -152,6 +159,55 @@ def convert_vector_to_routes(vector):
     return routes
 
 
+def validate_solution_vector(solution_vector, num_customers, Q, demand, pickup):
+    """
+    Kiểm tra một lời giải dạng vector (vd. do client gửi lên): bắt đầu và kết
+    thúc ở depot, phục vụ mỗi khách hàng đúng một lần, mọi tuyến khả thi.
+    
+    Raises:
+        ValueError: Lời giải không hợp lệ
+    """
+    if len(solution_vector) < 2 or solution_vector[0] != 0 or solution_vector[-1] != 0:
+        raise ValueError("Solution vector must start and end at the depot (0)")
+    customers = [node for node in solution_vector if node != 0]
+    if sorted(customers) != list(range(1, num_customers + 1)):
+        raise ValueError("Solution vector must visit every customer exactly once")
+    for route in convert_vector_to_routes(solution_vector):
+        if not check_single_route_feasibility(route, Q, demand, pickup):
+            raise ValueError(f"Route {route} violates the vehicle capacity")
+
+
+def build_neighbor_lists(cost_matrix, k):
+    """
+    Danh sách k khách hàng gần nhất của mỗi khách hàng (granular neighborhoods).
+    
+    Args:
+        cost_matrix (list): Ma trận chi phí
+        k (int): Số láng giềng giữ lại cho mỗi khách hàng
+        
+    Returns:
+        list of lists: neighbors[u] sắp theo cost_matrix[u][v] tăng dần
+        (không gồm depot và chính u); neighbors[0] rỗng
+    """
+    n = len(cost_matrix)
+    k = max(0, min(k, n - 2))
+    
+    neighbors = [[]]
+    if k == 0:
+        return neighbors + [[] for _ in range(1, n)]
+    # Row blocks: a lazy coordinate matrix is never built in full
+    for start, C in cost_row_blocks(cost_matrix):
+        rows = np.arange(len(C))
+        # Exclude the depot column and the diagonal from the candidates
+        C[:, 0] = np.inf
+        C[rows, start + rows] = np.inf
+        first = 1 if start == 0 else 0
+        nearest = np.argpartition(C[first:], k - 1, axis=1)[:, :k]
+        for r, row in enumerate(nearest, first):
+            neighbors.append(sorted(row.tolist(), key=lambda v: C[r, v]))
+    return neighbors
+
+
 def calculate_total_cost(solution_vector, cost_matrix):
     """
     Tính tổng chi phí cho một lời giải.
@@ -173,3 +229,121 @@ def calculate_total_cost(solution_vector, cost_matrix):
             total_cost += cost_matrix[route[i]][route[i+1]]
         total_cost += cost_matrix[route[-1]][0]
     return total_cost
+
+
+# ==================== LOAD PROFILE SEGMENTS ====================
+#
+# Một đoạn (segment) các khách hàng liên tiếp được tóm tắt bằng bộ 4 giá trị
+# (D, P, M_fwd, M_rev):
+#   D, P   : tổng lượng giao / nhận của đoạn
+#   M_fwd  : tải lớn nhất "nội bộ" khi đi đoạn theo chiều xuôi, tức là
+#            max_k (giao còn lại sau k + nhận đã lấy đến k)
+#   M_rev  : như M_fwd nhưng khi đi đoạn theo chiều ngược
+# Ghép hai đoạn S1 + S2:  M_fwd = max(M1_fwd + D2, P1 + M2_fwd)
+# và chiều ngược là rev(S2) + rev(S1). Tuyến hợp lệ <=> M <= Q, nên tính khả thi
+# của relocate/swap/2-opt/block move được trả lời trong O(1) bằng cách ghép vài đoạn.
+
+EMPTY_SEGMENT = (0, 0, 0, 0)
+
+
+def customer_segment(customer, demand, pickup):
+    """Tóm tắt tải trọng của đoạn chỉ gồm một khách hàng."""
+    d = demand[customer]
+    p = pickup[customer]
+    m = d if d > p else p
+    return (d, p, m, m)
+
+
+def reverse_segment(segment):
+    """Tóm tắt của cùng đoạn đó khi đi theo chiều ngược."""
+    D, P, m_fwd, m_rev = segment
+    return (D, P, m_rev, m_fwd)
+
+
+def concat_segments(*segments):
+    """Ghép các đoạn theo thứ tự xuôi."""
+    D, P, m_fwd, m_rev = EMPTY_SEGMENT
+    for D2, P2, m2_fwd, m2_rev in segments:
+        m_fwd = max(m_fwd + D2, P + m2_fwd)
+        m_rev = max(m2_rev + D, P2 + m_rev)
+        D += D2
+        P += P2
+    return (D, P, m_fwd, m_rev)
+
+
+def segments_orientation(Q, *segments):
+    """
+    Kiểm tra tuyến ghép từ các đoạn.
+    
+    Returns:
+        int or None: 1 nếu hợp lệ theo chiều xuôi, -1 nếu chỉ hợp lệ khi đảo ngược,
+        None nếu không hợp lệ
+    """
+    _, _, m_fwd, m_rev = concat_segments(*segments)
+    if m_fwd <= Q:
+        return 1
+    if m_rev <= Q:
+        return -1
+    return None
+
+
+class RouteLoadProfile:
+    """
+    Profile tải trọng của một tuyến: tổng tiền tố giao/nhận và sparse table
+    min/max của (nhận - giao) tiền tố, cho phép lấy tóm tắt của đoạn bất kỳ
+    route[i:j] (cả hai chiều) trong O(1).
+    """
+    
+    __slots__ = ('route', 'prefix_delivery', 'prefix_pickup', '_max_table', '_min_table')
+    
+    def __init__(self, route, demand, pickup):
+        self.route = route
+        prefix_delivery = [0]
+        prefix_pickup = [0]
+        for c in route:
+            prefix_delivery.append(prefix_delivery[-1] + demand[c])
+            prefix_pickup.append(prefix_pickup[-1] + pickup[c])
+        self.prefix_delivery = prefix_delivery
+        self.prefix_pickup = prefix_pickup
+        
+        # Sparse tables over g[m] = pickup[:m] - delivery[:m]
+        g = [p - d for p, d in zip(prefix_pickup, prefix_delivery)]
+        max_table = [g]
+        min_table = [g]
+        width = 1
+        while 2 * width <= len(g):
+            prev_max = max_table[-1]
+            prev_min = min_table[-1]
+            max_table.append([max(prev_max[m], prev_max[m + width]) for m in range(len(prev_max) - width)])
+            min_table.append([min(prev_min[m], prev_min[m + width]) for m in range(len(prev_min) - width)])
+            width *= 2
+        self._max_table = max_table
+        self._min_table = min_table
+    
+    def segment(self, i, j):
+        """Tóm tắt (D, P, M_fwd, M_rev) của đoạn route[i:j]."""
+        if i >= j:
+            return EMPTY_SEGMENT
+        level = (j - i + 1).bit_length() - 1
+        end = j - (1 << level) + 1
+        row_max = self._max_table[level]
+        row_min = self._min_table[level]
+        g_max = row_max[i] if row_max[i] > row_max[end] else row_max[end]
+        g_min = row_min[i] if row_min[i] < row_min[end] else row_min[end]
+        pd = self.prefix_delivery
+        pp = self.prefix_pickup
+        return (pd[j] - pd[i], pp[j] - pp[i],
+                pd[j] - pp[i] + g_max,
+                pp[j] - pd[i] - g_min)
+
+
+def save_atomic(path, save, data):
+    """Ghi file qua file tạm + os.replace (save(f, data)) để process khác không đọc phải file dở."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            save(f, data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -79,21 +79,28 @@ def generate_route_colors(num_routes):
         return colors
 
 
-def create_plotly_data(routes, cost_matrix, demand=None, pickup=None):
+def create_plotly_data(routes, cost_matrix, demand=None, pickup=None, coordinates=None):
     """
     Tạo dữ liệu để vẽ bằng Plotly.js.
     
     Args:
         routes (list): Danh sách các tuyến [[1, 2, 3], [4, 5], ...]
-        cost_matrix (list): Ma trận chi phí
+        cost_matrix (list): Ma trận chi phí; nếu có thuộc tính coordinates
+            (instance dạng tọa độ) thì dùng tọa độ thật thay cho MDS
         demand (list, optional): Lượng hàng giao
         pickup (list, optional): Lượng hàng nhận
+        coordinates (list, optional): Tọa độ đã tính sẵn (bỏ qua MDS)
         
     Returns:
         dict: Visualization data
     """
-    # Generate 2D coordinates from cost matrix
-    coordinates = generate_coordinates_from_cost_matrix(cost_matrix)
+    if coordinates is None:
+        coordinates = getattr(cost_matrix, 'coordinates', None)
+    if coordinates is not None:
+        coordinates = np.asarray(coordinates).tolist()
+    else:
+        # Generate 2D coordinates from cost matrix
+        coordinates = generate_coordinates_from_cost_matrix(cost_matrix)
     
     # Depot (node 0)
     depot = {
@@ -4,13 +4,41 @@ Thuật toán VND hai cấp (Inter-Intra) để cải thiện lời giải
 """
 
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from .utils import (
     convert_vector_to_routes,
     convert_routes_to_vector,
-    calculate_total_cost,
     route_distance,
-    feasibility_check_and_repair
+    build_neighbor_lists,
+    RouteLoadProfile,
+    customer_segment,
+    reverse_segment,
+    segments_orientation
 )
+from .solution import Solution
+from .shared_matrix import SharedCostMatrix
+from .cancellation import CancellationToken
+
+
+# Ngưỡng cải thiện tối thiểu (tránh lặp vô hạn do sai số dấu phẩy động)
+IMPROVEMENT_EPS = 1e-9
+
+# Số tuyến tối đa được nhớ trong IntraRouteCache
+INTRA_CACHE_SIZE = 4096
+
+# Chiến lược duyệt neighborhood:
+#   'first'   - nhận move cải thiện đầu tiên
+#   'best'    - duyệt hết neighborhood, nhận move tốt nhất
+#   'sampled' - nhận move tốt nhất trong sample_size move cải thiện đầu tiên
+SEARCH_STRATEGIES = ('first', 'best', 'sampled')
+DEFAULT_SAMPLE_SIZE = 5
+
+
+def validate_strategy(strategy):
+    """Kiểm tra tên chiến lược duyệt neighborhood."""
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
 
 
 # ==================== NEIGHBORHOOD MOVES ====================
@@ -136,7 +164,7 @@ def swap_two_two_inter_route(solution_vector, route_idx_A, route_idx_B, block_st
     block_from_B = route_B[block_start_idx_B : block_start_idx_B + 2]
     
     new_route_A = route_A[:block_start_idx_A] + block_from_B + route_A[block_start_idx_A + 2:]
-    new_route_B = route_B[:block_start_idx_B] + block_from_A + route_B[block_start_idx_B + 1:]
+    new_route_B = route_B[:block_start_idx_B] + block_from_A + route_B[block_start_idx_B + 2:]
     
     routes[route_idx_A] = new_route_A
     routes[route_idx_B] = new_route_B
@@ -144,83 +172,814 @@ def swap_two_two_inter_route(solution_vector, route_idx_A, route_idx_B, block_st
     return convert_routes_to_vector(routes)
 
 
-# ==================== INTRA-ROUTE VND ====================
+# ==================== DELTA-COST MOVE EVALUATION ====================
+#
+# Mỗi move inter-route chỉ thay đổi vài cung ở hai tuyến liên quan, nên chi phí
+# thay đổi (delta) được tính trong O(1) thay vì dựng lại toàn bộ lời giải rồi gọi
+# calculate_total_cost. Tuyến chỉ được dựng lại (materialize) khi move có delta
+# tốt hơn ứng viên hiện tại, và lời giải chỉ được cập nhật khi move được chấp nhận.
+# Ma trận chi phí có thể bất đối xứng nên mọi cung đều được tính theo chiều đi.
+
+def swap_one_one_deltas(route_A, route_B, cost_matrix):
+    """Swap(1,1): Sinh (delta, i, j) cho mọi cặp vị trí giữa 2 tuyến."""
+    c = cost_matrix
+    pa = [0] + route_A + [0]
+    pb = [0] + route_B + [0]
+    for i in range(1, len(pa) - 1):
+        p, u, s = pa[i - 1], pa[i], pa[i + 1]
+        old_a = c[p][u] + c[u][s]
+        for j in range(1, len(pb) - 1):
+            q, v, t = pb[j - 1], pb[j], pb[j + 1]
+            delta = (c[p][v] + c[v][s] - old_a) + (c[q][u] + c[u][t] - c[q][v] - c[v][t])
+            yield delta, i - 1, j - 1
+
+
+def relocate_deltas(route_from, route_to, cost_matrix):
+    """Shift(1,0): Sinh (delta, i, j) khi chuyển khách i sang vị trí chèn j."""
+    if len(route_from) <= 1:
+        return
+    c = cost_matrix
+    pa = [0] + route_from + [0]
+    pb = [0] + route_to + [0]
+    for i in range(1, len(pa) - 1):
+        p, u, s = pa[i - 1], pa[i], pa[i + 1]
+        removal = c[p][s] - c[p][u] - c[u][s]
+        for j in range(len(pb) - 1):
+            q, t = pb[j], pb[j + 1]
+            yield removal + c[q][u] + c[u][t] - c[q][t], i - 1, j
+
+
+def shift_two_zero_deltas(route_from, route_to, cost_matrix):
+    """Shift(2,0): Sinh (delta, i, j) khi chuyển khối (i, i+1) sang vị trí chèn j."""
+    if len(route_from) < 2:
+        return
+    c = cost_matrix
+    pa = [0] + route_from + [0]
+    pb = [0] + route_to + [0]
+    for i in range(1, len(pa) - 2):
+        p, u1, u2, s = pa[i - 1], pa[i], pa[i + 1], pa[i + 2]
+        # Moving the only two customers out leaves an empty (removed) route
+        bridge = c[p][s] if len(route_from) > 2 else 0
+        removal = bridge - c[p][u1] - c[u2][s]
+        for j in range(len(pb) - 1):
+            q, t = pb[j], pb[j + 1]
+            yield removal + c[q][u1] + c[u2][t] - c[q][t], i - 1, j
+
 
-def vnd_intra_search(solution_vector, cost_matrix, capacity, demand, pickup):
+def swap_two_one_deltas(route_A, route_B, cost_matrix):
+    """Swap(2,1): Sinh (delta, i, j) khi tráo khối (i, i+1) của A với khách j của B."""
+    if len(route_A) < 2:
+        return
+    c = cost_matrix
+    pa = [0] + route_A + [0]
+    pb = [0] + route_B + [0]
+    for i in range(1, len(pa) - 2):
+        p, u1, u2, s = pa[i - 1], pa[i], pa[i + 1], pa[i + 2]
+        old_a = c[p][u1] + c[u2][s]
+        for j in range(1, len(pb) - 1):
+            q, v, t = pb[j - 1], pb[j], pb[j + 1]
+            # The block's inner arc (u1, u2) is kept, so it cancels out
+            delta = (c[p][v] + c[v][s] - old_a) + (c[q][u1] + c[u2][t] - c[q][v] - c[v][t])
+            yield delta, i - 1, j - 1
+
+
+def swap_two_two_deltas(route_A, route_B, cost_matrix):
+    """Swap(2,2): Sinh (delta, i, j) khi tráo khối (i, i+1) của A với khối (j, j+1) của B."""
+    if len(route_A) < 2 or len(route_B) < 2:
+        return
+    c = cost_matrix
+    pa = [0] + route_A + [0]
+    pb = [0] + route_B + [0]
+    for i in range(1, len(pa) - 2):
+        p, u1, u2, s = pa[i - 1], pa[i], pa[i + 1], pa[i + 2]
+        old_a = c[p][u1] + c[u2][s]
+        for j in range(1, len(pb) - 2):
+            q, v1, v2, t = pb[j - 1], pb[j], pb[j + 1], pb[j + 2]
+            delta = (c[p][v1] + c[v2][s] - old_a) + (c[q][u1] + c[u2][t] - c[q][v1] - c[v2][t])
+            yield delta, i - 1, j - 1
+
+
+def build_inter_move(k, route_A, route_B, i, j):
     """
-    VND cục bộ trên từng tuyến (intra-route).
+    Dựng lại 2 tuyến bị ảnh hưởng bởi move thứ k (chỉ gọi khi move đáng xét).
+    
+    Returns:
+        tuple: (new_route_A, new_route_B) - tuyến rỗng nghĩa là tuyến bị xóa
     """
-    current_routes = convert_vector_to_routes(solution_vector)
-    improved_routes = []
+    if k == 0:  # Swap(1,1)
+        new_A = route_A[:]
+        new_B = route_B[:]
+        new_A[i], new_B[j] = route_B[j], route_A[i]
+    elif k == 1:  # Shift(1,0)
+        new_A = route_A[:i] + route_A[i + 1:]
+        new_B = route_B[:j] + [route_A[i]] + route_B[j:]
+    elif k == 2:  # Shift(2,0)
+        new_A = route_A[:i] + route_A[i + 2:]
+        new_B = route_B[:j] + route_A[i:i + 2] + route_B[j:]
+    elif k == 3:  # Swap(2,1)
+        new_A = route_A[:i] + [route_B[j]] + route_A[i + 2:]
+        new_B = route_B[:j] + route_A[i:i + 2] + route_B[j + 1:]
+    else:  # Swap(2,2)
+        new_A = route_A[:i] + route_B[j:j + 2] + route_A[i + 2:]
+        new_B = route_B[:j] + route_A[i:i + 2] + route_B[j + 2:]
+    return new_A, new_B
+
+
+# (delta generator, ordered route pairs?) - thứ tự giống Ordering 2
+INTER_NEIGHBORHOODS = [
+    (swap_one_one_deltas, False),    # Swap(1,1)
+    (relocate_deltas, True),         # Shift(1,0)
+    (shift_two_zero_deltas, True),   # Shift(2,0)
+    (swap_two_one_deltas, True),     # Swap(2,1)
+    (swap_two_two_deltas, False),    # Swap(2,2)
+]
+
+
+def iter_route_pairs(k, num_routes):
+    """Sinh các cặp tuyến (A, B) cần xét cho neighborhood thứ k."""
+    ordered = INTER_NEIGHBORHOODS[k][1]
+    for a in range(num_routes):
+        for b in range(num_routes):
+            if a == b or (not ordered and a > b):
+                continue
+            yield a, b
+
+
+def inter_move_delta(k, route_A, route_B, i, j, cost_matrix):
+    """Delta O(1) của một move inter-route (k, i, j) - cùng công thức với các generator ở trên."""
+    c = cost_matrix
+    len_A = len(route_A)
+    len_B = len(route_B)
+    p = route_A[i - 1] if i > 0 else 0
+    q = route_B[j - 1] if j > 0 else 0
     
-    intra_neighborhoods = [
-        lambda r, i, j: (r[:i] + [r[j]] + r[i+1:j] + [r[i]] + r[j+1:]),  # General Swap
-        lambda r, i, j: (r[:i] + r[i+1:j] + [r[i]] + r[j:]),  # Relocate
-        lambda r, i, j: (r[:i] + r[i+2:j] + [r[i], r[i+1]] + r[j:]),  # Block Insertion
-        lambda r, i, j: (r[:i+1] + r[i+1:j+1][::-1] + r[j+1:]),  # 2-Opt
-    ]
+    if k == 0:  # Swap(1,1)
+        u, v = route_A[i], route_B[j]
+        s = route_A[i + 1] if i + 1 < len_A else 0
+        t = route_B[j + 1] if j + 1 < len_B else 0
+        return (c[p][v] + c[v][s] - c[p][u] - c[u][s]) + (c[q][u] + c[u][t] - c[q][v] - c[v][t])
+    if k == 1:  # Shift(1,0)
+        u = route_A[i]
+        s = route_A[i + 1] if i + 1 < len_A else 0
+        t = route_B[j] if j < len_B else 0
+        return c[p][s] - c[p][u] - c[u][s] + c[q][u] + c[u][t] - c[q][t]
     
-    for route in current_routes:
-        if len(route) <= 1:
-            improved_routes.append(route)
+    u1, u2 = route_A[i], route_A[i + 1]
+    s = route_A[i + 2] if i + 2 < len_A else 0
+    if k == 2:  # Shift(2,0)
+        t = route_B[j] if j < len_B else 0
+        bridge = c[p][s] if len_A > 2 else 0
+        return bridge - c[p][u1] - c[u2][s] + c[q][u1] + c[u2][t] - c[q][t]
+    if k == 3:  # Swap(2,1)
+        v = route_B[j]
+        t = route_B[j + 1] if j + 1 < len_B else 0
+        return (c[p][v] + c[v][s] - c[p][u1] - c[u2][s]) + (c[q][u1] + c[u2][t] - c[q][v] - c[v][t])
+    # Swap(2,2)
+    v1, v2 = route_B[j], route_B[j + 1]
+    t = route_B[j + 2] if j + 2 < len_B else 0
+    return (c[p][v1] + c[v2][s] - c[p][u1] - c[u2][s]) + (c[q][u1] + c[u2][t] - c[q][v1] - c[v2][t])
+
+
+def granular_customer_candidates(k, solution, u, neighbor_lists):
+    """
+    Granular neighborhood: chỉ sinh các move đặt khách hàng u cạnh một trong
+    các láng giềng gần nhất v của nó (ở tuyến khác), thay vì mọi cặp vị trí.
+    Dùng chỉ mục khách hàng -> (tuyến, vị trí) của Solution nên chỉ tốn O(k).
+    
+    Returns:
+        list: Các bộ (route_idx_A, route_idx_B, i, j) hợp lệ cho neighborhood k
+    """
+    routes = solution.routes
+    ordered = INTER_NEIGHBORHOODS[k][1]
+    candidates = []
+    
+    a, pu = solution.locate(u)
+    if a is None:
+        return candidates
+    len_A = len(routes[a])
+    for v in neighbor_lists[u]:
+        b, pv = solution.locate(v)
+        if b is None or b == a:
             continue
+        len_B = len(routes[b])
         
-        best_route = route
-        best_route_cost = route_distance(best_route, cost_matrix)
+        # (i, j) pairs that make u (or the block holding u) adjacent to v
+        if k == 0:  # Swap(1,1): u takes the slot just before / after v
+            pairs = [(pu, j) for j in (pv - 1, pv + 1) if 0 <= j < len_B]
+        elif k == 1:  # Shift(1,0): insert u before / after v
+            pairs = [(pu, pv), (pu, pv + 1)] if len_A > 1 else []
+        elif k == 2:  # Shift(2,0): block (u, next) after v, block (prev, u) before v
+            pairs = [(i, j) for i, j in ((pu, pv + 1), (pu - 1, pv)) if 0 <= i < len_A - 1]
+        elif k == 3:  # Swap(2,1): block replaces the customer after / before v
+            pairs = [(i, j) for i, j in ((pu, pv + 1), (pu - 1, pv - 1))
+                     if 0 <= i < len_A - 1 and 0 <= j < len_B]
+        else:  # Swap(2,2): block replaces the block after / before v
+            pairs = [(i, j) for i, j in ((pu, pv + 1), (pu - 1, pv - 2))
+                     if 0 <= i < len_A - 1 and 0 <= j < len_B - 1]
         
-        k = 0
-        while k < len(intra_neighborhoods):
-            improvement_found = False
+        for i, j in pairs:
+            if not ordered and a > b:
+                candidates.append((b, a, j, i))
+            else:
+                candidates.append((a, b, i, j))
+    
+    return candidates
+
+
+class SearchMemory:
+    """
+    Bộ nhớ giữa các lượt quét inter-route của solve_vnd.
+    
+    - Chế độ đầy đủ: với mỗi neighborhood k, tập các cặp route_id (A, B) đã
+      biết là không có move cải thiện. Route_id đổi mỗi khi tuyến thay đổi nên
+      cặp chỉ còn "sạch" khi cả hai tuyến còn nguyên.
+    - Chế độ granular: don't-look bit cho mỗi (k, khách hàng). Move của u chỉ
+      phụ thuộc tuyến của u và tuyến của các láng giềng của u, nên bit của u
+      được xóa khi một trong các tuyến đó thay đổi.
+    
+    Vì chỉ bỏ qua những gì chắc chắn không cải thiện, best-improvement trên
+    phần còn lại cho cùng kết quả với quét lại toàn bộ.
+    """
+    
+    __slots__ = ('clean_pairs', 'dont_look', 'reverse_neighbors')
+    
+    def __init__(self, num_neighborhoods, num_nodes, neighbor_lists=None):
+        self.clean_pairs = [set() for _ in range(num_neighborhoods)]
+        self.dont_look = None
+        self.reverse_neighbors = None
+        if neighbor_lists is not None:
+            self.dont_look = [bytearray(num_nodes) for _ in range(num_neighborhoods)]
+            self.reverse_neighbors = [[] for _ in range(num_nodes)]
+            for u, neighbors in enumerate(neighbor_lists):
+                for v in neighbors:
+                    self.reverse_neighbors[v].append(u)
+    
+    def mark_clean(self, k, group):
+        """Ghi nhận nhóm move (cặp route_id hoặc khách hàng) không có move cải thiện."""
+        if isinstance(group, tuple):
+            self.clean_pairs[k].add(group)
+        else:
+            self.dont_look[k][group] = 1
+    
+    def routes_changed(self, solution, route_indices):
+        """Cập nhật sau khi các tuyến route_indices của solution thay đổi."""
+        live = set(solution.route_ids)
+        for k, clean in enumerate(self.clean_pairs):
+            if clean:
+                self.clean_pairs[k] = {pair for pair in clean if pair[0] in live and pair[1] in live}
+        
+        if self.dont_look is not None:
+            woken = set()
+            for route_idx in route_indices:
+                for customer in solution.routes[route_idx]:
+                    woken.add(customer)
+                    woken.update(self.reverse_neighbors[customer])
+            for bits in self.dont_look:
+                for customer in woken:
+                    bits[customer] = 0
+
+
+def pending_inter_items(k, solution, neighbor_lists=None, memory=None):
+    """
+    Sinh các phần tử cần quét của neighborhood thứ k: cặp chỉ số tuyến (a, b)
+    ở chế độ đầy đủ hoặc khách hàng u ở chế độ granular, bỏ qua những phần tử
+    đã biết là không cải thiện (theo memory).
+    """
+    if neighbor_lists is not None:
+        dont_look = memory.dont_look[k] if memory is not None else None
+        for u in range(1, len(neighbor_lists)):
+            if dont_look is None or not dont_look[u]:
+                yield u
+        return
+    
+    clean = memory.clean_pairs[k] if memory is not None else ()
+    route_ids = solution.route_ids
+    for a, b in iter_route_pairs(k, len(solution.routes)):
+        if (route_ids[a], route_ids[b]) not in clean:
+            yield a, b
+
+
+def iter_inter_move_groups(k, solution, cost_matrix, neighbor_lists=None, memory=None, items=None,
+                           route_ids=None):
+    """
+    Sinh (group, moves) cho neighborhood thứ k, trong đó moves sinh
+    (delta, route_idx_A, route_idx_B, i, j). Group là cặp route_id (chế độ đầy
+    đủ) hoặc khách hàng (chế độ granular).
+    
+    items mặc định là pending_inter_items(...); route_ids (mặc định của
+    solution) dùng để đặt tên group khi solution là bản sao trong worker.
+    """
+    if items is None:
+        items = pending_inter_items(k, solution, neighbor_lists, memory)
+    routes = solution.routes
+    
+    if neighbor_lists is not None:
+        for u in items:
+            yield u, ((inter_move_delta(k, routes[a], routes[b], i, j, cost_matrix), a, b, i, j)
+                      for a, b, i, j in granular_customer_candidates(k, solution, u, neighbor_lists))
+        return
+    
+    delta_fn = INTER_NEIGHBORHOODS[k][0]
+    if route_ids is None:
+        route_ids = solution.route_ids
+    for a, b in items:
+        yield ((route_ids[a], route_ids[b]),
+               ((delta, a, b, i, j) for delta, i, j in delta_fn(routes[a], routes[b], cost_matrix)))
+
+
+def inter_move_segments(k, profile_A, profile_B, i, j, demand, pickup):
+    """
+    Mô tả 2 tuyến sau move thứ k dưới dạng danh sách đoạn tải trọng (O(1)).
+    
+    Returns:
+        tuple: (segments_A, segments_B)
+    """
+    seg_A = profile_A.segment
+    seg_B = profile_B.segment
+    len_A = len(profile_A.route)
+    len_B = len(profile_B.route)
+    
+    if k == 0:  # Swap(1,1)
+        u = customer_segment(profile_A.route[i], demand, pickup)
+        v = customer_segment(profile_B.route[j], demand, pickup)
+        return ((seg_A(0, i), v, seg_A(i + 1, len_A)),
+                (seg_B(0, j), u, seg_B(j + 1, len_B)))
+    if k == 1:  # Shift(1,0)
+        u = customer_segment(profile_A.route[i], demand, pickup)
+        return ((seg_A(0, i), seg_A(i + 1, len_A)),
+                (seg_B(0, j), u, seg_B(j, len_B)))
+    if k == 2:  # Shift(2,0)
+        return ((seg_A(0, i), seg_A(i + 2, len_A)),
+                (seg_B(0, j), seg_A(i, i + 2), seg_B(j, len_B)))
+    if k == 3:  # Swap(2,1)
+        v = customer_segment(profile_B.route[j], demand, pickup)
+        return ((seg_A(0, i), v, seg_A(i + 2, len_A)),
+                (seg_B(0, j), seg_A(i, i + 2), seg_B(j + 1, len_B)))
+    # Swap(2,2)
+    return ((seg_A(0, i), seg_B(j, j + 2), seg_A(i + 2, len_A)),
+            (seg_B(0, j), seg_A(i, i + 2), seg_B(j + 2, len_B)))
+
+
+def scan_inter_move_groups(k, solution, groups, capacity, demand, pickup, cancel_token=None, strategy='best',
+                           sample_size=DEFAULT_SAMPLE_SIZE, eval_budget=None, clean_groups=None):
+    """
+    Duyệt các nhóm move (group, moves) của neighborhood inter-route thứ k và
+    trả về move cải thiện theo strategy.
+    
+    Tính khả thi được kiểm tra trong O(1) bằng profile tải trọng của từng tuyến
+    (được Solution giữ lại giữa các lần gọi cho các tuyến không đổi);
+    move chỉ được dựng lại khi delta của nó đủ tốt và hợp lệ. Nếu một tuyến
+    phải đảo ngược để hợp lệ thì delta được tính lại chính xác trên tuyến đã
+    đảo. Nhóm được duyệt hết mà không có move cải thiện nào được thêm vào
+    clean_groups (nếu có). cancel_token (CancellationToken) được kiểm tra
+    trước mỗi nhóm; khi hết hạn trả về move tốt nhất đã tìm được.
+    
+    Returns:
+        tuple or None: (delta, route_idx_A, route_idx_B, new_route_A, new_route_B)
+    """
+    routes = solution.routes
+    cost_matrix = solution.cost_matrix
+    best = None
+    best_delta = -IMPROVEMENT_EPS
+    # Only best-improvement may skip moves that cannot beat the current best
+    prune = strategy == 'best'
+    found = 0
+    evaluations = 0
+    
+    for group, moves in groups:
+        if cancel_token is not None and cancel_token.expired():
+            break
+        
+        # Whether the group may hold an improving move (pruned moves count as "may")
+        maybe_improving = False
+        for delta, a, b, i, j in moves:
+            if eval_budget is not None and evaluations >= eval_budget:
+                return best
+            evaluations += 1
             
-            if k == 0:  # General Swap
-                neighbors_gen = (intra_neighborhoods[k](best_route, i, j) 
-                               for i in range(len(best_route)) 
-                               for j in range(i + 1, len(best_route)))
-            elif k == 1:  # Relocate
-                neighbors_gen = (intra_neighborhoods[k](best_route, i, j) 
-                               for i in range(len(best_route)) 
-                               for j in range(len(best_route) + 1) 
-                               if i != j and i != j-1)
-            elif k == 2:  # Block Insertion
-                if len(best_route) < 3:
-                    neighbors_gen = iter([])
-                else:
-                    neighbors_gen = (intra_neighborhoods[k](best_route, i, j) 
-                                   for i in range(len(best_route)-1) 
-                                   for j in range(len(best_route)-1) 
-                                   if j != i and j != i+1)
-            elif k == 3:  # 2-Opt
-                if len(best_route) < 3:
-                    neighbors_gen = iter([])
-                else:
-                    neighbors_gen = (intra_neighborhoods[k](best_route, i, j) 
-                                   for i in range(len(best_route) - 1) 
-                                   for j in range(i + 2, len(best_route)))
+            if delta >= -IMPROVEMENT_EPS:
+                continue
+            if prune and delta >= best_delta:
+                maybe_improving = True
+                continue
             
-            for neighbor_route in neighbors_gen:
-                is_feasible, _ = feasibility_check_and_repair([neighbor_route], capacity, demand, pickup)
-                
-                if is_feasible:
-                    neighbor_cost = route_distance(neighbor_route, cost_matrix)
-                    if neighbor_cost < best_route_cost:
-                        best_route = neighbor_route
-                        best_route_cost = neighbor_cost
-                        improvement_found = True
-                        break
+            route_A = routes[a]
+            route_B = routes[b]
+            segments_A, segments_B = inter_move_segments(k, solution.profile(a), solution.profile(b),
+                                                         i, j, demand, pickup)
+            orientation_A = segments_orientation(capacity, *segments_A)
+            if orientation_A is None:
+                continue
+            orientation_B = segments_orientation(capacity, *segments_B)
+            if orientation_B is None:
+                continue
+            maybe_improving = True
             
-            if improvement_found:
-                k = 0
-            else:
-                k += 1
+            new_A, new_B = build_inter_move(k, route_A, route_B, i, j)
+            if orientation_A < 0 or orientation_B < 0:
+                # Route must be reversed: asymmetric costs make the O(1) delta stale
+                if orientation_A < 0:
+                    new_A.reverse()
+                if orientation_B < 0:
+                    new_B.reverse()
+                delta = (route_distance(new_A, cost_matrix) + route_distance(new_B, cost_matrix)
+                         - solution.route_costs[a] - solution.route_costs[b])
+                if delta >= -IMPROVEMENT_EPS:
+                    continue
+            
+            found += 1
+            if delta < best_delta:
+                best_delta = delta
+                best = (delta, a, b, new_A, new_B)
+            if strategy == 'first' or (strategy == 'sampled' and found >= sample_size):
+                return best
+        
+        if clean_groups is not None and not maybe_improving:
+            clean_groups.append(group)
+    
+    return best
+
+
+def find_best_inter_move(k, solution, cost_matrix, capacity, demand, pickup, cancel_token=None,
+                         neighbor_lists=None, memory=None, strategy='best',
+                         sample_size=DEFAULT_SAMPLE_SIZE, eval_budget=None):
+    """
+    Tìm move cải thiện trên neighborhood inter-route thứ k bằng delta-cost
+    (xem scan_inter_move_groups). Nhóm move không có move cải thiện nào được
+    ghi vào memory.
+    
+    Args:
+        strategy (str): 'best', 'first' hoặc 'sampled' (xem SEARCH_STRATEGIES)
+        sample_size (int): Số move cải thiện cần gom với strategy='sampled'
+        eval_budget (int): Số move tối đa được đánh giá (None = không giới hạn)
+    
+    Returns:
+        tuple or None: (delta, route_idx_A, route_idx_B, new_route_A, new_route_B)
+    """
+    clean_groups = [] if memory is not None else None
+    groups = iter_inter_move_groups(k, solution, cost_matrix, neighbor_lists, memory)
+    best = scan_inter_move_groups(k, solution, groups, capacity, demand, pickup, cancel_token,
+                                  strategy, sample_size, eval_budget, clean_groups)
+    if clean_groups:
+        for group in clean_groups:
+            memory.mark_clean(k, group)
+    return best
+
+
+# ==================== PARALLEL INTER-ROUTE SEARCH ====================
+
+# Số chunk mỗi worker nhận trong một lượt quét (cân bằng tải giữa các worker)
+PARALLEL_CHUNKS_PER_WORKER = 4
+
+# Lượt quét có ít phần tử hơn ngưỡng này chạy tuần tự (tránh chi phí IPC)
+PARALLEL_MIN_ITEMS = 64
+
+# Dữ liệu instance trong mỗi process worker (gán một lần bởi initializer)
+_worker_state = {}
+
+
+def _init_inter_worker(matrix_handle, demand, pickup, capacity, neighbor_lists):
+    """
+    Initializer của ProcessPoolExecutor: attach ma trận chi phí trong shared
+    memory và nhận phần dữ liệu instance còn lại một lần.
+    """
+    shared = SharedCostMatrix.attach(matrix_handle)
+    _worker_state.update(shared=shared, cost_matrix=shared.rows, demand=demand, pickup=pickup,
+                         capacity=capacity, neighbor_lists=neighbor_lists, solution=None, route_ids=None)
+
+
+def _scan_inter_chunk(k, routes, route_ids, items, deadline, strategy, sample_size, eval_budget):
+    """
+    Worker: quét một chunk của neighborhood k trên bản sao lời giải.
+    Chỉ deadline được gửi sang worker; lệnh hủy có hiệu lực sau chunk hiện tại.
+    """
+    state = _worker_state
+    # Consecutive neighborhoods without improvement reuse the same solution copy
+    if state['route_ids'] != route_ids:
+        state['solution'] = Solution(routes, state['cost_matrix'], state['demand'], state['pickup'])
+        state['route_ids'] = route_ids
+    solution = state['solution']
+    
+    groups = iter_inter_move_groups(k, solution, state['cost_matrix'], state['neighbor_lists'],
+                                    items=items, route_ids=route_ids)
+    clean_groups = []
+    best = scan_inter_move_groups(k, solution, groups, state['capacity'], state['demand'], state['pickup'],
+                                  CancellationToken(deadline), strategy, sample_size, eval_budget,
+                                  clean_groups)
+    return best, clean_groups
+
+
+class ParallelInterSearch:
+    """
+    Quét neighborhood inter-route song song bằng ProcessPoolExecutor.
+    
+    Ma trận chi phí được đặt trong shared memory (SharedCostMatrix, dùng lại
+    nếu cost_matrix đã là rows của một SharedCostMatrix) và các worker attach
+    vào mà không sao chép; phần dữ liệu instance còn lại được gửi cho mỗi
+    worker một lần (initializer). Mỗi lượt
+    quét chia các cặp tuyến (hoặc khách hàng ở chế độ granular) thành các
+    chunk liên tiếp, mỗi worker trả về move tốt nhất của chunk và các nhóm
+    không cải thiện; process chính chọn move tốt nhất (chunk trước thắng khi
+    bằng delta, nên strategy='best' cho cùng kết quả với find_best_inter_move).
+    eval_budget được chia đều cho các chunk.
+    """
+    
+    def __init__(self, workers, cost_matrix, demand, pickup, capacity, neighbor_lists=None):
+        self.workers = workers
+        self.neighbor_lists = neighbor_lists
         
-        improved_routes.append(best_route)
+        self.shared = None
+        matrix_handle = getattr(cost_matrix, 'handle', None)
+        if matrix_handle is None:
+            self.shared = SharedCostMatrix.create(cost_matrix)
+            matrix_handle = self.shared.handle
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_inter_worker,
+                                            initargs=(matrix_handle, demand, pickup, capacity, neighbor_lists))
+    
+    def find_best_move(self, k, solution, capacity, demand, pickup, cancel_token=None, memory=None,
+                       strategy='best', sample_size=DEFAULT_SAMPLE_SIZE, eval_budget=None):
+        """Giống find_best_inter_move nhưng quét trên các worker."""
+        items = list(pending_inter_items(k, solution, self.neighbor_lists, memory))
+        if len(items) < PARALLEL_MIN_ITEMS:
+            return find_best_inter_move(k, solution, solution.cost_matrix, capacity, demand, pickup, cancel_token,
+                                        self.neighbor_lists, memory, strategy, sample_size, eval_budget)
+        
+        num_chunks = min(len(items), self.workers * PARALLEL_CHUNKS_PER_WORKER)
+        chunk_size = -(-len(items) // num_chunks)
+        chunk_budget = None if eval_budget is None else -(-eval_budget // num_chunks)
+        route_ids = tuple(solution.route_ids)
+        deadline = cancel_token.effective_deadline() if cancel_token is not None else None
+        futures = [self.executor.submit(_scan_inter_chunk, k, solution.routes, route_ids,
+                                        items[start:start + chunk_size], deadline, strategy,
+                                        sample_size, chunk_budget)
+                   for start in range(0, len(items), chunk_size)]
+        
+        best = None
+        for future in futures:
+            move, clean_groups = future.result()
+            if move is not None and (best is None or move[0] < best[0]):
+                best = move
+            if memory is not None:
+                for group in clean_groups:
+                    memory.mark_clean(k, group)
+        return best
+    
+    def close(self):
+        """Dừng các worker và giải phóng shared memory do search này tạo."""
+        self.executor.shutdown(cancel_futures=True)
+        if self.shared is not None:
+            self.shared.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# ==================== INTRA-ROUTE VND ====================
+
+def iter_intra_pairs(k, n):
+    """Sinh các cặp vị trí (i, j) cho neighborhood intra-route thứ k trên tuyến dài n."""
+    if k == 0:  # General Swap
+        return ((i, j) for i in range(n) for j in range(i + 1, n))
+    if k == 1:  # Relocate
+        return ((i, j) for i in range(n) for j in range(n + 1) if i != j and i != j - 1)
+    if n < 3:
+        return iter([])
+    if k == 2:  # Block Insertion
+        return ((i, j) for i in range(n - 1) for j in range(n - 1) if j != i and j != i + 1)
+    # 2-Opt
+    return ((i, j) for i in range(n - 1) for j in range(i + 2, n))
+
+
+def is_granular_intra_move(k, r, i, j, neighbor_sets):
+    """
+    Granular filter cho move intra-route: giữ move nếu nó tạo ít nhất một cung
+    (x, y) với y nằm trong danh sách láng giềng gần nhất của x.
+    """
+    n = len(r)
+    if k == 0:  # General Swap
+        return r[j] in neighbor_sets[r[i]] or r[i] in neighbor_sets[r[j]]
+    if k == 1:  # Relocate: arcs (r[j-1], r[i]) and (r[i], r[j])
+        return ((j < n and r[j] in neighbor_sets[r[i]])
+                or (j > 0 and r[i] in neighbor_sets[r[j - 1]]))
+    if k == 2:  # Block Insertion: arcs (r[j-1], r[i]) and (r[i+1], r[j])
+        return r[j] in neighbor_sets[r[i + 1]] or (j > 0 and r[i] in neighbor_sets[r[j - 1]])
+    # 2-Opt: arcs (r[i], r[j]) and (r[i+1], r[j+1])
+    return r[j] in neighbor_sets[r[i]] or (j + 1 < n and r[j + 1] in neighbor_sets[r[i + 1]])
+
+
+def build_intra_move(k, r, i, j):
+    """Dựng tuyến mới cho move intra-route thứ k (chèn về trước hoặc về sau đều hợp lệ)."""
+    if k == 0:  # General Swap
+        return r[:i] + [r[j]] + r[i+1:j] + [r[i]] + r[j+1:]
+    if k == 1:  # Relocate r[i] to before position j
+        if j > i:
+            return r[:i] + r[i+1:j] + [r[i]] + r[j:]
+        return r[:j] + [r[i]] + r[j:i] + r[i+1:]
+    if k == 2:  # Block Insertion of (r[i], r[i+1]) before position j
+        if j > i:
+            return r[:i] + r[i+2:j] + [r[i], r[i+1]] + r[j:]
+        return r[:j] + [r[i], r[i+1]] + r[j:i] + r[i+2:]
+    # 2-Opt
+    return r[:i+1] + r[i+1:j+1][::-1] + r[j+1:]
+
+
+def intra_move_segments(k, profile, i, j, demand, pickup):
+    """Mô tả tuyến sau move intra-route thứ k dưới dạng danh sách đoạn tải trọng."""
+    seg = profile.segment
+    n = len(profile.route)
+    if k == 0:  # General Swap
+        return (seg(0, i), customer_segment(profile.route[j], demand, pickup), seg(i + 1, j),
+                customer_segment(profile.route[i], demand, pickup), seg(j + 1, n))
+    if k == 1:  # Relocate
+        moved = customer_segment(profile.route[i], demand, pickup)
+        if j > i:
+            return (seg(0, i), seg(i + 1, j), moved, seg(j, n))
+        return (seg(0, j), moved, seg(j, i), seg(i + 1, n))
+    if k == 2:  # Block Insertion
+        if j > i:
+            return (seg(0, i), seg(i + 2, j), seg(i, i + 2), seg(j, n))
+        return (seg(0, j), seg(i, i + 2), seg(j, i), seg(i + 2, n))
+    # 2-Opt
+    return (seg(0, i + 1), reverse_segment(seg(i + 1, j + 1)), seg(j + 1, n))
+
+
+class IntraRouteCache:
+    """
+    LRU cache kết quả intra-route VND, khóa là tuple khách hàng theo thứ tự.
+    
+    Kết quả chỉ phụ thuộc vào tuyến đầu vào (với cùng instance, tải trọng và
+    granular setting), nên một cache chỉ được dùng cho một bộ tham số đó.
+    """
+    
+    __slots__ = ('maxsize', 'hits', 'misses', '_entries')
+    
+    def __init__(self, maxsize=INTRA_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, route):
+        """Trả về (best_route, best_route_cost) hoặc None."""
+        entry = self._entries.get(tuple(route))
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(tuple(route))
+        self.hits += 1
+        return list(entry[0]), entry[1]
+    
+    def put(self, route, best_route, best_route_cost):
+        """Lưu kết quả; tuyến đã tối ưu cũng được lưu (nó là điểm bất động)."""
+        entry = (tuple(best_route), best_route_cost)
+        for key in (tuple(route), entry[0]):
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+def intensify_route(route, cost_matrix, capacity, demand, pickup, route_cost=None, neighbor_sets=None,
+                    cache=None, strategy='first', sample_size=DEFAULT_SAMPLE_SIZE, eval_budget=None,
+                    cancel_token=None):
+    """
+    VND trên một tuyến với 4 neighborhood intra-route.
+    Nếu có neighbor_sets thì chỉ xét các move granular (is_granular_intra_move).
+    Nếu có cache (IntraRouteCache) thì tuyến đã gặp được trả về ngay; một cache
+    chỉ nên dùng với cùng một bộ tham số strategy/granular.
+    
+    Args:
+        strategy (str): 'first' (mặc định), 'best' hoặc 'sampled'
+        sample_size (int): Số move cải thiện cần gom với strategy='sampled'
+        eval_budget (int): Số move tối đa được đánh giá mỗi lượt neighborhood
+        cancel_token (CancellationToken): Kiểm tra trước mỗi lượt neighborhood;
+            tuyến dừng giữa chừng không được ghi vào cache
+    
+    Returns:
+        tuple: (best_route, best_route_cost)
+    """
+    best_route = route
+    best_route_cost = route_distance(route, cost_matrix) if route_cost is None else route_cost
+    if len(route) <= 1:
+        return best_route, best_route_cost
+    
+    if cache is not None:
+        cached = cache.get(route)
+        if cached is not None:
+            if cached[0] == route:
+                return route, best_route_cost
+            return cached
+    
+    profile = RouteLoadProfile(best_route, demand, pickup)
+    
+    # General Swap, Relocate, Block Insertion, 2-Opt
+    num_intra_neighborhoods = 4
     
+    k = 0
+    while k < num_intra_neighborhoods:
+        if cancel_token is not None and cancel_token.expired():
+            # Not a local optimum: return it, but do not cache it
+            return best_route, best_route_cost
+        
+        best_neighbor = None
+        best_neighbor_cost = best_route_cost - IMPROVEMENT_EPS
+        found = 0
+        evaluations = 0
+        
+        for i, j in iter_intra_pairs(k, len(best_route)):
+            if neighbor_sets is not None and not is_granular_intra_move(k, best_route, i, j, neighbor_sets):
+                continue
+            if eval_budget is not None and evaluations >= eval_budget:
+                break
+            evaluations += 1
+            
+            # O(1) load check before the neighbor route is built
+            segments = intra_move_segments(k, profile, i, j, demand, pickup)
+            orientation = segments_orientation(capacity, *segments)
+            if orientation is None:
+                continue
+            
+            neighbor_route = build_intra_move(k, best_route, i, j)
+            if orientation < 0:
+                neighbor_route.reverse()
+            
+            neighbor_cost = route_distance(neighbor_route, cost_matrix)
+            if neighbor_cost < best_route_cost - IMPROVEMENT_EPS:
+                found += 1
+                if neighbor_cost < best_neighbor_cost:
+                    best_neighbor = neighbor_route
+                    best_neighbor_cost = neighbor_cost
+                if strategy == 'first' or (strategy == 'sampled' and found >= sample_size):
+                    break
+        
+        if best_neighbor is not None:
+            best_route = best_neighbor
+            best_route_cost = best_neighbor_cost
+            profile = RouteLoadProfile(best_route, demand, pickup)
+            k = 0
+        else:
+            k += 1
+    
+    if cache is not None:
+        cache.put(route, best_route, best_route_cost)
+    return best_route, best_route_cost
+
+
+def vnd_intra_search(solution_vector, cost_matrix, capacity, demand, pickup, granular_k=None, cache=None,
+                     strategy='first', sample_size=DEFAULT_SAMPLE_SIZE, eval_budget=None, cancel_token=None):
+    """
+    VND cục bộ trên từng tuyến (intra-route).
+    
+    Args:
+        granular_k (int): Nếu có, chỉ xét move giữa các khách hàng nằm trong
+            granular_k láng giềng gần nhất của nhau
+        cache (IntraRouteCache): Cache kết quả theo tuyến (tùy chọn)
+        strategy (str): 'first' (mặc định), 'best' hoặc 'sampled'
+        sample_size (int): Số move cải thiện cần gom với strategy='sampled'
+        eval_budget (int): Số move tối đa được đánh giá mỗi lượt neighborhood
+        cancel_token (CancellationToken): Dừng sớm, giữ các tuyến đã cải thiện
+    """
+    validate_strategy(strategy)
+    neighbor_sets = None
+    if granular_k:
+        neighbor_sets = [set(neighbors) for neighbors in build_neighbor_lists(cost_matrix, granular_k)]
+    improved_routes = [intensify_route(route, cost_matrix, capacity, demand, pickup,
+                                       neighbor_sets=neighbor_sets, cache=cache, strategy=strategy,
+                                       sample_size=sample_size, eval_budget=eval_budget,
+                                       cancel_token=cancel_token)[0]
+                       for route in convert_vector_to_routes(solution_vector)]
     return convert_routes_to_vector(improved_routes)
 
 
+def intensify_solution(solution, capacity, demand, pickup, neighbor_sets=None, route_indices=None, cache=None,
+                       **search_options):
+    """
+    Chạy intra-route VND trên các tuyến của Solution (mặc định: mọi tuyến),
+    chỉ cập nhật tuyến thay đổi. search_options được chuyển cho intensify_route.
+    """
+    if route_indices is None:
+        route_indices = range(len(solution.routes))
+    for route_idx in route_indices:
+        route = solution.routes[route_idx]
+        best_route, _ = intensify_route(route, solution.cost_matrix, capacity, demand, pickup,
+                                        solution.route_costs[route_idx], neighbor_sets, cache,
+                                        **search_options)
+        if best_route is not route:
+            solution.set_route(route_idx, best_route)
+
+
 # ==================== MAIN VND ALGORITHM ====================
 
-def solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_seconds=60):
+def solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_seconds=60, granular_k=None,
+              intra_cache=None, strategy='best', intra_strategy='first', sample_size=DEFAULT_SAMPLE_SIZE,
+              eval_budget=None, workers=None, neighbor_lists=None, progress_callback=None,
+              cancel_token=None, parallel_search=None):
     """
     Giải bài toán VRPSPD bằng thuật toán VND hai cấp.
     
@@ -231,6 +990,29 @@ def solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_se
         pickup (list): Lượng hàng nhận
         capacity (int): Tải trọng xe
         max_time_seconds (int): Thời gian chạy tối đa
+        granular_k (int): Granular neighborhoods - chỉ xét move giữa các khách hàng
+            nằm trong granular_k láng giềng gần nhất (None = xét toàn bộ)
+        intra_cache (IntraRouteCache): Cache intra-route dùng lại giữa các lần gọi
+            với cùng instance/tham số (None = tạo cache mới)
+        strategy (str): Chiến lược duyệt neighborhood inter-route:
+            'best' (mặc định), 'first' hoặc 'sampled'
+        intra_strategy (str): Chiến lược duyệt neighborhood intra-route (mặc định 'first')
+        sample_size (int): Số move cải thiện cần gom với chiến lược 'sampled'
+        eval_budget (int): Số move tối đa được đánh giá mỗi lượt duyệt một
+            neighborhood (None = không giới hạn)
+        workers (int): Số process quét neighborhood inter-route song song
+            (None hoặc 1 = tuần tự, xem ParallelInterSearch)
+        neighbor_lists (list): Danh sách láng giềng đã tính sẵn bằng
+            build_neighbor_lists(cost_matrix, granular_k) (chỉ dùng khi có granular_k)
+        progress_callback (callable): Gọi progress_callback(dict) sau pha intra-route
+            ban đầu và mỗi khi lời giải được cải thiện, với dict gồm 'cost',
+            'k' (neighborhood vừa cải thiện), 'iterations' (số move đã nhận)
+            và 'elapsed' (giây)
+        cancel_token (CancellationToken): Dừng sớm (hủy hoặc deadline riêng),
+            trả về lời giải tốt nhất đã có như khi hết max_time_seconds
+        parallel_search (ParallelInterSearch): Pool đã tạo sẵn cho cùng instance
+            và neighbor_lists, dùng thay cho workers; người gọi tự đóng (để dùng
+            lại qua nhiều lần gọi, như ILS)
         
     Returns:
         dict: {
@@ -241,112 +1023,100 @@ def solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_se
             'computation_time': float,
             'initial_cost': float,
             'improvement': float,
+            'converged': bool,          # dừng vì không còn move cải thiện (không phải hết giờ / bị hủy)
             'route_details': list of dict
         }
     """
+    validate_strategy(strategy)
+    validate_strategy(intra_strategy)
+    
     start_time = time.time()
+    # One token for both limits: max_time_seconds and the caller's token
+    cancel_token = CancellationToken(start_time + max_time_seconds, cancel_token)
     
-    current_vector = initial_vector
-    current_cost = calculate_total_cost(current_vector, cost_matrix)
-    initial_cost = current_cost
-    
-    best_vector = current_vector
-    best_cost = current_cost
-    
-    # Inter-route neighborhoods (Ordering 2)
-    inter_neighborhoods = [
-        # Swap(1,1)
-        lambda vec: (swap_one_one_inter_route(vec, r_A_idx, r_B_idx, i, j) 
-                    for r_A_idx, r_A in enumerate(convert_vector_to_routes(vec)) 
-                    for r_B_idx, r_B in enumerate(convert_vector_to_routes(vec)) 
-                    if r_A_idx < r_B_idx 
-                    for i in range(len(r_A)) 
-                    for j in range(len(r_B))),
-        # Shift(1,0)
-        lambda vec: (relocate_inter_route(vec, r_from_idx, r_to_idx, i, j) 
-                    for r_from_idx, r_from in enumerate(convert_vector_to_routes(vec)) 
-                    for r_to_idx, r_to in enumerate(convert_vector_to_routes(vec)) 
-                    if r_from_idx != r_to_idx 
-                    for i in range(len(r_from)) 
-                    for j in range(len(r_to) + 1)),
-        # Shift(2,0)
-        lambda vec: (shift_two_zero_inter_route(vec, r_from_idx, r_to_idx, i, j) 
-                    for r_from_idx, r_from in enumerate(convert_vector_to_routes(vec)) 
-                    if len(r_from) >= 2 
-                    for r_to_idx, r_to in enumerate(convert_vector_to_routes(vec)) 
-                    if r_from_idx != r_to_idx 
-                    for i in range(len(r_from) - 1) 
-                    for j in range(len(r_to) + 1)),
-        # Swap(2,1)
-        lambda vec: (swap_two_one_inter_route(vec, r_A_idx, r_B_idx, i, j) 
-                    for r_A_idx, r_A in enumerate(convert_vector_to_routes(vec)) 
-                    if len(r_A) >= 2 
-                    for r_B_idx, r_B in enumerate(convert_vector_to_routes(vec)) 
-                    if r_A_idx != r_B_idx 
-                    for i in range(len(r_A) - 1) 
-                    for j in range(len(r_B))),
-        # Swap(2,2)
-        lambda vec: (swap_two_two_inter_route(vec, r_A_idx, r_B_idx, i, j) 
-                    for r_A_idx, r_A in enumerate(convert_vector_to_routes(vec)) 
-                    if len(r_A) >= 2 
-                    for r_B_idx, r_B in enumerate(convert_vector_to_routes(vec)) 
-                    if r_A_idx < r_B_idx and len(r_B) >= 2 
-                    for i in range(len(r_A) - 1) 
-                    for j in range(len(r_B) - 1)),
-    ]
+    solution = Solution.from_vector(initial_vector, cost_matrix, demand, pickup)
+    initial_cost = solution.total_cost
     
-    k = 0
-    while k < len(inter_neighborhoods) and (time.time() - start_time) < max_time_seconds:
-        improvement_found = False
-        neighbor_generator = inter_neighborhoods[k](current_vector)
-        
-        best_neighbor_in_k_vector = None
-        best_neighbor_in_k_cost = current_cost
-        
-        for neighbor_vector in neighbor_generator:
-            if (time.time() - start_time) > max_time_seconds:
-                break
-            if neighbor_vector is None:
-                continue
+    # Candidate lists are computed once per instance
+    neighbor_sets = None
+    if not granular_k:
+        neighbor_lists = None
+    else:
+        if neighbor_lists is None:
+            neighbor_lists = build_neighbor_lists(cost_matrix, granular_k)
+        neighbor_sets = [set(neighbors) for neighbors in neighbor_lists]
+    
+    if intra_cache is None:
+        intra_cache = IntraRouteCache()
+    intra_options = {'strategy': intra_strategy, 'sample_size': sample_size, 'eval_budget': eval_budget,
+                     'cancel_token': cancel_token}
+    
+    # Intensify the starting solution once; afterwards only accepted moves change it
+    intensify_solution(solution, capacity, demand, pickup, neighbor_sets, cache=intra_cache, **intra_options)
+    
+    # Route pairs / customers known to have no improving move (don't-look bits)
+    memory = SearchMemory(len(INTER_NEIGHBORHOODS), len(cost_matrix), neighbor_lists)
+    
+    iterations = 0
+    if progress_callback is not None:
+        progress_callback({'cost': round(solution.total_cost, 2), 'k': None, 'iterations': 0,
+                           'elapsed': round(time.time() - start_time, 3)})
+    
+    parallel = parallel_search
+    if parallel is None and workers is not None and workers > 1:
+        parallel = ParallelInterSearch(workers, cost_matrix, demand, pickup, capacity, neighbor_lists)
+    
+    try:
+        # Inter-route neighborhoods (Ordering 2): Swap(1,1), Shift(1,0), Shift(2,0), Swap(2,1), Swap(2,2)
+        k = 0
+        while k < len(INTER_NEIGHBORHOODS) and not cancel_token.expired():
+            improvement_found = False
             
-            neighbor_routes = convert_vector_to_routes(neighbor_vector)
-            is_feasible, repaired_routes = feasibility_check_and_repair(neighbor_routes, capacity, demand, pickup)
+            if parallel is not None:
+                best_move = parallel.find_best_move(k, solution, capacity, demand, pickup, cancel_token, memory,
+                                                    strategy, sample_size, eval_budget)
+            else:
+                best_move = find_best_inter_move(k, solution, cost_matrix, capacity, demand, pickup, cancel_token,
+                                                 neighbor_lists, memory, strategy, sample_size, eval_budget)
             
-            if is_feasible:
-                intensified_vector = vnd_intra_search(convert_routes_to_vector(repaired_routes), 
-                                                     cost_matrix, capacity, demand, pickup)
-                intensified_cost = calculate_total_cost(intensified_vector, cost_matrix)
+            if best_move is not None:
+                _, route_idx_A, route_idx_B, new_route_A, new_route_B = best_move
                 
-                if intensified_cost < best_neighbor_in_k_cost:
-                    best_neighbor_in_k_vector = intensified_vector
-                    best_neighbor_in_k_cost = intensified_cost
-        
-        if best_neighbor_in_k_vector is not None:
-            current_vector = best_neighbor_in_k_vector
-            current_cost = best_neighbor_in_k_cost
-            
-            if current_cost < best_cost:
-                best_vector = current_vector
-                best_cost = current_cost
+                # Apply the accepted move in place; only the (at most two) routes it
+                # touched need intra-route intensification, the rest are already optimal
+                touched = solution.apply_move(route_idx_A, route_idx_B, new_route_A, new_route_B)
+                intensify_solution(solution, capacity, demand, pickup, neighbor_sets, touched, intra_cache,
+                                   **intra_options)
+                memory.routes_changed(solution, touched)
+                
+                improvement_found = True
+                iterations += 1
+                if progress_callback is not None:
+                    progress_callback({'cost': round(solution.total_cost, 2), 'k': k, 'iterations': iterations,
+                                       'elapsed': round(time.time() - start_time, 3)})
             
-            improvement_found = True
-        
-        if improvement_found:
-            k = 0
-        else:
-            k += 1
+            if improvement_found:
+                k = 0
+            else:
+                k += 1
+    finally:
+        if parallel is not None and parallel is not parallel_search:
+            parallel.close()
+    # Every neighborhood was fully scanned without improvement
+    converged = k >= len(INTER_NEIGHBORHOODS) and not cancel_token.expired()
     
     # Calculate results
     end_time = time.time()
     computation_time = end_time - start_time
     
-    routes = convert_vector_to_routes(best_vector)
+    solution.compact()
+    routes = solution.to_routes()
+    best_cost = sum(solution.route_costs)
     improvement = ((initial_cost - best_cost) / initial_cost * 100) if initial_cost > 0 else 0
     
     # Prepare route details
     route_details = []
-    for idx, route in enumerate(routes, 1):
-        dist = route_distance(route, cost_matrix)
+    for idx, (route, dist) in enumerate(zip(routes, solution.route_costs), 1):
         total_del = sum(demand[i] for i in route)
         total_pick = sum(pickup[i] for i in route)
         
@@ -361,11 +1131,12 @@ def solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_se
     
     return {
         'routes': routes,
-        'solution_vector': best_vector,
+        'solution_vector': solution.to_vector(),
         'total_cost': round(best_cost, 2),
         'num_routes': len(routes),
         'computation_time': round(computation_time, 4),
         'initial_cost': round(initial_cost, 2),
         'improvement': round(improvement, 2),
+        'converged': converged,
         'route_details': route_details
     }
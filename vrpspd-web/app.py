@@ -2,16 +2,19 @@
 Flask Web Application for VRPSPD Solver
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response
 import os
 import json
+import time
 from werkzeug.utils import secure_filename
 import traceback
 
 # ============================================================================
 # STEP 1: Import core algorithms and file parser
 # ============================================================================
-from algorithms import read_vrpspd_file, solve_savings, solve_vnd
+from algorithms import solve_savings, calculate_total_cost
+from algorithms.ils import solve_vnd_or_ils
+from algorithms.utils import validate_solution_vector
 
 # ============================================================================
 # STEP 2: Import visualization module
@@ -26,8 +29,31 @@ from algorithms.excel_export import create_excel_report
 # ============================================================================
 # STEP 4: Import batch processing modules
 # ============================================================================
-from algorithms.batch_processor import process_batch_files, create_batch_summary
+from algorithms.batch_processor import (
+    process_batch_files,
+    iter_batch_files,
+    create_batch_summary,
+    BatchSummary,
+    default_batch_workers
+)
 from algorithms.batch_excel_export import create_batch_excel_report
+from algorithms.batch_checkpoint import BATCH_CHECKPOINT_DIR
+
+# ============================================================================
+# STEP 5: Import instance registry (parsed instances kept in memory)
+# ============================================================================
+from algorithms.registry import InstanceRegistry
+
+# ============================================================================
+# STEP 6: Import background job queue
+# ============================================================================
+from algorithms.jobs import JobQueue, JOB_FINISHED_STATES
+from algorithms.cancellation import CancellationToken
+
+# ============================================================================
+# STEP 7: Import result cache
+# ============================================================================
+from algorithms.result_cache import ResultCache, RESULT_CACHE_DIR, is_cacheable
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
@@ -36,10 +62,71 @@ app.config['SECRET_KEY'] = 'vrpspd-secret-key-2026'
 
 ALLOWED_EXTENSIONS = {'txt'}
 
+# Parsed instances shared by all requests of this process
+instance_registry = InstanceRegistry()
+
+# Bounded pool for background solve jobs
+job_queue = JobQueue()
+
+# Reproducible solve results, shared by /api/solve and batch runs
+result_cache = ResultCache(os.path.join(app.config['UPLOAD_FOLDER'], RESULT_CACHE_DIR))
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def clamp_workers(workers):
+    """
+    Giới hạn số process của một request trong [1, số CPU / số job chạy cùng lúc],
+    để tổng số process của các job đồng thời không vượt số CPU.
+    """
+    limit = max(1, (os.cpu_count() or 1) // job_queue.max_workers)
+    return min(max(1, int(workers)), limit)
+
+
+def get_vnd_options(data):
+    """
+    Đọc tham số VND (tùy chọn) từ request JSON, trả về kwargs cho solve_vnd.
+    
+    Request JSON (mọi khóa đều tùy chọn):
+        'vnd_options': {
+            'max_time_seconds': float,   # mặc định 60
+            'granular_k': int,
+            'strategy': 'best' | 'first' | 'sampled',
+            'intra_strategy': 'first' | 'best' | 'sampled',
+            'sample_size': int,
+            'eval_budget': int,
+            'workers': int,              # process song song cho inter-route (xem clamp_workers)
+            'ils': {                     # có khóa này = chạy ILS (solve_ils) tới hết max_time_seconds
+                'acceptance': 'better' | 'threshold' | 'annealing',
+                'acceptance_threshold': float,
+                'perturbation': 'segment' | 'ruin' | 'mixed',
+                'ruin_size': int,
+                'max_iterations': int,
+                'seed': int
+            }
+        }
+    """
+    options = data.get('vnd_options') or {}
+    vnd_kwargs = {'max_time_seconds': float(options.get('max_time_seconds', 60))}
+    for key in ('strategy', 'intra_strategy'):
+        if options.get(key):
+            vnd_kwargs[key] = str(options[key])
+    for key in ('granular_k', 'sample_size', 'eval_budget'):
+        if options.get(key) is not None:
+            vnd_kwargs[key] = int(options[key])
+    if options.get('workers') is not None:
+        vnd_kwargs['workers'] = clamp_workers(options['workers'])
+    if options.get('ils') is not None:
+        ils_options = options['ils'] if isinstance(options['ils'], dict) else {}
+        vnd_kwargs['ils'] = {}
+        for key, convert in (('acceptance', str), ('perturbation', str), ('acceptance_threshold', float),
+                             ('ruin_size', int), ('max_iterations', int), ('seed', int)):
+            if ils_options.get(key) is not None:
+                vnd_kwargs['ils'][key] = convert(ils_options[key])
+    return vnd_kwargs
+
+
 # ============================================================================
 # STEP 1: Basic routes - Index and Upload
 # ============================================================================
@@ -59,6 +146,8 @@ def upload_file():
         JSON: {
             'success': bool,
             'filename': str,
+            'filepath': str,
+            'instance_id': str,
             'data': {
                 'num_customers': int,
                 'num_vehicles': int,
@@ -83,14 +172,15 @@ def upload_file():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
-        # Parse file
-        cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(filepath)
+        # Parse file once; /api/solve reuses it through instance_id
+        instance = instance_registry.load(filepath)
+        cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = instance.data
         
-        # Store data in session or temp storage (for now, we'll return it)
         return jsonify({
             'success': True,
             'filename': filename,
             'filepath': filepath,
+            'instance_id': instance.instance_id,
             'data': {
                 'num_customers': len(cost_matrix) - 1,  # Exclude depot
                 'num_vehicles': num_vehicles,
@@ -111,6 +201,180 @@ def upload_file():
 # STEP 2: Updated to include visualization data
 # ============================================================================
 
+def solve_instance(instance, algorithms, vnd_kwargs, progress_callback=None, cancel_token=None,
+                   warm_start_vector=None):
+    """
+    Chạy các thuật toán được chọn trên một ProblemInstance.
+    
+    warm_start_vector (lời giải hợp lệ, see validate_solution_vector) là điểm
+    bắt đầu của VND thay cho lời giải Savings.
+    
+    Returns:
+        dict: {'savings': {...}, 'vnd': {...}} (chỉ các thuật toán đã chạy)
+    """
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = instance.data
+    vnd_kwargs = dict(vnd_kwargs)
+    if vnd_kwargs.get('granular_k'):
+        vnd_kwargs['neighbor_lists'] = instance.neighbor_lists(vnd_kwargs['granular_k'])
+    
+    vnd_kwargs['cancel_token'] = cancel_token
+    if progress_callback is not None:
+        vnd_kwargs['progress_callback'] = progress_callback
+        progress_callback({'stage': 'savings'})
+    
+    results = {}
+    
+    # Run Savings if selected
+    if 'savings' in algorithms:
+        savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles,
+                                       cancel_token=cancel_token)
+        results['savings'] = savings_result
+    
+    # Run VND if selected (requires Savings first)
+    if 'vnd' in algorithms:
+        if 'savings' not in results and warm_start_vector is None:
+            # Run Savings first to get initial solution
+            savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles,
+                                           cancel_token=cancel_token)
+            results['savings'] = savings_result
+        
+        if progress_callback is not None:
+            progress_callback({'stage': 'vnd'})
+        if warm_start_vector is not None:
+            initial_vector = warm_start_vector
+        else:
+            initial_vector = results['savings']['solution_vector']
+        vnd_result = solve_vnd_or_ils(initial_vector, cost_matrix, demand, pickup, capacity, **vnd_kwargs)
+        results['vnd'] = vnd_result
+    
+    return results
+
+
+def get_warm_start(data, instance):
+    """
+    Điểm bắt đầu warm-start của VND: lời giải tốt hơn giữa 'initial_solution'
+    của client và incumbent đã lưu (khi 'warm_start' bật).
+    
+    Returns:
+        dict or None: {'solution_vector', 'total_cost', 'source': 'client' | 'incumbent'}
+    
+    Raises:
+        ValueError: initial_solution không hợp lệ
+    """
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = instance.data
+    candidates = []
+    if data.get('initial_solution'):
+        vector = [int(node) for node in data['initial_solution']]
+        validate_solution_vector(vector, instance.num_customers, capacity, demand, pickup)
+        candidates.append({'solution_vector': vector, 'source': 'client'})
+    if data.get('warm_start'):
+        incumbent = result_cache.incumbent(instance.content_hash)
+        if incumbent is not None:
+            try:
+                validate_solution_vector(incumbent['solution_vector'], instance.num_customers, capacity,
+                                         demand, pickup)
+                candidates.append({'solution_vector': incumbent['solution_vector'], 'source': 'incumbent'})
+            except ValueError:
+                pass  # Stale entry (e.g. the file was edited under the same name)
+    for candidate in candidates:
+        candidate['total_cost'] = round(calculate_total_cost(candidate['solution_vector'], cost_matrix), 2)
+    return min(candidates, key=lambda candidate: candidate['total_cost'], default=None)
+
+
+def run_solve(data, progress_callback=None, cancel_token=None):
+    """
+    Giải một instance theo request JSON của /api/solve.
+    
+    Args:
+        progress_callback (callable): Nhận dict tiến độ ('stage', và các trường
+            do solve_vnd báo: 'cost', 'k', 'iterations', 'elapsed')
+        cancel_token (CancellationToken): Dừng Savings/VND sớm (lời giải tốt nhất đã có)
+    
+    Request JSON (ngoài 'instance_id' / 'filepath', 'algorithms', 'vnd_options'):
+        'use_cache': bool,               # mặc định True: dùng / lưu kết quả trong result_cache;
+                                         # kết quả lấy từ cache có 'cached': True
+        'warm_start': bool,              # VND tiếp tục từ incumbent đã lưu của instance
+                                         # (không phụ thuộc use_cache)
+        'initial_solution': list         # hoặc từ lời giải (vector) của client
+    
+    Lời giải tốt nhất của mỗi lần giải được đề xuất làm incumbent, nên các lần
+    chạy warm_start liên tiếp cải thiện dần thay vì bắt đầu lại từ Savings.
+    
+    Returns:
+        dict: Response JSON của /api/solve
+    """
+    instance_id = data.get('instance_id')
+    filepath = data.get('filepath')
+    algorithms = data.get('algorithms', ['savings'])
+    vnd_kwargs = get_vnd_options(data)
+    
+    instance = instance_registry.get(instance_id) if instance_id else None
+    if instance is None:
+        if not filepath or not os.path.exists(filepath):
+            return {'success': False, 'error': 'File not found'}
+        instance = instance_registry.load(filepath)
+    
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = instance.data
+    
+    use_cache = data.get('use_cache', True)
+    warm_start = None
+    if 'vnd' in algorithms:
+        try:
+            warm_start = get_warm_start(data, instance)
+        except ValueError as e:
+            return {'success': False, 'error': f'Invalid initial_solution: {e}'}
+    
+    cache_key = None
+    cached = None
+    # A warm-started run depends on its starting point, not just the parameters
+    if use_cache and warm_start is None:
+        cache_key = result_cache.key(instance.content_hash, algorithms, vnd_kwargs)
+        cached = result_cache.get(cache_key)
+    
+    if cached is not None:
+        results = cached['results']
+        if progress_callback is not None:
+            progress_callback({'stage': 'cached'})
+    else:
+        results = solve_instance(instance, algorithms, vnd_kwargs, progress_callback, cancel_token,
+                                 warm_start and warm_start['solution_vector'])
+        if cache_key is not None and is_cacheable(results, cancel_token):
+            result_cache.put(cache_key, {'results': results, 'problem_info': {
+                'num_customers': len(cost_matrix) - 1,
+                'num_vehicles': num_vehicles,
+                'capacity': capacity
+            }})
+    
+    best_result = results.get('vnd') or results.get('savings')
+    if best_result:
+        result_cache.offer_incumbent(instance.content_hash, best_result['solution_vector'],
+                                     best_result['total_cost'])
+    
+    # ========================================================================
+    # STEP 2: Generate visualization data
+    # ========================================================================
+    if best_result:
+        visualization_data = create_plotly_data(best_result['routes'], cost_matrix, demand, pickup,
+                                                instance.coordinates())
+        plotly_figure = create_plotly_figure_json(visualization_data)
+    else:
+        plotly_figure = None
+    
+    return {
+        'success': True,
+        'instance_id': instance.instance_id,
+        'results': results,
+        'problem_info': {
+            'num_customers': len(cost_matrix) - 1,
+            'num_vehicles': num_vehicles,
+            'capacity': capacity
+        },
+        'visualization': plotly_figure,  # STEP 2: Return visualization data
+        'cached': cached is not None,
+        'warm_start': warm_start and {'source': warm_start['source'], 'cost': warm_start['total_cost']}
+    }
+
+
 @app.route('/api/solve', methods=['POST'])
 def solve():
     """
@@ -118,13 +382,16 @@ def solve():
     
     Request JSON:
         {
-            'filepath': str,
-            'algorithms': ['savings', 'vnd']  # or ['savings'] or ['vnd']
+            'instance_id': str,  # from /api/upload (preferred)
+            'filepath': str,     # used when instance_id is missing or evicted
+            'algorithms': ['savings', 'vnd'],  # or ['savings'] or ['vnd']
+            'vnd_options': {...}  # optional, see get_vnd_options
         }
     
     Returns:
         JSON: {
             'success': bool,
+            'instance_id': str,
             'results': {
                 'savings': {...},
                 'vnd': {...}
@@ -132,54 +399,7 @@ def solve():
         }
     """
     try:
-        data = request.get_json()
-        filepath = data.get('filepath')
-        algorithms = data.get('algorithms', ['savings'])
-        
-        if not filepath or not os.path.exists(filepath):
-            return jsonify({'success': False, 'error': 'File not found'})
-        
-        # Parse file
-        cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(filepath)
-        
-        results = {}
-        
-        # Run Savings if selected
-        if 'savings' in algorithms:
-            savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
-            results['savings'] = savings_result
-        
-        # Run VND if selected (requires Savings first)
-        if 'vnd' in algorithms:
-            if 'savings' not in results:
-                # Run Savings first to get initial solution
-                savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
-                results['savings'] = savings_result
-            
-            initial_vector = results['savings']['solution_vector']
-            vnd_result = solve_vnd(initial_vector, cost_matrix, demand, pickup, capacity, max_time_seconds=60)
-            results['vnd'] = vnd_result
-        
-        # ========================================================================
-        # STEP 2: Generate visualization data
-        # ========================================================================
-        best_result = results.get('vnd') or results.get('savings')
-        if best_result:
-            visualization_data = create_plotly_data(best_result['routes'], cost_matrix, demand, pickup)
-            plotly_figure = create_plotly_figure_json(visualization_data)
-        else:
-            plotly_figure = None
-        
-        return jsonify({
-            'success': True,
-            'results': results,
-            'problem_info': {
-                'num_customers': len(cost_matrix) - 1,
-                'num_vehicles': num_vehicles,
-                'capacity': capacity
-            },
-            'visualization': plotly_figure  # STEP 2: Return visualization data
-        })
+        return jsonify(run_solve(request.get_json()))
     
     except Exception as e:
         return jsonify({
@@ -275,11 +495,108 @@ def batch_upload():
         })
 
 
+def get_batch_options(data):
+    """
+    Đọc tham số batch (tùy chọn) từ request JSON, trả về kwargs cho
+    process_batch_files / iter_batch_files.
+    
+    Request JSON (mọi khóa đều tùy chọn):
+        'vnd_options': {...},            # see get_vnd_options (mặc định 60 giây / instance)
+        'batch_options': {
+            'workers': int,              # process giải song song, mặc định (và tối đa) phần CPU
+                                         # của một job, xem clamp_workers
+            'timeout_seconds': float,    # giới hạn thời gian mỗi instance
+            'time_budget_seconds': float, # ngân sách cho cả batch, chia theo kích thước instance
+            'checkpoint_id': str,        # lưu kết quả từng file để chạy tiếp sau sự cố
+            'resume': bool               # mặc định True: bỏ qua file đã có trong checkpoint
+        },
+        'use_cache': bool                # mặc định True: dùng / lưu result_cache
+    
+    Raises:
+        ValueError: checkpoint_id không hợp lệ
+    """
+    batch_options = data.get('batch_options') or {}
+    timeout_seconds, time_budget_seconds = (
+        None if batch_options.get(key) is None else float(batch_options[key])
+        for key in ('timeout_seconds', 'time_budget_seconds')
+    )
+    checkpoint_path = None
+    if batch_options.get('checkpoint_id'):
+        checkpoint_name = secure_filename(str(batch_options['checkpoint_id']))
+        if not checkpoint_name:
+            raise ValueError('Invalid checkpoint_id')
+        checkpoint_path = os.path.join(app.config['UPLOAD_FOLDER'], BATCH_CHECKPOINT_DIR,
+                                       checkpoint_name + '.jsonl')
+    return {
+        'workers': clamp_workers(batch_options.get('workers') or default_batch_workers()),
+        'timeout_seconds': timeout_seconds,
+        'time_budget_seconds': time_budget_seconds,
+        'vnd_options': get_vnd_options(data),
+        'checkpoint_path': checkpoint_path,
+        'resume': bool(batch_options.get('resume', True)),
+        'result_cache': result_cache if data.get('use_cache', True) else None
+    }
+
+
+def run_batch_solve(data, progress_callback=None, cancel_token=None):
+    """
+    Giải nhiều instance theo request JSON của /api/batch-solve
+    ('files', 'algorithms' và các tùy chọn của get_batch_options).
+    
+    Returns:
+        dict: Response JSON của /api/batch-solve
+    """
+    files_data = data.get('files', [])
+    algorithms = data.get('algorithms', ['savings'])
+    
+    if not files_data:
+        return {
+            'success': False,
+            'error': 'No files to process'
+        }
+    
+    # Process batch
+    batch_results = process_batch_files(files_data, algorithms, instance_registry, progress_callback,
+                                        cancel_token, **get_batch_options(data))
+    
+    # Create summary
+    summary = create_batch_summary(batch_results)
+    
+    return {
+        'success': True,
+        'batch_results': batch_results,
+        'summary': summary
+    }
+
+
 @app.route('/api/batch-solve', methods=['POST'])
 def batch_solve():
     """
     Solve multiple VRPSPD instances.
     """
+    try:
+        return jsonify(run_batch_solve(request.get_json()))
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        })
+
+
+@app.route('/api/batch-solve/stream', methods=['POST'])
+def batch_solve_stream():
+    """
+    Như /api/batch-solve nhưng trả về NDJSON: một dòng cho mỗi file ngay khi
+    file đó giải xong (theo thứ tự hoàn thành), dòng cuối là summary.
+    Server không giữ lại kết quả; client ngắt kết nối thì batch bị hủy.
+    
+    Response (application/x-ndjson), mỗi dòng một trong:
+        {'type': 'result', 'index': int, 'result': {...}}   # index trong 'files'
+        {'type': 'summary', 'summary': {...}}               # see create_batch_summary
+        {'type': 'error', 'error': str, 'traceback': str}
+    """
     try:
         data = request.get_json()
         files_data = data.get('files', [])
@@ -290,18 +607,7 @@ def batch_solve():
                 'success': False,
                 'error': 'No files to process'
             })
-        
-        # Process batch
-        batch_results = process_batch_files(files_data, algorithms)
-        
-        # Create summary
-        summary = create_batch_summary(batch_results)
-        
-        return jsonify({
-            'success': True,
-            'batch_results': batch_results,
-            'summary': summary
-        })
+        batch_options = get_batch_options(data)
     
     except Exception as e:
         return jsonify({
@@ -309,6 +615,25 @@ def batch_solve():
             'error': str(e),
             'traceback': traceback.format_exc()
         })
+    
+    def generate():
+        cancel_token = CancellationToken()
+        results = iter_batch_files(files_data, algorithms, instance_registry, cancel_token, **batch_options)
+        summary = BatchSummary()
+        try:
+            for index, file_result in results:
+                summary.add(file_result)
+                yield json.dumps({'type': 'result', 'index': index, 'result': file_result}) + '\n'
+            yield json.dumps({'type': 'summary', 'summary': summary.to_dict()}) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': str(e), 'traceback': traceback.format_exc()}) + '\n'
+        finally:
+            # Client gone (or done): stop solving the remaining files
+            cancel_token.cancel()
+            results.close()
+    
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/batch-export-excel', methods=['POST'])
@@ -349,6 +674,136 @@ def batch_export_excel():
         })
 
 
+# ============================================================================
+# STEP 6: Background jobs - submit returns a job id, clients poll for status
+# ============================================================================
+
+# Keep-alive comment interval and minimum spacing of progress events (seconds)
+SSE_KEEPALIVE_SECONDS = 15
+SSE_MIN_INTERVAL_SECONDS = 0.2
+
+
+def solve_job(job, data):
+    """Job nền cho /api/jobs/solve, báo chi phí hiện tại trong lúc VND chạy."""
+    return run_solve(data, lambda progress: job.update_progress(**progress), job.cancel_token)
+
+
+def batch_solve_job(job, data):
+    """Job nền cho /api/jobs/batch-solve, báo số file đã xong."""
+    total = len(data.get('files', []))
+    job.update_progress(done=0, total=total)
+    
+    def on_file_done(file_result):
+        job.update_progress(done=job.progress['done'] + 1, last_file=file_result['filename'])
+    
+    return run_batch_solve(data, on_file_done, job.cancel_token)
+
+
+@app.route('/api/jobs/solve', methods=['POST'])
+def submit_solve_job():
+    """
+    Như /api/solve nhưng chạy nền; trả về job_id ngay lập tức.
+    
+    Returns:
+        JSON: {'success': bool, 'job': {...}}  # see get_job
+    """
+    try:
+        job = job_queue.submit('solve', solve_job, request.get_json())
+        return jsonify({'success': True, 'job': job.to_dict()})
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        })
+
+
+@app.route('/api/jobs/batch-solve', methods=['POST'])
+def submit_batch_solve_job():
+    """Như /api/batch-solve nhưng chạy nền; trả về job_id ngay lập tức."""
+    try:
+        job = job_queue.submit('batch-solve', batch_solve_job, request.get_json())
+        return jsonify({'success': True, 'job': job.to_dict()})
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Trạng thái của job.
+    
+    Returns:
+        JSON: {
+            'success': bool,
+            'job': {
+                'job_id': str,
+                'kind': 'solve' | 'batch-solve',
+                'status': 'queued' | 'running' | 'done' | 'failed' | 'cancelled',
+                'progress': dict,
+                'elapsed': float,
+                'result': {...}  # response of /api/solve or /api/batch-solve, when done
+            }
+        }
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Hủy job. Job đang xếp hàng kết thúc ngay; job đang chạy dừng ở lần kiểm
+    tra tiếp theo của solver và giữ lời giải tốt nhất đã có trong 'result'.
+    
+    Returns:
+        JSON: {'success': bool, 'job': {...}}  # see get_job
+    """
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict(include_result=False)})
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events: mỗi khi job thay đổi gửi một event 'data: {...}' có
+    cùng dạng với 'job' của /api/jobs/<id> (không kèm result); với job solve,
+    progress gồm stage, cost, k, iterations, elapsed. Stream kết thúc sau
+    event có status đã kết thúc; lấy result qua /api/jobs/<id>.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    def stream():
+        version = -1
+        while True:
+            new_version = job.wait_for_change(version, timeout=SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = new_version
+            snapshot = job.to_dict(include_result=False)
+            yield f"data: {json.dumps(snapshot)}\n\n"
+            if snapshot['status'] in JOB_FINISHED_STATES:
+                return
+            # Coalesce bursts of improvements into one event
+            time.sleep(SSE_MIN_INTERVAL_SECONDS)
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 if __name__ == '__main__':
     # Create upload folder if not exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
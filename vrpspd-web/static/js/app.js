@@ -6,6 +6,8 @@
 // STEP 1: Global Variables
 // ============================================
 let currentFilepath = null;
+let currentInstanceId = null;
+let currentJobId = null; // Job being solved (cancelled when the page is closed)
 let currentResults = null;
 let currentProblemInfo = null; // Store problem info for export
 
@@ -24,6 +26,7 @@ const fileInput = document.getElementById('fileInput');
 const solveBtn = document.getElementById('solveBtn');
 const solveBtnText = document.getElementById('solveBtnText');
 const loadingIndicator = document.getElementById('loadingIndicator');
+const solveProgress = document.getElementById('solveProgress');
 const resultsContainer = document.getElementById('resultsContainer');
 const problemInfo = document.getElementById('problemInfo');
 const singleModeResults = document.getElementById('singleModeResults');
@@ -97,6 +100,7 @@ async function handleFileUpload(event) {
 
         if (result.success) {
             currentFilepath = result.filepath;
+            currentInstanceId = result.instance_id;
             
             // Display problem info
             document.getElementById('numCustomers').textContent = result.data.num_customers;
@@ -153,18 +157,12 @@ async function handleSolve() {
     solveBtn.disabled = true;
 
     try {
-        const response = await fetch('/api/solve', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                filepath: currentFilepath,
-                algorithms: algorithms
-            })
-        });
-
-        const result = await response.json();
+        solveProgress.textContent = '';
+        const result = await runJob('/api/jobs/solve', {
+            instance_id: currentInstanceId,
+            filepath: currentFilepath,
+            algorithms: algorithms
+        }, showSolveProgress);
 
         if (result.success) {
             // STEP 1: Store results and display
@@ -419,6 +417,97 @@ async function handleBatchExport() {
     }
 }
 
+// ============================================
+// STEP 6: Background Jobs - submit, then poll until finished
+// ============================================
+const JOB_POLL_INTERVAL_MS = 500;
+
+async function runJob(url, body, onProgress) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(body)
+    });
+    const submitted = await response.json();
+    if (!submitted.success) {
+        return submitted;
+    }
+
+    const jobId = submitted.job.job_id;
+    currentJobId = jobId;
+    try {
+        return await waitForJobResult(jobId, onProgress);
+    } finally {
+        currentJobId = null;
+    }
+}
+
+async function waitForJobResult(jobId, onProgress) {
+    if (window.EventSource) {
+        await waitForJobEvents(jobId, onProgress);
+    }
+    while (true) {
+        const status = await (await fetch(`/api/jobs/${jobId}`)).json();
+        if (!status.success) {
+            return status;
+        }
+        const job = status.job;
+        if (onProgress) {
+            onProgress(job);
+        }
+        // A job cancelled mid-run keeps its best solution so far
+        if (job.status === 'done' || (job.status === 'cancelled' && job.result)) {
+            return job.result;
+        }
+        if (job.status === 'failed' || job.status === 'cancelled') {
+            return {success: false, error: job.error || job.status, traceback: job.traceback};
+        }
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
+// Follow the job's Server-Sent Events until it finishes (or the stream fails,
+// in which case runJob falls back to polling)
+function waitForJobEvents(jobId, onProgress) {
+    return new Promise(resolve => {
+        const source = new EventSource(`/api/jobs/${jobId}/events`);
+        source.onmessage = event => {
+            const job = JSON.parse(event.data);
+            if (onProgress) {
+                onProgress(job);
+            }
+            if (['done', 'failed', 'cancelled'].includes(job.status)) {
+                source.close();
+                resolve();
+            }
+        };
+        source.onerror = () => {
+            source.close();
+            resolve();
+        };
+    });
+}
+
+// Stop the server-side solve when the user leaves the page
+window.addEventListener('pagehide', () => {
+    if (currentJobId && navigator.sendBeacon) {
+        navigator.sendBeacon(`/api/jobs/${currentJobId}/cancel`);
+    }
+});
+
+function showSolveProgress(job) {
+    const progress = job.progress;
+    if (progress.cost === undefined) {
+        solveProgress.textContent = progress.stage ? ` (${progress.stage})` : '';
+        return;
+    }
+    const neighborhood = progress.k === null ? '' : `, k=${progress.k}`;
+    solveProgress.textContent = ` Chi phí hiện tại: ${progress.cost} ` +
+        `(${progress.iterations} cải thiện${neighborhood}, ${progress.elapsed}s)`;
+}
+
 // ============================================
 // STEP 1: Notification Helper
 // ============================================
@@ -630,19 +719,15 @@ async function handleBatchSolve() {
         batchLoadingIndicator.style.display = 'block';
         batchProgress.textContent = `0/${batchFiles.length}`;
         
-        const response = await fetch('/api/batch-solve', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                files: batchFiles,
-                algorithms: algorithms
-            })
+        const result = await runJob('/api/jobs/batch-solve', {
+            files: batchFiles,
+            algorithms: algorithms
+        }, job => {
+            if (job.progress.total) {
+                batchProgress.textContent = `${job.progress.done}/${job.progress.total}`;
+            }
         });
         
-        const result = await response.json();
-        
         if (result.success) {
             batchResults = result;
             displayBatchResults(result.batch_results, result.summary);
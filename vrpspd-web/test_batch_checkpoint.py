@@ -0,0 +1,59 @@
+"""
+Test Batch Checkpoint / Resume
+Kiểm tra BatchCheckpoint: ghi từng kết quả, bỏ qua dòng hỏng, chạy tiếp bỏ qua file đã giải
+"""
+
+import json
+import os
+import tempfile
+
+from algorithms.batch_checkpoint import BatchCheckpoint
+from algorithms.batch_processor import process_batch_files
+
+UPLOADS = 'static/uploads'
+FILES = [{'filename': name, 'filepath': f'{UPLOADS}/{name}'}
+         for name in ('20_2_01.txt', '20_2_02.txt')]
+
+
+def test_checkpoint_survives_partial_line():
+    """Dòng cuối ghi dở (process chết) bị bỏ qua, record sau vẫn đọc được."""
+    print("=" * 60)
+    print("TESTING BATCH CHECKPOINT")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'run.jsonl')
+        checkpoint = BatchCheckpoint(path)
+        checkpoint.record('a', {'filename': 'a.txt', 'success': True})
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"key": "b", "resu')
+        checkpoint = BatchCheckpoint(path)
+        assert len(checkpoint) == 1 and checkpoint.get('b') is None
+        checkpoint.record('c', {'filename': 'c.txt', 'success': True})
+        assert BatchCheckpoint(path).get('c') == {'filename': 'c.txt', 'success': True}
+    print("   ✓ Truncated record skipped, later records intact")
+
+
+def test_batch_resume():
+    """Chạy lại với cùng cấu hình lấy kết quả từ checkpoint; đổi cấu hình thì giải lại."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'run.jsonl')
+        first = process_batch_files(FILES[:1], ['savings'], checkpoint_path=path)
+        assert not first[0].get('resumed')
+
+        resumed = process_batch_files(FILES, ['savings'], checkpoint_path=path)
+        assert resumed[0]['resumed'] and not resumed[1].get('resumed')
+        assert resumed[0]['results'] == first[0]['results']
+        with open(path, encoding='utf-8') as f:
+            assert [json.loads(line)['filename'] for line in f] == ['20_2_01.txt', '20_2_02.txt']
+
+        other_config = process_batch_files(FILES[:1], ['savings', 'vnd'], checkpoint_path=path,
+                                           vnd_options={'max_time_seconds': 1})
+        assert not other_config[0].get('resumed')
+    print("   ✓ Completed files skipped on resume, keyed by solver config")
+
+
+if __name__ == '__main__':
+    test_checkpoint_survives_partial_line()
+    test_batch_resume()
+    print("\n✅ ALL TESTS PASSED!")
@@ -0,0 +1,142 @@
+"""
+Test Parallel Batch Processing
+Kiểm tra process_batch_files song song: cùng kết quả với tuần tự, giữ thứ tự, cô lập lỗi,
+timeout, chia ngân sách thời gian (BatchTimeScheduler) và trả kết quả dạng stream
+"""
+
+import os
+import threading
+import time
+
+from algorithms import batch_processor
+from algorithms.batch_processor import process_batch_files, iter_batch_files, create_batch_summary, BatchSummary
+from algorithms.batch_scheduler import BatchTimeScheduler
+from algorithms.cancellation import CancellationToken
+
+UPLOADS = 'static/uploads'
+FILES = [{'filename': name, 'filepath': f'{UPLOADS}/{name}'}
+         for name in ('20_2_01.txt', '20_2_02.txt', '20_2_03.txt')]
+CRASH_FILE = {'filename': 'crash.txt', 'filepath': f'{UPLOADS}/20_2_01.txt'}
+_solve_batch_file = batch_processor._solve_batch_file
+
+
+def _crashing_solve_batch_file(file_data, *args, **kwargs):
+    """Worker chết đột ngột (như bị OOM killer) khi gặp CRASH_FILE."""
+    if file_data['filename'] == CRASH_FILE['filename']:
+        os._exit(1)
+    return _solve_batch_file(file_data, *args, **kwargs)
+
+
+def test_parallel_matches_sequential():
+    """Pool process cho cùng lời giải với chạy tuần tự, theo thứ tự đầu vào, lỗi được cô lập."""
+    print("=" * 60)
+    print("TESTING PARALLEL BATCH PROCESSING")
+    print("=" * 60)
+
+    files = FILES[:2] + [{'filename': 'missing.txt', 'filepath': f'{UPLOADS}/missing.txt'}] + FILES[2:]
+    vnd_options = {'max_time_seconds': 5}
+    sequential = process_batch_files(files, ['savings', 'vnd'], vnd_options=vnd_options)
+    done = []
+    parallel = process_batch_files(files, ['savings', 'vnd'], progress_callback=done.append, workers=2,
+                                   vnd_options=vnd_options)
+
+    assert [r['filename'] for r in parallel] == [f['filename'] for f in files]
+    assert sorted(r['filename'] for r in done) == sorted(f['filename'] for f in files)
+    assert not parallel[2]['success'] and parallel[2]['error']
+    for seq, par in zip(sequential, parallel):
+        assert seq['success'] == par['success']
+        if seq['success']:
+            assert par['results']['vnd']['routes'] == seq['results']['vnd']['routes']
+    print(f"   ✓ {len(parallel)} files in input order, missing file isolated")
+
+
+def test_worker_crash_is_isolated():
+    """Worker chết làm hỏng pool: pool được tạo lại và các file còn lại vẫn được giải."""
+    files = FILES[:2] + [CRASH_FILE] + FILES[2:]
+    batch_processor._solve_batch_file = _crashing_solve_batch_file
+    try:
+        results = process_batch_files(files, ['savings'], workers=2)
+    finally:
+        batch_processor._solve_batch_file = _solve_batch_file
+
+    assert [r['filename'] for r in results] == [f['filename'] for f in files]
+    assert not results[2]['success'] and 'crashed' in results[2]['error']
+    # Submitted after the crash, so it runs on the rebuilt pool
+    assert results[3]['success']
+    failed = sum(not r['success'] for r in results)
+    print(f"   ✓ Worker crash isolated ({failed} in-flight file(s) failed, batch completed)")
+
+
+def test_parallel_cancel():
+    """Hủy batch song song dừng ngay các instance đang chạy trong worker (không chờ hết giờ)."""
+    token = CancellationToken()
+    threading.Timer(1.0, token.cancel).start()
+    start = time.time()
+    # ILS keeps running until its time limit unless it is cancelled
+    results = process_batch_files(FILES, ['vnd'], cancel_token=token, workers=2,
+                                  vnd_options={'max_time_seconds': 30, 'ils': {}})
+    elapsed = time.time() - start
+    assert elapsed < 10
+    assert [r['filename'] for r in results] == [f['filename'] for f in FILES]
+    assert all(r['success'] for r in results[:2]) and results[2]['error'] == 'Cancelled'
+    print(f"   ✓ Parallel batch cancelled after {elapsed:.2f}s (instance limit 30s)")
+
+
+def test_instance_timeout():
+    """Instance hết giờ vẫn trả về lời giải hợp lệ và được đánh dấu timed_out."""
+    results = process_batch_files(FILES[:1], ['vnd'], timeout_seconds=0)
+    result = results[0]
+    assert result['success'] and result['timed_out']
+    served = sorted(c for route in result['results']['vnd']['routes'] for c in route)
+    assert served == list(range(1, result['problem_info']['num_customers'] + 1))
+    print("   ✓ Timed-out instance keeps a valid solution")
+
+
+def test_time_budget_scheduler():
+    """Thời gian cấp tỉ lệ với kích thước; phần không dùng được chia lại cho instance sau."""
+    scheduler = BatchTimeScheduler(100, [20, 60, 20], min_seconds=0)
+    first = scheduler.start(0)
+    assert abs(first - 20) < 0.5
+    scheduler.finish(0)  # converged immediately: its 20 s go back to the pool
+    second = scheduler.start(1)
+    assert abs(second - 75) < 0.5
+    print(f"   ✓ Allocated {first:.1f}s then {second:.1f}s (reclaimed unused time)")
+
+    scheduler = BatchTimeScheduler(10, [1, 1, 1, 1], workers=2, min_seconds=0)
+    assert abs(scheduler.start(0) - 5) < 0.5 and abs(scheduler.start(1) - 5) < 0.5
+    print("   ✓ Parallel workers share the wall-clock budget")
+
+
+def test_batch_time_budget():
+    """Batch với time_budget_seconds kết thúc gần ngân sách và mọi file đều có lời giải."""
+    start = time.time()
+    results = process_batch_files(FILES, ['vnd'], time_budget_seconds=3)
+    elapsed = time.time() - start
+    assert all(r['success'] for r in results) and elapsed < 3 + 2
+    print(f"   ✓ {len(results)} files solved in {elapsed:.2f}s with a 3s budget")
+
+
+def test_iter_batch_files():
+    """iter_batch_files trả từng kết quả kèm index; summary cộng dồn bằng create_batch_summary."""
+    files = FILES + [{'filename': 'missing.txt', 'filepath': f'{UPLOADS}/missing.txt'}]
+    summary = BatchSummary()
+    streamed = {}
+    for index, file_result in iter_batch_files(files, ['savings', 'vnd'], vnd_options={'max_time_seconds': 2}):
+        streamed[index] = file_result
+        summary.add(file_result)
+    results = [streamed[index] for index in range(len(files))]
+    assert [r['filename'] for r in results] == [f['filename'] for f in files]
+    assert summary.to_dict() == create_batch_summary(results)
+    assert summary.to_dict()['failed'] == 1
+    print(f"   ✓ {len(results)} results streamed, incremental summary matches")
+
+
+if __name__ == '__main__':
+    test_parallel_matches_sequential()
+    test_worker_crash_is_isolated()
+    test_parallel_cancel()
+    test_instance_timeout()
+    test_time_budget_scheduler()
+    test_batch_time_budget()
+    test_iter_batch_files()
+    print("\n✅ ALL TESTS PASSED!")
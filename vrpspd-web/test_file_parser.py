@@ -0,0 +1,181 @@
+"""
+Test File Parser & Binary Instance Cache
+Kiểm tra cache nhị phân của read_vrpspd_file
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from algorithms import read_vrpspd_file, solve_savings, solve_vnd, create_plotly_data
+from algorithms import distance, file_parser
+from algorithms.utils import build_neighbor_lists
+from algorithms.file_parser import (
+    parse_vrpspd_text,
+    load_instance_arrays,
+    instance_cache_paths,
+    file_content_hash
+)
+
+TEST_FILE = 'static/uploads/20_2_01.txt'
+
+
+def test_instance_cache():
+    """Kết quả đọc từ cache phải giống parse trực tiếp; file đổi nội dung phải parse lại."""
+    print("=" * 60)
+    print("TESTING BINARY INSTANCE CACHE")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'instance.txt')
+        shutil.copy(TEST_FILE, file_path)
+
+        expected = read_vrpspd_file(file_path, use_cache=False)
+        matrix_path, vectors_path = instance_cache_paths(file_path, file_content_hash(file_path))
+        assert not os.path.exists(matrix_path)
+
+        assert read_vrpspd_file(file_path) == expected
+        assert os.path.exists(matrix_path) and os.path.exists(vectors_path)
+        assert read_vrpspd_file(file_path) == expected
+        assert load_instance_arrays(file_path)['cost_matrix'].shape == (21, 21)
+        print("   ✓ Cache written and reused")
+
+        # Corrupt cache: parsed again and rewritten
+        with open(matrix_path, 'wb') as f:
+            f.write(b'garbage')
+        assert read_vrpspd_file(file_path) == expected
+        print("   ✓ Corrupt cache ignored")
+
+        # Edited file: new content hash, no stale cache
+        with open(file_path) as f:
+            text = f.read()
+        with open(file_path, 'w') as f:
+            f.write(text.replace('14.28', '15.28', 1))
+        assert read_vrpspd_file(file_path)[0] == parse_vrpspd_text(file_path)['cost_matrix'].tolist()
+        assert read_vrpspd_file(file_path)[0][0][1] == 15.28
+        print("   ✓ Edited file re-parsed")
+
+
+def test_instance_cache_pruning():
+    """Thư mục cache vượt INSTANCE_CACHE_MAX_BYTES thì instance ít được dùng nhất bị xóa."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for name in ('20_2_01.txt', '20_2_02.txt', '20_2_03.txt'):
+            paths.append(os.path.join(tmp_dir, name))
+            shutil.copy(os.path.join('static/uploads', name), paths[-1])
+        cached = [instance_cache_paths(path, file_content_hash(path)) for path in paths]
+
+        max_bytes = file_parser.INSTANCE_CACHE_MAX_BYTES
+        read_vrpspd_file(paths[0])
+        file_parser.INSTANCE_CACHE_MAX_BYTES = 2 * sum(os.path.getsize(path) for path in cached[0]) + 1024
+        try:
+            read_vrpspd_file(paths[1])
+            for path in cached[0] + cached[1]:
+                os.utime(path, (time.time() - 60, time.time() - 60))
+            read_vrpspd_file(paths[0])  # a cache hit marks it as recently used
+            read_vrpspd_file(paths[2])
+        finally:
+            file_parser.INSTANCE_CACHE_MAX_BYTES = max_bytes
+        assert all(os.path.exists(path) for path in cached[0] + cached[2])
+        assert not any(os.path.exists(path) for path in cached[1])
+    print("   ✓ Least recently used instance pruned")
+
+
+def test_parse_rejects_non_square_matrix():
+    """Ma trận chi phí không vuông phải báo lỗi rõ ràng."""
+    with open(TEST_FILE) as f:
+        lines = f.read().splitlines()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'broken.txt')
+        # Drop the last matrix row (line 0 is the "Cost matrix;" header)
+        with open(file_path, 'w') as f:
+            f.write('\n'.join(lines[:21] + lines[22:]))
+        try:
+            parse_vrpspd_text(file_path)
+            assert False, "non-square matrix must raise"
+        except ValueError as e:
+            assert 'square' in str(e)
+        print("   ✓ Non-square matrix rejected")
+
+
+def write_coordinate_instance(file_path, coordinates, rounding=None):
+    """Ghi instance dạng tọa độ: mỗi khách hàng giao 10, nhận 5, 3 xe tải 60."""
+    n = len(coordinates)
+    sections = [
+        "Coordinates;\n" + "\n".join(f"{i} {x} {y}" for i, (x, y) in enumerate(coordinates)),
+        "Delivery quantities;\n" + " ".join(["10"] * (n - 1)),
+        "Pick-up quantities;\n" + " ".join(["5"] * (n - 1)),
+        "Vehicle capacity;\n60 60 60"
+    ]
+    if rounding is not None:
+        sections.append(f"Distance rounding;\n{rounding}")
+    with open(file_path, 'w') as f:
+        f.write("\n~\n".join(sections) + "\n")
+
+
+def test_coordinate_instances():
+    """Instance dạng tọa độ: khoảng cách Euclidean, làm tròn, ma trận lười, tọa độ thật cho visualization."""
+    rng = np.random.default_rng(7)
+    coordinates = rng.uniform(0, 100, size=(16, 2)).round(3)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'coords.txt')
+        write_coordinate_instance(file_path, coordinates, rounding=2)
+
+        cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(file_path)
+        assert len(cost_matrix) == 16 and demand[0] == 0 and capacity == 60
+        dx, dy = coordinates[3] - coordinates[7]
+        assert cost_matrix[3][7] == round(float(np.hypot(dx, dy)), 2)
+        assert read_vrpspd_file(file_path)[0] == cost_matrix  # from cache
+        print("   ✓ Euclidean distances with rounding")
+
+        savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
+        vnd_result = solve_vnd(savings_result['solution_vector'], cost_matrix, demand, pickup, capacity,
+                               max_time_seconds=5)
+        assert sorted(c for route in vnd_result['routes'] for c in route) == list(range(1, 16))
+
+        visualization = create_plotly_data(vnd_result['routes'], cost_matrix, demand, pickup)
+        assert visualization['depot']['x'] == coordinates[0][0]
+        print("   ✓ Solved, visualization uses true coordinates")
+
+        lazy_min_nodes = distance.LAZY_MATRIX_MIN_NODES
+        distance.LAZY_MATRIX_MIN_NODES = 10
+        try:
+            lazy_matrix = read_vrpspd_file(file_path)[0]
+        finally:
+            distance.LAZY_MATRIX_MIN_NODES = lazy_min_nodes
+        assert isinstance(lazy_matrix, distance.LazyEuclideanMatrix)
+        assert [list(lazy_matrix[i]) for i in range(16)] == cost_matrix
+        assert np.asarray(lazy_matrix).tolist() == cost_matrix
+
+        # Savings and neighbour lists work in row blocks, never on the full matrix
+        block_rows, to_array = distance.DISTANCE_BLOCK_ROWS, distance.LazyEuclideanMatrix.__array__
+        distance.DISTANCE_BLOCK_ROWS = 4
+        distance.LazyEuclideanMatrix.__array__ = None
+        try:
+            lazy_result = solve_savings(lazy_matrix, demand, pickup, capacity, num_vehicles)
+            assert build_neighbor_lists(lazy_matrix, 5) == build_neighbor_lists(cost_matrix, 5)
+        finally:
+            distance.DISTANCE_BLOCK_ROWS = block_rows
+            distance.LazyEuclideanMatrix.__array__ = to_array
+        assert lazy_result['routes'] == savings_result['routes']
+        print("   ✓ Lazy matrix matches full matrix")
+
+        lazy_vnd = solve_vnd(lazy_result['solution_vector'], lazy_matrix, demand, pickup, capacity,
+                             max_time_seconds=5)
+        assert lazy_vnd['routes'] == vnd_result['routes']
+        # Every row is computed at most once: VND does not thrash the row cache
+        assert lazy_matrix.row_misses <= 16
+        print(f"   ✓ VND on lazy matrix computed {lazy_matrix.row_misses} rows once each")
+
+
+if __name__ == '__main__':
+    test_instance_cache()
+    test_instance_cache_pruning()
+    test_parse_rejects_non_square_matrix()
+    test_coordinate_instances()
+    print("\n✅ ALL TESTS PASSED!")
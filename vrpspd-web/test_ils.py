@@ -0,0 +1,84 @@
+"""
+Test Iterated Local Search (ILS)
+Kiểm tra solve_ils: lời giải hợp lệ, không tệ hơn VND, tái lập với seed, các tiêu chí chấp nhận
+"""
+
+from algorithms import read_vrpspd_file, solve_savings, solve_vnd, solve_ils
+from algorithms import ils, vnd
+from algorithms.ils import ILS_ACCEPTANCE
+
+TEST_FILE = 'static/uploads/50_4_05.txt'
+
+
+def load():
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+    return vector, cost_matrix, demand, pickup, capacity
+
+
+def test_ils_improves_on_vnd():
+    """ILS bắt đầu bằng VND nên không tệ hơn VND; mọi tiêu chí chấp nhận cho lời giải hợp lệ."""
+    print("=" * 60)
+    print("TESTING ITERATED LOCAL SEARCH")
+    print("=" * 60)
+
+    vector, cost_matrix, demand, pickup, capacity = load()
+    vnd_result = solve_vnd(vector, cost_matrix, demand, pickup, capacity)
+    for acceptance in ILS_ACCEPTANCE:
+        events = []
+        result = solve_ils(vector, cost_matrix, demand, pickup, capacity, acceptance=acceptance,
+                           max_iterations=30, seed=7, progress_callback=events.append)
+        served = sorted(c for route in result['routes'] for c in route)
+        assert served == list(range(1, len(cost_matrix)))
+        assert result['total_cost'] <= vnd_result['total_cost']
+        assert result['ils_iterations'] == 30 and not result['converged']
+        costs = [event['cost'] for event in events]
+        assert costs == sorted(costs, reverse=True) and costs[-1] == result['total_cost']
+        print(f"   ✓ {acceptance}: {result['total_cost']} (VND: {vnd_result['total_cost']})")
+
+
+def test_ils_seed_and_options():
+    """Cùng seed và số vòng cho cùng lời giải; tùy chọn sai hoặc ngoài miền bị từ chối."""
+    vector, cost_matrix, demand, pickup, capacity = load()
+    runs = [solve_ils(vector, cost_matrix, demand, pickup, capacity, perturbation='ruin', max_iterations=10,
+                      seed=3, granular_k=10)['routes'] for _ in range(2)]
+    assert runs[0] == runs[1]
+    print("   ✓ Seeded runs are reproducible")
+
+    for options in ({'acceptance': 'greedy'}, {'perturbation': 'shuffle'}, {'ruin_size': 0}, {'ruin_size': -2},
+                    {'max_iterations': -1}, {'acceptance_threshold': -0.1}):
+        try:
+            solve_ils(vector, cost_matrix, demand, pickup, capacity, **{'max_iterations': 1, **options})
+            assert False, "unknown option must raise"
+        except ValueError:
+            pass
+    print("   ✓ Unknown acceptance / perturbation and out-of-range options rejected")
+
+
+def test_ils_shares_parallel_pool():
+    """workers > 1: một pool cho cả lần chạy ILS, cùng lời giải với chạy tuần tự."""
+    vector, cost_matrix, demand, pickup, capacity = load()
+    created = []
+
+    class CountingSearch(vnd.ParallelInterSearch):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    options = {'perturbation': 'ruin', 'max_iterations': 5, 'seed': 3, 'granular_k': 10}
+    serial = solve_ils(vector, cost_matrix, demand, pickup, capacity, **options)
+    ils.ParallelInterSearch = vnd.ParallelInterSearch = CountingSearch
+    try:
+        parallel = solve_ils(vector, cost_matrix, demand, pickup, capacity, workers=2, **options)
+    finally:
+        ils.ParallelInterSearch = vnd.ParallelInterSearch = CountingSearch.__bases__[0]
+    assert len(created) == 1
+    assert parallel['routes'] == serial['routes']
+    print(f"   ✓ One pool for {parallel['ils_iterations'] + 1} descents, same routes as serial")
+
+
+if __name__ == '__main__':
+    test_ils_improves_on_vnd()
+    test_ils_seed_and_options()
+    test_ils_shares_parallel_pool()
+    print("\n✅ ALL TESTS PASSED!")
@@ -0,0 +1,128 @@
+"""
+Test Background Job Queue
+Kiểm tra JobQueue: trạng thái, kết quả, lỗi, giới hạn số job chạy đồng thời
+"""
+
+import threading
+import time
+
+from algorithms.jobs import JobQueue, JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+
+def wait_for(job, timeout=10):
+    """Chờ job kết thúc."""
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished, job.status
+
+
+def test_job_lifecycle():
+    """Job trả kết quả, báo tiến độ, lỗi được ghi lại thay vì làm hỏng queue."""
+    print("=" * 60)
+    print("TESTING BACKGROUND JOB QUEUE")
+    print("=" * 60)
+
+    queue = JobQueue(max_workers=1)
+
+    def work(job, x):
+        job.update_progress(step=1)
+        return x * 2
+
+    job = queue.submit('test', work, 21)
+    wait_for(job)
+    assert job.status == JOB_DONE and job.result == 42
+    assert queue.get(job.job_id) is job
+    data = job.to_dict()
+    assert data['result'] == 42 and data['progress'] == {'step': 1}
+    print("   ✓ Job done with result and progress")
+
+    def fail(job):
+        raise ValueError('bad instance')
+
+    job = queue.submit('test', fail)
+    wait_for(job)
+    assert job.status == JOB_FAILED and job.error == 'bad instance'
+    assert 'result' not in job.to_dict() and 'ValueError' in job.to_dict()['traceback']
+    print("   ✓ Failure recorded")
+    queue.shutdown()
+
+
+def test_job_pool_is_bounded():
+    """Chỉ max_workers job chạy cùng lúc, job sau xếp hàng."""
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+
+    first = queue.submit('test', lambda job: release.wait(5))
+    second = queue.submit('test', lambda job: 'second')
+    time.sleep(0.1)
+    assert first.status == JOB_RUNNING and second.status == JOB_QUEUED
+    release.set()
+    wait_for(second)
+    assert second.result == 'second'
+    print("   ✓ Second job queued until a worker is free")
+    queue.shutdown()
+
+
+def test_job_history_is_bounded():
+    """Chỉ giữ history_size job đã kết thúc gần nhất."""
+    queue = JobQueue(max_workers=1, history_size=2)
+    jobs = [queue.submit('test', lambda job: None) for _ in range(3)]
+    for job in jobs:
+        wait_for(job)
+    queue.submit('test', lambda job: None)
+    assert queue.get(jobs[0].job_id) is None and queue.get(jobs[2].job_id) is jobs[2]
+    print("   ✓ Old finished jobs dropped")
+    queue.shutdown()
+
+
+def test_wait_for_change():
+    """wait_for_change trả về ngay khi tiến độ thay đổi, hoặc version cũ khi hết timeout."""
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+
+    def work(job):
+        release.wait(5)
+        job.update_progress(cost=10)
+
+    job = queue.submit('test', work)
+    version = job.wait_for_change(-1, timeout=1)
+    assert job.wait_for_change(version, timeout=0.05) == version
+    release.set()
+    while not job.finished:
+        version = job.wait_for_change(version, timeout=5)
+    assert job.progress == {'cost': 10} and job.status == JOB_DONE
+    print("   ✓ Progress changes wake waiters")
+    queue.shutdown()
+
+
+def test_job_cancel():
+    """Job đang xếp hàng bị hủy không chạy; job đang chạy dừng và giữ kết quả."""
+    queue = JobQueue(max_workers=1)
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while not job.cancel_token.expired():
+            time.sleep(0.01)
+        return 'best so far'
+
+    running = queue.submit('test', work)
+    queued = queue.submit('test', lambda job: 'never')
+    started.wait(5)
+    assert queue.cancel(queued.job_id) is queued and queued.status == JOB_CANCELLED
+    queue.cancel(running.job_id)
+    wait_for(running)
+    assert running.status == JOB_CANCELLED and running.to_dict()['result'] == 'best so far'
+    assert queued.result is None and queue.cancel('missing') is None
+    print("   ✓ Queued job skipped, running job stopped with its result")
+    queue.shutdown()
+
+
+if __name__ == '__main__':
+    test_job_lifecycle()
+    test_job_pool_is_bounded()
+    test_job_history_is_bounded()
+    test_wait_for_change()
+    test_job_cancel()
+    print("\n✅ ALL TESTS PASSED!")
@@ -0,0 +1,74 @@
+"""
+Test Instance Registry
+Kiểm tra registry instance: dùng lại theo hash nội dung, LRU, dữ liệu suy ra
+"""
+
+import os
+import shutil
+import tempfile
+
+from algorithms import read_vrpspd_file
+from algorithms.registry import InstanceRegistry
+
+TEST_FILES = ['static/uploads/20_2_01.txt', 'static/uploads/20_2_02.txt', 'static/uploads/20_2_03.txt']
+
+
+def test_registry_reuses_instances():
+    """Cùng nội dung -> cùng instance (không parse lại), dữ liệu giống read_vrpspd_file."""
+    print("=" * 60)
+    print("TESTING INSTANCE REGISTRY")
+    print("=" * 60)
+
+    registry = InstanceRegistry()
+    instance = registry.load(TEST_FILES[0])
+    assert instance.data == read_vrpspd_file(TEST_FILES[0])
+    assert registry.get(instance.instance_id) is instance
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_path = os.path.join(tmp_dir, 'copy.txt')
+        shutil.copy(TEST_FILES[0], copy_path)
+        assert registry.load(copy_path) is instance
+    assert len(registry) == 1
+    print(f"   ✓ Instance {instance.instance_id} reused for identical content")
+
+    neighbors = instance.neighbor_lists(5)
+    assert instance.neighbor_lists(5) is neighbors and len(neighbors[1]) == 5
+    coordinates = instance.coordinates()
+    assert instance.coordinates() is coordinates and len(coordinates) == len(instance.cost_matrix)
+    print("   ✓ Neighbor lists and coordinates computed once")
+
+
+def test_registry_eviction():
+    """Vượt số instance hoặc bộ nhớ cho phép -> loại instance dùng lâu nhất."""
+    registry = InstanceRegistry(max_instances=2)
+    first, second, third = (registry.load(path) for path in TEST_FILES)
+    assert first.instance_id not in registry
+    assert second.instance_id in registry and third.instance_id in registry
+
+    registry.get(second.instance_id)
+    registry.load(TEST_FILES[0])
+    assert third.instance_id not in registry and second.instance_id in registry
+    print("   ✓ LRU eviction by count")
+
+    registry = InstanceRegistry(max_bytes=first.nbytes + 1)
+    for path in TEST_FILES:
+        registry.load(path)
+    assert len(registry) == 1 and registry.nbytes <= first.nbytes + 1
+    print("   ✓ Eviction by memory cap")
+
+    # Neighbour lists and coordinates built later count towards the cap too
+    registry = InstanceRegistry(max_bytes=first.nbytes + second.nbytes)
+    first, second = registry.load(TEST_FILES[0]), registry.load(TEST_FILES[1])
+    assert len(registry) == 2
+    matrix_nbytes = first.nbytes
+    first.neighbor_lists(5)
+    first.coordinates()
+    assert first.nbytes > matrix_nbytes and registry.nbytes == first.nbytes
+    assert first.instance_id in registry and second.instance_id not in registry
+    print("   ✓ Derived data re-estimated and evicts other instances")
+
+
+if __name__ == '__main__':
+    test_registry_reuses_instances()
+    test_registry_eviction()
+    print("\n✅ ALL TESTS PASSED!")
@@ -0,0 +1,132 @@
+"""
+Test Result Cache
+Kiểm tra ResultCache: khóa theo nội dung + tham số, chỉ cache kết quả tái lập được, loại bỏ theo dung lượng,
+incumbent cho warm-start VND
+"""
+
+import os
+import tempfile
+import time
+
+from algorithms import read_vrpspd_file, solve_savings, solve_vnd
+from algorithms.batch_processor import process_batch_files
+from algorithms.cancellation import CancellationToken
+from algorithms.result_cache import ResultCache, is_cacheable
+from algorithms.utils import validate_solution_vector
+
+UPLOADS = 'static/uploads'
+FILES = [{'filename': name, 'filepath': f'{UPLOADS}/{name}'}
+         for name in ('20_2_01.txt', '20_2_02.txt')]
+
+
+def test_cache_keys():
+    """Khóa đổi theo nội dung / thuật toán / tham số VND (workers chỉ khi làm đổi lời giải), không theo max_time_seconds."""
+    print("=" * 60)
+    print("TESTING RESULT CACHE")
+    print("=" * 60)
+
+    cache = ResultCache(tempfile.gettempdir())
+    key = cache.key('abc', ['savings', 'vnd'], {'max_time_seconds': 60, 'strategy': 'best'})
+    assert key == cache.key('abc', ['vnd', 'savings'], {'max_time_seconds': 5, 'strategy': 'best'})
+    assert key != cache.key('abd', ['savings', 'vnd'], {'strategy': 'best'})
+    assert key != cache.key('abc', ['savings', 'vnd'], {'strategy': 'first'})
+    assert cache.key('abc', ['savings'], {'strategy': 'first'}) == cache.key('abc', ['savings'])
+    assert key == cache.key('abc', ['savings', 'vnd'], {'strategy': 'best', 'workers': 4})
+    # Parallel 'first' / budgeted scans take a different path than serial ones
+    first = cache.key('abc', ['savings', 'vnd'], {'strategy': 'first'})
+    assert first == cache.key('abc', ['savings', 'vnd'], {'strategy': 'first', 'workers': 1})
+    assert first != cache.key('abc', ['savings', 'vnd'], {'strategy': 'first', 'workers': 2})
+    assert (cache.key('abc', ['vnd'], {'eval_budget': 100})
+            != cache.key('abc', ['vnd'], {'eval_budget': 100, 'workers': 2}))
+    print("   ✓ Keys depend on content, algorithms and result-relevant parameters")
+
+
+def test_cacheable_results():
+    """Kết quả VND chưa hội tụ hoặc bị hủy không được cache."""
+    assert is_cacheable({'savings': {}})
+    assert is_cacheable({'savings': {}, 'vnd': {'converged': True}})
+    assert not is_cacheable({'savings': {}, 'vnd': {'converged': False}})
+    token = CancellationToken()
+    token.cancel()
+    assert not is_cacheable({'savings': {}}, token)
+    print("   ✓ Only reproducible results are cacheable")
+
+
+def test_cache_eviction():
+    """Vượt max_bytes thì entry ít được dùng nhất bị xóa."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(tmp, max_bytes=250)
+        payload = {'results': {'data': 'x' * 80}}
+        cache.put('a', payload)
+        cache.put('b', payload)
+        os.utime(os.path.join(tmp, 'a.json'), (time.time() - 60, time.time() - 60))
+        os.utime(os.path.join(tmp, 'b.json'), (time.time() - 30, time.time() - 30))
+        assert cache.get('a') == payload  # refreshes 'a'
+        cache.put('c', payload)
+        assert cache.get('b') is None and cache.get('a') == payload and cache.get('c') == payload
+    print("   ✓ Least recently used entry evicted")
+
+
+def test_batch_uses_cache():
+    """Batch chạy lại lấy kết quả từ cache với cùng lời giải."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(tmp)
+        first = process_batch_files(FILES, ['savings', 'vnd'], result_cache=cache)
+        second = process_batch_files(FILES, ['savings', 'vnd'], result_cache=cache)
+        assert all(not r.get('cached') for r in first) and all(r['cached'] for r in second)
+        assert [r['results'] for r in second] == [r['results'] for r in first]
+        assert [r['filename'] for r in second] == [f['filename'] for f in FILES]
+    print("   ✓ Re-run served from the cache")
+
+
+def test_warm_start_incumbent():
+    """Incumbent chỉ được thay bằng lời giải tốt hơn; VND warm-start không tệ hơn điểm bắt đầu."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(FILES[0]['filepath'])
+    savings = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
+    validate_solution_vector(savings['solution_vector'], len(cost_matrix) - 1, capacity, demand, pickup)
+    for bad in ([0, 1, 2, 0], [1] + savings['solution_vector'][1:]):
+        try:
+            validate_solution_vector(bad, len(cost_matrix) - 1, capacity, demand, pickup)
+            assert False, "invalid vector must raise"
+        except ValueError:
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(tmp)
+        assert cache.offer_incumbent('abc', savings['solution_vector'], savings['total_cost'])
+        warm = solve_vnd(cache.incumbent('abc')['solution_vector'], cost_matrix, demand, pickup, capacity,
+                         max_time_seconds=5)
+        assert warm['total_cost'] <= savings['total_cost']
+        assert not cache.offer_incumbent('abc', savings['solution_vector'], savings['total_cost'] + 1)
+        cache.offer_incumbent('abc', warm['solution_vector'], warm['total_cost'])
+        assert cache.incumbent('abc')['total_cost'] == warm['total_cost']
+    print(f"   ✓ Incumbent improved {savings['total_cost']} -> {warm['total_cost']}, invalid vectors rejected")
+
+
+def test_incumbent_storage():
+    """Incumbent không bị loại bỏ cùng cache; file incumbent hỏng được coi như chưa có."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(tmp, max_bytes=100)
+        assert cache.offer_incumbent('abc', [0, 1, 2, 0], 10.0)
+        cache.put('a', {'results': {'data': 'x' * 200}})
+        assert cache.incumbent('abc') == {'solution_vector': [0, 1, 2, 0], 'total_cost': 10.0}
+        print("   ✓ Incumbents survive cache eviction")
+
+        path = cache._incumbent_path('abc')
+        for malformed in ('[1, 2]', '{"solution_vector": [0, 1, 0]}', '{"solution_vector": "0,1,0", "total_cost": 1}',
+                          '{"solution_vector": [0, 1, 0], "total_cost": "1"}', '{"solution_vector"'):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(malformed)
+            assert cache.incumbent('abc') is None
+            assert cache.offer_incumbent('abc', [0, 1, 2, 0], 12.0)
+        print("   ✓ Malformed incumbent files ignored and replaced")
+
+
+if __name__ == '__main__':
+    test_cache_keys()
+    test_cacheable_results()
+    test_cache_eviction()
+    test_batch_uses_cache()
+    test_warm_start_incumbent()
+    test_incumbent_storage()
+    print("\n✅ ALL TESTS PASSED!")
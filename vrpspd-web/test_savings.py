@@ -0,0 +1,38 @@
+"""
+Test Savings Algorithm
+Kiểm tra phiên bản NumPy và phiên bản Python của Clarke-Wright cho cùng kết quả
+"""
+
+from algorithms import read_vrpspd_file, solve_savings
+from algorithms.savings import compute_savings_pairs, compute_savings_pairs_numpy
+from algorithms.utils import check_single_route_feasibility
+
+TEST_FILES = ['static/uploads/20_2_01.txt', 'static/uploads/60_6_01.txt', 'static/uploads/C101_40_02.txt']
+
+
+def test_numpy_savings_matches_python():
+    """Thứ tự savings và lời giải phải giống hệt nhau ở cả hai phiên bản."""
+
+    print("=" * 60)
+    print("TESTING SAVINGS (NUMPY vs PYTHON)")
+    print("=" * 60)
+
+    for test_file in TEST_FILES:
+        cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(test_file)
+
+        assert list(compute_savings_pairs_numpy(cost_matrix)) == compute_savings_pairs(cost_matrix)
+
+        fast = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles, use_numpy=True)
+        slow = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles, use_numpy=False)
+        assert fast['routes'] == slow['routes']
+        assert fast['total_cost'] == slow['total_cost']
+
+        served = sorted(c for route in fast['routes'] for c in route)
+        assert served == list(range(1, len(cost_matrix)))
+        assert all(check_single_route_feasibility(r, capacity, demand, pickup) for r in fast['routes'])
+        print(f"   ✓ {test_file}: {fast['num_routes']} routes, cost {fast['total_cost']}")
+
+
+if __name__ == '__main__':
+    test_numpy_savings_matches_python()
+    print("\n✅ ALL TESTS PASSED!")
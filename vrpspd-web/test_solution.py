@@ -0,0 +1,57 @@
+"""
+Test Solution Representation
+Kiểm tra chỉ mục khách hàng -> (tuyến, vị trí) và chi phí cập nhật tăng dần
+"""
+
+from algorithms import read_vrpspd_file, solve_savings, calculate_total_cost
+from algorithms.solution import Solution
+from algorithms.vnd import build_inter_move
+
+TEST_FILE = 'static/uploads/40_5_01.txt'
+
+
+def check_index(solution):
+    for route_idx, route in enumerate(solution.routes):
+        for pos, customer in enumerate(route):
+            assert solution.locate(customer) == (route_idx, pos)
+
+
+def test_solution_apply_move():
+    """Chỉ mục và chi phí phải khớp với tính lại từ đầu sau mỗi move."""
+
+    print("=" * 60)
+    print("TESTING SOLUTION REPRESENTATION")
+    print("=" * 60)
+
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+
+    solution = Solution.from_vector(vector, cost_matrix, demand, pickup)
+    assert solution.to_vector() == vector
+    check_index(solution)
+    print(f"   ✓ Loaded {solution.num_routes} routes, cost {solution.total_cost:.2f}")
+
+    # Shift customers out of the first route until it disappears, then a Swap(1,1)
+    num_routes = len(solution.routes)
+    removed = False
+    while not removed:
+        k = 2 if len(solution.routes[0]) >= 2 else 1
+        new_A, new_B = build_inter_move(k, solution.routes[0], solution.routes[-1], 0, 0)
+        touched = solution.apply_move(0, len(solution.routes) - 1, new_A, new_B)
+        removed = len(touched) == 1
+        assert [solution.routes[idx] for idx in touched] == [r for r in (new_A, new_B) if r]
+        check_index(solution)
+    assert len(solution.routes) == num_routes - 1
+    print(f"   ✓ Emptied route removed ({num_routes} -> {len(solution.routes)} routes), touched routes reported")
+    new_A, new_B = build_inter_move(0, solution.routes[0], solution.routes[1], 0, 0)
+    solution.apply_move(0, 1, new_A, new_B)
+    check_index(solution)
+
+    assert abs(solution.total_cost - calculate_total_cost(solution.to_vector(), cost_matrix)) < 1e-6
+    assert sorted(c for c in solution.to_vector() if c) == sorted(c for c in vector if c)
+    print(f"   ✓ Index and cost consistent after moves ({solution.num_routes} routes)")
+
+
+if __name__ == '__main__':
+    test_solution_apply_move()
+    print("\n✅ ALL TESTS PASSED!")
@@ -0,0 +1,212 @@
+"""
+Test Delta-Cost Move Evaluation (VND)
+Kiểm tra delta O(1) của các neighborhood inter-route so với tính lại toàn bộ chi phí
+"""
+
+from algorithms import read_vrpspd_file, solve_savings, solve_vnd
+from algorithms import vnd
+from algorithms.cancellation import CancellationToken
+from algorithms.solution import Solution
+from algorithms.utils import route_distance, build_neighbor_lists
+from algorithms.vnd import (
+    INTER_NEIGHBORHOODS,
+    iter_route_pairs,
+    build_inter_move,
+    inter_move_delta,
+    pending_inter_items,
+    iter_inter_move_groups,
+    vnd_intra_search,
+    IntraRouteCache
+)
+
+TEST_FILE = 'static/uploads/50_4_01.txt'
+
+
+def test_inter_move_deltas():
+    """Delta của mọi move phải khớp với chi phí tính lại trên 2 tuyến bị ảnh hưởng."""
+
+    print("=" * 60)
+    print("TESTING DELTA-COST MOVE EVALUATION")
+    print("=" * 60)
+
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    routes = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['routes']
+
+    for k, (delta_fn, _) in enumerate(INTER_NEIGHBORHOODS):
+        checked = 0
+        for a, b in iter_route_pairs(k, len(routes)):
+            old_cost = route_distance(routes[a], cost_matrix) + route_distance(routes[b], cost_matrix)
+            for delta, i, j in delta_fn(routes[a], routes[b], cost_matrix):
+                new_A, new_B = build_inter_move(k, routes[a], routes[b], i, j)
+                new_cost = route_distance(new_A, cost_matrix) + route_distance(new_B, cost_matrix)
+                assert abs((new_cost - old_cost) - delta) < 1e-6, (k, a, b, i, j)
+                assert abs(inter_move_delta(k, routes[a], routes[b], i, j, cost_matrix) - delta) < 1e-9
+                assert sorted(new_A + new_B) == sorted(routes[a] + routes[b])
+                checked += 1
+        print(f"   ✓ Neighborhood {k}: {checked} moves verified")
+
+
+def test_granular_candidates():
+    """Move granular phải là tập con của neighborhood đầy đủ."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    routes = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['routes']
+    solution = Solution(routes, cost_matrix, demand, pickup)
+    neighbor_lists = build_neighbor_lists(cost_matrix, 8)
+
+    for k, (delta_fn, _) in enumerate(INTER_NEIGHBORHOODS):
+        full = {(a, b, i, j)
+                for a, b in iter_route_pairs(k, len(routes))
+                for _, i, j in delta_fn(routes[a], routes[b], cost_matrix)}
+        # The production path: pending customers, then each customer's candidate moves
+        assert list(pending_inter_items(k, solution, neighbor_lists)) == list(range(1, len(cost_matrix)))
+        granular = {(a, b, i, j)
+                    for _, moves in iter_inter_move_groups(k, solution, cost_matrix, neighbor_lists)
+                    for _, a, b, i, j in moves}
+        assert granular and granular <= full
+        print(f"   ✓ Neighborhood {k}: {len(granular)} granular / {len(full)} moves")
+
+
+def test_intra_cache():
+    """Kết quả intra-route lấy từ cache phải giống hệt khi tính lại."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+
+    cache = IntraRouteCache(maxsize=64)
+    expected = vnd_intra_search(vector, cost_matrix, capacity, demand, pickup)
+    assert vnd_intra_search(vector, cost_matrix, capacity, demand, pickup, cache=cache) == expected
+    assert vnd_intra_search(vector, cost_matrix, capacity, demand, pickup, cache=cache) == expected
+    assert cache.hits > 0 and len(cache) <= 64
+    print(f"   ✓ Intra cache: {cache.hits} hits, {cache.misses} misses")
+
+
+def test_vnd_keeps_all_customers():
+    """VND phải giữ đủ khách hàng và không làm tăng chi phí."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
+    vnd_result = solve_vnd(savings_result['solution_vector'], cost_matrix, demand, pickup, capacity,
+                           max_time_seconds=10)
+
+    served = sorted(c for route in vnd_result['routes'] for c in route)
+    assert served == list(range(1, len(cost_matrix)))
+    assert vnd_result['total_cost'] <= savings_result['total_cost']
+    print(f"   ✓ VND cost: {vnd_result['total_cost']} (Savings: {savings_result['total_cost']})")
+
+
+def test_vnd_strategies():
+    """Mọi chiến lược duyệt (kể cả có eval_budget) phải cho lời giải hợp lệ, không tệ hơn Savings."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)
+
+    for options in ({'strategy': 'first'},
+                    {'strategy': 'sampled', 'sample_size': 3, 'intra_strategy': 'best'},
+                    {'strategy': 'best', 'eval_budget': 200, 'granular_k': 10}):
+        vnd_result = solve_vnd(savings_result['solution_vector'], cost_matrix, demand, pickup, capacity,
+                               max_time_seconds=10, **options)
+        served = sorted(c for route in vnd_result['routes'] for c in route)
+        assert served == list(range(1, len(cost_matrix)))
+        assert vnd_result['total_cost'] <= savings_result['total_cost']
+        print(f"   ✓ {options}: {vnd_result['total_cost']}")
+
+    try:
+        solve_vnd(savings_result['solution_vector'], cost_matrix, demand, pickup, capacity, strategy='worst')
+        assert False, "unknown strategy must raise"
+    except ValueError:
+        print("   ✓ Unknown strategy rejected")
+
+
+def test_vnd_progress_callback():
+    """progress_callback nhận chi phí giảm dần, kết thúc bằng chi phí cuối cùng."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+
+    events = []
+    result = solve_vnd(vector, cost_matrix, demand, pickup, capacity, progress_callback=events.append)
+    costs = [event['cost'] for event in events]
+    assert events[0]['iterations'] == 0 and events[0]['k'] is None
+    assert costs == sorted(costs, reverse=True) and costs[-1] == result['total_cost']
+    assert [event['iterations'] for event in events] == list(range(len(events)))
+    print(f"   ✓ {len(events)} progress events, {costs[0]} -> {costs[-1]}")
+
+
+def test_vnd_cancellation():
+    """Solver bị hủy dừng sớm nhưng vẫn trả về lời giải hợp lệ (tốt nhất đã có)."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    customers = list(range(1, len(cost_matrix)))
+
+    token = CancellationToken()
+    token.cancel()
+    savings_result = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles, cancel_token=token)
+    assert sorted(c for route in savings_result['routes'] for c in route) == customers
+    print(f"   ✓ Cancelled Savings still serves every customer ({savings_result['total_cost']})")
+
+    vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+    token = CancellationToken()
+    events = []
+
+    def cancel_after_first_move(progress):
+        events.append(progress)
+        if progress['iterations'] == 1:
+            token.cancel()
+
+    result = solve_vnd(vector, cost_matrix, demand, pickup, capacity, cancel_token=token,
+                       progress_callback=cancel_after_first_move)
+    assert sorted(c for route in result['routes'] for c in route) == customers
+    assert events[-1]['iterations'] == 1 and result['total_cost'] == events[-1]['cost']
+    print(f"   ✓ VND stopped after the first accepted move ({result['total_cost']})")
+
+
+def test_parallel_matches_serial():
+    """Quét song song (best-improvement) phải cho cùng lời giải với quét tuần tự."""
+    cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(TEST_FILE)
+    vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+
+    min_items = vnd.PARALLEL_MIN_ITEMS
+    vnd.PARALLEL_MIN_ITEMS = 0  # small instance: force every scan onto the workers
+    try:
+        for granular_k in (None, 8):
+            serial = solve_vnd(vector, cost_matrix, demand, pickup, capacity, granular_k=granular_k)
+            parallel = solve_vnd(vector, cost_matrix, demand, pickup, capacity, granular_k=granular_k,
+                                 workers=2)
+            assert parallel['routes'] == serial['routes']
+            print(f"   ✓ granular_k={granular_k}: parallel == serial ({parallel['total_cost']})")
+    finally:
+        vnd.PARALLEL_MIN_ITEMS = min_items
+
+
+class _NoSearchMemory(vnd.SearchMemory):
+    """SearchMemory không ghi nhớ gì: mỗi lượt quét lại toàn bộ neighborhood."""
+
+    def mark_clean(self, k, group):
+        pass
+
+
+def test_search_memory_matches_full_rescan():
+    """Cặp sạch / don't-look bit chỉ bỏ qua move không cải thiện: cùng lời giải với quét lại toàn bộ."""
+    for test_file in (TEST_FILE, 'static/uploads/50_4_05.txt', 'static/uploads/20_3_01.txt'):
+        cost_matrix, demand, pickup, vehicle_caps, capacity, num_vehicles = read_vrpspd_file(test_file)
+        vector = solve_savings(cost_matrix, demand, pickup, capacity, num_vehicles)['solution_vector']
+        for granular_k in (None, 8):
+            with_memory = solve_vnd(vector, cost_matrix, demand, pickup, capacity, granular_k=granular_k)
+            search_memory = vnd.SearchMemory
+            vnd.SearchMemory = _NoSearchMemory
+            try:
+                rescan = solve_vnd(vector, cost_matrix, demand, pickup, capacity, granular_k=granular_k)
+            finally:
+                vnd.SearchMemory = search_memory
+            assert with_memory['converged'] and rescan['converged']
+            assert with_memory['routes'] == rescan['routes']
+            print(f"   ✓ {test_file.rsplit('/', 1)[-1]} granular_k={granular_k}: "
+                  f"memory == full rescan ({with_memory['total_cost']})")
+
+
+if __name__ == '__main__':
+    test_inter_move_deltas()
+    test_granular_candidates()
+    test_intra_cache()
+    test_vnd_keeps_all_customers()
+    test_vnd_strategies()
+    test_vnd_progress_callback()
+    test_vnd_cancellation()
+    test_parallel_matches_serial()
+    test_search_memory_matches_full_rescan()
+    print("\n✅ ALL TESTS PASSED!")